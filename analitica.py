@@ -0,0 +1,183 @@
+"""
+Motor de análisis de ventas con NumPy.
+
+Las líneas de venta de un rango de fechas se leen una sola vez (en bloques, con fetchmany) y se guardan
+como columnas de NumPy. Todos los análisis se calculan sobre esas columnas con operaciones vectorizadas,
+sin volver a consultar la BD:
+
+- Mapa de calor de ventas por día de la semana y hora.
+- Clasificación ABC de productos por ingresos (Pareto).
+- Margen por producto (ingreso menos costo al momento de la venta).
+- Distribución del tamaño de la canasta (artículos por ticket).
+- Ventas diarias y sus promedios móviles.
+
+Uso:
+    with db.connect() as conn:
+        datos = DatosVentas.load(conn, "2025-01-01", "2025-12-31")
+    matriz = datos.heatmap()
+    clases = datos.abc()
+"""
+import numpy as np
+from datetime import datetime, timedelta
+
+from models import Archivo
+
+TAMANO_BLOQUE = 50000 # Filas por fetchmany
+DIAS_SEMANA = ("Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom")
+JULIANO_EPOCH = 2440588 # julianday('1970-01-01') + 0.5: así el día 1970-01-01 es el 0
+
+def fetchColumns(cursor, numColumnas, tamanoBloque=TAMANO_BLOQUE):
+    """Lee el resultado de 'cursor' en bloques y lo devuelve como matriz (filas x columnas) de float64."""
+    bloques = []
+    while True:
+        filas = cursor.fetchmany(tamanoBloque)
+        if not filas: break
+        bloques.append(np.array(filas, dtype=np.float64))
+    return np.concatenate(bloques) if bloques else np.empty((0, numColumnas))
+
+class DatosVentas:
+    """
+    Columnas de un rango de ventas: una entrada por ticket (idVentas, horaVenta, diaVenta) y una por línea de
+    venta (idVenta, idProducto, cantidad, ingreso, costo, esRecarga, con su hora y día tomados del ticket).
+    """
+    def __init__(self, tickets, lineas, desde, hasta):
+        self.desde, self.hasta = desde, hasta
+        orden = np.argsort(tickets[:, 0], kind="stable")
+        self.idVentas = tickets[orden, 0].astype(np.int64)
+        self.horaVenta = tickets[orden, 1].astype(np.int64)
+        self.diaVenta = tickets[orden, 2].astype(np.int64) # Días desde 1970-01-01
+        # Solo las líneas de los tickets del rango (la lectura por rango de IDs puede traer alguno de más)
+        idVenta = lineas[:, 0].astype(np.int64)
+        posicion = np.minimum(np.searchsorted(self.idVentas, idVenta), max(len(self.idVentas) - 1, 0))
+        validas = self.idVentas[posicion] == idVenta if len(self.idVentas) else np.zeros(len(idVenta), dtype=bool)
+        lineas, posicion = lineas[validas], posicion[validas]
+        self.ticket = posicion # Índice del ticket de cada línea
+        self.idVenta = lineas[:, 0].astype(np.int64)
+        self.idProducto = lineas[:, 1].astype(np.int64)
+        self.cantidad = lineas[:, 2]
+        self.ingreso = lineas[:, 3]
+        self.costo = lineas[:, 2] * lineas[:, 4]
+        self.esRecarga = lineas[:, 5].astype(bool)
+        self.hora = self.horaVenta[posicion]
+        self.dia = self.diaVenta[posicion]
+        self.diaSemana = (self.dia + 3) % 7 # 1970-01-01 fue jueves; 0 = lunes
+
+    def __len__(self):
+        return len(self.idVenta)
+
+    @staticmethod
+    def load(dbConnection, desde, hasta, tamanoBloque=TAMANO_BLOQUE):
+        """
+        Lee las ventas entre los días 'desde' y 'hasta' (AAAA-MM-DD, inclusive), incluidos los años archivados.
+        Los tickets se leen por el índice de fecha y sus líneas por el rango de IDs de esos tickets, en dos
+        lecturas en bloques. La hora y el día se calculan una vez por ticket, no por línea.
+        """
+        start, end = f"{desde} 00:00:00", f"{hasta} 23:59:59"
+        ventas, detallesVenta, _ = Archivo.sources(dbConnection, start, end)
+        cursor = dbConnection.cursor()
+        cursor.execute(f"""
+            SELECT idVenta, CAST(substr(fecha, 12, 2) AS INTEGER), CAST(julianday(substr(fecha, 1, 10)) + 0.5 AS INTEGER) - {JULIANO_EPOCH}
+            FROM {ventas} WHERE fecha BETWEEN ? AND ?
+        """, (start, end))
+        tickets = fetchColumns(cursor, 3, tamanoBloque)
+        if not len(tickets):
+            return DatosVentas(tickets, np.empty((0, 6)), desde, hasta)
+        cursor.execute(f"""
+            SELECT idVenta, idProducto, cantidad, subtotal, COALESCE(costoUnitario, 0), COALESCE(esRecarga, 0)
+            FROM {detallesVenta} WHERE idVenta BETWEEN ? AND ?
+        """, (int(tickets[:, 0].min()), int(tickets[:, 0].max())))
+        return DatosVentas(tickets, fetchColumns(cursor, 6, tamanoBloque), desde, hasta)
+
+    # --- Agregados por ticket y por producto ---
+
+    def porProducto(self, incluirRecargas=False):
+        """(idsProducto, cantidad, ingreso, costo) sumados por producto."""
+        mascara = slice(None) if incluirRecargas else ~self.esRecarga
+        ids, inverso = np.unique(self.idProducto[mascara], return_inverse=True)
+        suma = lambda valores: np.bincount(inverso, weights=valores[mascara], minlength=len(ids))
+        return ids, suma(self.cantidad), suma(self.ingreso), suma(self.costo)
+
+    # --- Análisis ---
+
+    def heatmap(self, medida="ingreso"):
+        """Matriz 7x24 (lunes a domingo, 0 a 23 h) con el ingreso o el número de tickets de cada franja."""
+        if medida == "tickets":
+            celda = (self.diaVenta + 3) % 7 * 24 + self.horaVenta
+            return np.bincount(celda, minlength=7 * 24).reshape(7, 24)
+        return np.bincount(self.diaSemana * 24 + self.hora, weights=self.ingreso, minlength=7 * 24).reshape(7, 24)
+
+    def abc(self, umbrales=(0.80, 0.95)):
+        """
+        Clasificación ABC por ingresos: A hasta el 80 % acumulado, B hasta el 95 % y C el resto.
+        Devuelve un arreglo estructurado ordenado por ingreso (idProducto, ingreso, participacion, acumulado, clase).
+        """
+        ids, _, ingreso, _ = self.porProducto()
+        orden = np.argsort(-ingreso, kind="stable")
+        ingreso = ingreso[orden]
+        total = ingreso.sum()
+        participacion = ingreso / total if total else np.zeros_like(ingreso)
+        acumulado = np.cumsum(participacion)
+        # El producto que cruza el umbral pertenece a la clase anterior (es parte del 80 %)
+        clase = np.where(acumulado - participacion < umbrales[0], "A", np.where(acumulado - participacion < umbrales[1], "B", "C"))
+        resultado = np.zeros(len(ids), dtype=[("idProducto", np.int64), ("ingreso", np.float64), ("participacion", np.float64), ("acumulado", np.float64), ("clase", "U1")])
+        resultado["idProducto"], resultado["ingreso"], resultado["participacion"] = ids[orden], ingreso, participacion
+        resultado["acumulado"], resultado["clase"] = acumulado, clase
+        return resultado
+
+    def margins(self):
+        """
+        Margen por producto, ordenado de mayor a menor margen en pesos. Los descuentos por ticket no se
+        reparten entre los productos. Arreglo estructurado (idProducto, cantidad, ingreso, costo, margen, margenPct).
+        """
+        ids, cantidad, ingreso, costo = self.porProducto()
+        margen = ingreso - costo
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margenPct = np.where(ingreso > 0, margen / ingreso * 100, 0.0)
+        orden = np.argsort(-margen, kind="stable")
+        resultado = np.zeros(len(ids), dtype=[("idProducto", np.int64), ("cantidad", np.float64), ("ingreso", np.float64), ("costo", np.float64), ("margen", np.float64), ("margenPct", np.float64)])
+        for nombre, valores in (("idProducto", ids), ("cantidad", cantidad), ("ingreso", ingreso), ("costo", costo), ("margen", margen), ("margenPct", margenPct)):
+            resultado[nombre] = valores[orden]
+        return resultado
+
+    def basketSizes(self, maximo=20):
+        """
+        Distribución de artículos por ticket (sin recargas). Devuelve (conteos, resumen): conteos[i] es el número
+        de tickets con i artículos (el último agrupa 'maximo' o más); resumen tiene promedio, mediana y p95.
+        """
+        numTickets = len(self.idVentas)
+        articulos = np.bincount(self.ticket, weights=np.where(self.esRecarga, 0, self.cantidad), minlength=numTickets)
+        conteos = np.bincount(np.minimum(articulos.astype(np.int64), maximo), minlength=maximo + 1)
+        if not numTickets:
+            return conteos, {"tickets": 0, "promedio": 0.0, "mediana": 0.0, "p95": 0.0}
+        return conteos, {"tickets": numTickets, "promedio": float(articulos.mean()), "mediana": float(np.median(articulos)), "p95": float(np.percentile(articulos, 95))}
+
+    def dailySales(self):
+        """(fechas, ingresos): ingreso de cada día del rango, con cero en los días sin ventas."""
+        inicio = (datetime.strptime(self.desde, "%Y-%m-%d") - datetime(1970, 1, 1)).days
+        numDias = (datetime.strptime(self.hasta, "%Y-%m-%d") - datetime.strptime(self.desde, "%Y-%m-%d")).days + 1
+        ingresos = np.bincount(self.dia - inicio, weights=self.ingreso, minlength=numDias)[:numDias]
+        fechas = [datetime.strptime(self.desde, "%Y-%m-%d") + timedelta(days=i) for i in range(numDias)]
+        return fechas, ingresos
+
+    def rollingAverages(self, ventanas=(7, 28)):
+        """
+        Promedios móviles del ingreso diario. Devuelve (fechas, ingresos, {ventana: promedios}); los primeros
+        días, que aún no completan la ventana, quedan como NaN.
+        """
+        fechas, ingresos = self.dailySales()
+        acumulado = np.concatenate(([0.0], np.cumsum(ingresos)))
+        promedios = {}
+        for ventana in ventanas:
+            promedio = np.full(len(ingresos), np.nan)
+            if len(ingresos) >= ventana:
+                promedio[ventana - 1:] = (acumulado[ventana:] - acumulado[:-ventana]) / ventana
+            promedios[ventana] = promedio
+        return fechas, ingresos, promedios
+
+def productNames(dbConnection, ids):
+    """{idProducto: nombre} solo para los IDs indicados (por ejemplo, los primeros de la clasificación ABC)."""
+    ids = [int(i) for i in ids]
+    if not ids: return {}
+    cursor = dbConnection.cursor()
+    cursor.execute(f"SELECT idProducto, nombre FROM productos WHERE idProducto IN ({','.join('?' * len(ids))})", ids)
+    return dict(cursor.fetchall())
@@ -0,0 +1,166 @@
+"""
+API HTTP/JSON local sobre la capa de servicio (service.py).
+
+Permite registrar ventas y consultar precios y reportes sin la interfaz de Tkinter, por ejemplo desde
+un lector de códigos, un kiosco u otra caja de la tienda. Por seguridad escucha solo en localhost.
+
+Rutas:
+    GET  /productos/<codigoBarras>             Consulta de precio por código de barras
+    GET  /productos?buscar=<texto>              Búsqueda por nombre
+    GET  /ventas/<idVenta>                      Venta con sus detalles
+    POST /ventas                                {"items": [{"id": 1, "cantidad": 2}], "metodoPago": "Efectivo", "descuento": 0}
+                                                Pago dividido: "pagos": [{"metodo": "Tarjeta", "monto": 50},
+                                                                         {"metodo": "Efectivo", "monto": 20, "recibido": 50}]
+    POST /devoluciones                          {"idVenta": 10, "items": [{"idProducto": 1, "cantidad": 1}]}
+    POST /gastos                                {"descripcion": "Luz", "monto": 350}
+    POST /recepciones                           {"lineas": [{"codigo": "750...", "cantidad": 12, "costo": 8.5}], "proveedor": "...",
+                                                 "folio": "F-123", "gastos": 150, "usuario": "ana"}  Recepción de mercancía
+    GET  /reportes/<ventas|ganancias|libro-diario>?periodo=<dia|semana|mes>
+    POST /conteo                                {"lecturas": [{"codigo": "750...", "cantidad": 3}]}  Suma lecturas al conteo físico
+    GET  /conteo?completo=<0|1>                 Diferencias del conteo contra el stock
+    POST /conteo/aplicar                        {"completo": false, "usuario": "ana"}  Ajusta el stock a lo contado
+    DELETE /conteo                              Descarta el conteo en curso
+
+Uso:
+    python api.py --port 8765
+"""
+import argparse
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+from database import Database
+from metricas import metricas, ExportadorMetricas
+from service import PosService
+
+ESTADOS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class PosApi:
+    """Servidor HTTP mínimo (HTTP/1.1 con keep-alive) construido sobre asyncio."""
+    def __init__(self, service):
+        self.service = service
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        servidor = await asyncio.start_server(self.handleConnection, host, port)
+        async with servidor:
+            await servidor.serve_forever()
+
+    async def handleConnection(self, reader, writer):
+        """Atiende las peticiones de una conexión hasta que el cliente la cierre."""
+        try:
+            while True:
+                lineaInicial = await reader.readline()
+                if not lineaInicial:
+                    break
+                metodo, ruta, _ = lineaInicial.decode("latin-1").split(" ", 2)
+                encabezados = {}
+                while True:
+                    linea = await reader.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                cuerpo = await reader.readexactly(int(encabezados.get("content-length", 0) or 0))
+
+                estado, respuesta = await self.dispatch(metodo.upper(), ruta, cuerpo)
+                datos = json.dumps(respuesta, ensure_ascii=False, default=str).encode("utf-8")
+                cerrar = encabezados.get("connection", "").lower() == "close"
+                writer.write(
+                    f"HTTP/1.1 {estado} {ESTADOS.get(estado, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(datos)}\r\n"
+                    f"Connection: {'close' if cerrar else 'keep-alive'}\r\n\r\n".encode("latin-1") + datos
+                )
+                await writer.drain()
+                if cerrar:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass # Petición mal formada o cliente desconectado
+        finally:
+            writer.close()
+
+    async def dispatch(self, metodo, ruta, cuerpo):
+        """Resuelve la ruta y convierte los errores de negocio en respuestas HTTP."""
+        partes = urlsplit(ruta)
+        segmentos = [s for s in partes.path.split("/") if s]
+        consulta = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        try:
+            datos = json.loads(cuerpo) if cuerpo else {}
+            return await self.route(metodo, segmentos, consulta, datos)
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    async def route(self, metodo, segmentos, consulta, datos):
+        esperar = asyncio.wrap_future
+        recurso = segmentos[0] if segmentos else ""
+
+        if recurso == "productos" and metodo == "GET":
+            if len(segmentos) == 2:
+                producto = await esperar(self.service.getProducto(segmentos[1]))
+                return (200, producto) if producto else (404, {"error": "Producto no encontrado."})
+            return 200, await esperar(self.service.searchProductos(consulta.get("buscar", "")))
+
+        if recurso == "ventas":
+            if metodo == "GET" and len(segmentos) == 2:
+                venta = await esperar(self.service.getVenta(int(segmentos[1])))
+                return (200, venta) if venta else (404, {"error": "Venta no encontrada."})
+            if metodo == "POST":
+                ventaId = await esperar(self.service.checkout(datos["items"], datos.get("metodoPago", "Efectivo"), datos.get("descuento", 0.0), datos.get("caja"), datos.get("pagos")))
+                return 201, {"idVenta": ventaId}
+
+        if recurso == "devoluciones" and metodo == "POST":
+            ids = await esperar(self.service.registerReturn(int(datos["idVenta"]), datos["items"]))
+            return 201, {"idDevoluciones": ids}
+
+        if recurso == "gastos" and metodo == "POST":
+            gastoId = await esperar(self.service.registerGasto(datos.get("descripcion"), datos.get("monto", 0)))
+            return 201, {"idGasto": gastoId}
+
+        if recurso == "recepciones" and metodo == "POST":
+            return 201, await esperar(self.service.receiveDelivery(datos["lineas"], datos.get("proveedor"), datos.get("folio"), datos.get("gastos", 0.0), datos.get("usuario")))
+
+        if recurso == "conteo":
+            if metodo == "POST" and len(segmentos) == 2 and segmentos[1] == "aplicar":
+                return 201, await esperar(self.service.applyCount(bool(datos.get("completo")), datos.get("usuario")))
+            if metodo == "POST" and len(segmentos) == 1:
+                return 200, self.service.addCounts(datos["lecturas"] if "lecturas" in datos else [datos])
+            if metodo == "GET":
+                diferencias, noEncontrados = await esperar(self.service.getCountVariances(consulta.get("completo") == "1"))
+                columnas = ("idProducto", "codigoBarras", "nombre", "stock", "contado", "diferencia", "costo")
+                return 200, {"diferencias": [dict(zip(columnas, fila)) for fila in diferencias], "noEncontrados": noEncontrados}
+            if metodo == "DELETE":
+                self.service.discardCount()
+                return 200, {"productos": 0}
+
+        if recurso == "reportes" and metodo == "GET" and len(segmentos) == 2:
+            return 200, await esperar(self.service.getReporte(segmentos[1], consulta.get("periodo", "dia")))
+
+        return 404, {"error": "Ruta no encontrada."}
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP/JSON local del punto de venta")
+    parser.add_argument("--db", default="pos.db", help="Archivo de la base de datos")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz de escucha (por defecto solo localhost)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--caja", default="api", help="Identificador de caja para las ventas registradas por la API")
+    parser.add_argument("--ventana-ms", type=float, default=3, help="Ventana para agrupar escrituras en una sola transacción")
+    parser.add_argument("--metrics-port", type=int, default=0, help="Si se indica, publica /metrics (formato Prometheus) en este puerto")
+    args = parser.parse_args()
+
+    db = Database(args.db, caja=args.caja)
+    service = PosService(db, ventanaMs=args.ventana_ms)
+    if args.metrics_port:
+        metricas.attachDatabase(db)
+        ExportadorMetricas(host=args.host, puerto=args.metrics_port).start()
+    print(f"API del punto de venta escuchando en http://{args.host}:{args.port}")
+    try:
+        asyncio.run(PosApi(service).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    main()
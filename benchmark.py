@@ -0,0 +1,218 @@
+"""
+Suite de rendimiento de la capa de modelos (models.py).
+
+Mide cada función de los modelos (búsquedas, reportes, libro diario, Venta.create, devoluciones, gastos,
+tickets en espera...) sobre una base de datos generada con datagen.py y guarda los tiempos en JSON.
+Al pasar un archivo de resultados anterior con --comparar, muestra la diferencia de cada caso y marca
+como regresión los que se volvieron más lentos que el umbral (el programa termina con código 1).
+
+Las escrituras se miden sobre una copia de la base de datos, para que la original quede intacta y
+los resultados de varias corridas sean comparables.
+
+Uso:
+    python datagen.py --db bench.db
+    python benchmark.py --db bench.db --json base.json
+    python benchmark.py --db bench.db --json nuevo.json --comparar base.json --umbral 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database import Database
+from models import Usuario, Categoria, Producto, Venta, Devolucion, Gasto, TicketEnEspera, CambioPrecio, Popularidad
+from analitica import DatosVentas
+from pronostico import refreshForecasts
+from busqueda import IndiceTrigramas
+
+PERIODOS = ('dia', 'semana', 'mes')
+
+def casosLectura(conn, rng, indice):
+    """Devuelve [(nombre, funcion), ...] con las consultas de los modelos y parámetros tomados de la BD."""
+    numProductos = conn.execute("SELECT MAX(idProducto) FROM productos").fetchone()[0] or 1
+    numVentas = conn.execute("SELECT MAX(idVenta) FROM ventas").fetchone()[0] or 1
+    idsProducto = [rng.randint(1, numProductos) for _ in range(64)]
+    codigos = [fila[0] for fila in conn.execute(f"SELECT codigoBarras FROM productos WHERE idProducto IN ({','.join('?' * len(idsProducto))})", idsProducto)]
+    idsVenta = [rng.randint(1, numVentas) for _ in range(64)]
+    idCategoria = conn.execute("SELECT MIN(idCategoria) FROM categorias").fetchone()[0]
+    fechaGastos = (conn.execute("SELECT MAX(DATE(fecha)) FROM gastos").fetchone()[0] or datetime.now().strftime("%Y-%m-%d"))
+    ultimoDia = conn.execute("SELECT MAX(DATE(fecha)) FROM ventas").fetchone()[0] or datetime.now().strftime("%Y-%m-%d")
+    haceUnAnio = (datetime.strptime(ultimoDia, "%Y-%m-%d") - timedelta(days=364)).strftime("%Y-%m-%d")
+    rotar = lambda valores: (valores[i % len(valores)] for i in range(10 ** 9))
+    siguienteCodigo, siguienteProducto, siguienteVenta = rotar(codigos), rotar(idsProducto), rotar(idsVenta)
+
+    casos = [
+        ("Usuario.getAll", lambda: Usuario.getAll(conn)),
+        ("Usuario.verifyCredentials", lambda: Usuario.verifyCredentials(conn, "admin", "admin")),
+        ("Categoria.getAll", lambda: Categoria.getAll(conn)),
+        ("Producto.getAll", lambda: Producto.getAll(conn)),
+        ("Producto.getAll[categoria]", lambda: Producto.getAll(conn, idCategoria)),
+        ("Producto.searchInventory", lambda: Producto.searchInventory(conn, "Choco")),
+        ("Producto.getLowStock", lambda: Producto.getLowStock(conn)),
+        ("Producto.getByBarcode", lambda: Producto.getByBarcode(conn, next(siguienteCodigo))),
+        ("Producto.getById", lambda: Producto.getById(conn, next(siguienteProducto))),
+        ("Producto.searchByName", lambda: Producto.searchByName(conn, "Galletas Bimbo")),
+        ("Producto.searchByName[trigramas]", lambda: Producto.searchByName(conn, "Galletas Bimbo", indice)),
+        ("Producto.searchByName[con errores]", lambda: Producto.searchByName(conn, "galetas bimvo", indice)),
+        ("Producto.searchInventory[trigramas]", lambda: Producto.searchInventory(conn, "Choco", indice)),
+        ("IndiceTrigramas.build", indice.build),
+        ("Popularidad.getScores", lambda: Popularidad.getScores(conn)),
+        ("Venta.getById", lambda: Venta.getById(conn, next(siguienteVenta))),
+        ("Venta.getDashboardData", lambda: Venta.getDashboardData(conn)),
+        ("Venta.getVentasUltimosDias", lambda: Venta.getVentasUltimosDias(conn)),
+        ("Gasto.getByDate", lambda: Gasto.getByDate(conn, fechaGastos)),
+        ("TicketEnEspera.getAll", lambda: TicketEnEspera.getAll(conn)),
+        ("DatosVentas.load[1 año]", lambda: DatosVentas.load(conn, haceUnAnio, ultimoDia)),
+    ]
+    for periodo in PERIODOS:
+        casos += [
+            (f"Venta.getReporteVentas[{periodo}]", lambda p=periodo: Venta.getReporteVentas(conn, p)),
+            (f"Venta.getReporteGanancias[{periodo}]", lambda p=periodo: Venta.getReporteGanancias(conn, p)),
+            (f"Venta.getVentasPorCategoria[{periodo}]", lambda p=periodo: Venta.getVentasPorCategoria(conn, p)),
+            (f"Venta.getTopProductos[{periodo}]", lambda p=periodo: Venta.getTopProductos(conn, p)),
+            (f"Venta.getLibroDiario[{periodo}]", lambda p=periodo: Venta.getLibroDiario(conn, p)),
+        ]
+    return casos
+
+def casosEscritura(conn, rng, repeticiones):
+    """Devuelve [(nombre, funcion), ...] con las escrituras de los modelos. Se ejecutan sobre una copia de la BD."""
+    productos = conn.execute("SELECT idProducto, nombre, precioVenta FROM productos WHERE nombre != 'Recarga Celular' ORDER BY stock DESC LIMIT 200").fetchall()
+    # Stock suficiente para que ninguna venta de la prueba falle
+    conn.execute(f"""
+        INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad)
+        SELECT idProducto, datetime('now', 'localtime'), 'reabasto', 1000000 FROM productos WHERE idProducto IN ({','.join('?' * len(productos))})
+    """, [p[0] for p in productos])
+    conn.commit()
+
+    def carrito():
+        lineas = []
+        for idProducto, nombre, precio in rng.sample(productos, rng.randint(1, 5)):
+            cantidad = rng.randint(1, 3)
+            lineas.append({"id": idProducto, "nombre": nombre, "precio": precio, "cantidad": cantidad, "subtotal": precio * cantidad})
+        return lineas
+
+    # Ventas creadas de antemano para que el caso de devoluciones mida solo Devolucion.create
+    devoluciones = []
+    for _ in range(repeticiones + 1):
+        ventaId = Venta.create(conn, carrito(), "Efectivo", 0.0)
+        detalle = Venta.getById(conn, ventaId)['detalles'][0]
+        devoluciones.append((ventaId, [{"idProducto": detalle['idProducto'], "nombreProducto": detalle['nombre'], "cantidad": 1, "montoDevuelto": detalle['precioUnitario']}]))
+    siguienteDevolucion = iter(devoluciones)
+
+    def estacionarYRecuperar():
+        ticketId = TicketEnEspera.create(conn, "bench", carrito(), 0.0)
+        TicketEnEspera.take(conn, ticketId)
+
+    return [
+        ("Venta.create", lambda: Venta.create(conn, carrito(), "Efectivo", 0.0, caja="bench")),
+        ("Devolucion.create", lambda: Devolucion.create(conn, *next(siguienteDevolucion))),
+        ("Gasto.create", lambda: Gasto.create(conn, "Gasto de prueba", 10.0)),
+        ("Producto.updateStock", lambda: Producto.updateStock(conn, rng.choice(productos)[0], 1)),
+        ("TicketEnEspera.create+take", estacionarYRecuperar),
+        ("refreshForecasts[completo]", lambda: refreshForecasts(conn, completo=True)),
+        ("CambioPrecio[todo +1 %]", lambda: CambioPrecio.apply(conn, CambioPrecio.planByCategory(conn, None, "precio", 1), "bench")),
+    ]
+
+def medir(funcion, repeticiones, calentamiento=1):
+    """Ejecuta la función y devuelve estadísticas de sus tiempos en milisegundos."""
+    for _ in range(calentamiento):
+        funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "min": round(tiempos[0], 4),
+        "mediana": round(statistics.median(tiempos), 4),
+        "p95": round(tiempos[min(len(tiempos) - 1, int(0.95 * len(tiempos)))], 4),
+        "promedio": round(statistics.fmean(tiempos), 4),
+        "repeticiones": repeticiones,
+    }
+
+def ejecutar(dbPath, repeticiones, filtro=None, semilla=1):
+    rng = random.Random(semilla)
+    db = Database(dbPath)
+    conn = db.connect()
+    resultados = {}
+
+    meta = {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "db": os.path.abspath(dbPath),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "repeticiones": repeticiones,
+    }
+    for tabla in ("productos", "ventas", "detallesVenta", "devoluciones", "gastos"):
+        meta[tabla] = conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+    indice = IndiceTrigramas()
+    indice.attachDatabase(db)
+    for nombre, funcion in casosLectura(conn, rng, indice):
+        if filtro and filtro not in nombre: continue
+        resultados[nombre] = medir(funcion, repeticiones)
+        print(f"{nombre:<40} {resultados[nombre]['mediana']:>10.3f} ms")
+    indice.close()
+    conn.close()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        copia = os.path.join(carpeta, "copia.db")
+        db.backup(copia)
+        connCopia = Database(copia).connect()
+        for nombre, funcion in casosEscritura(connCopia, rng, repeticiones):
+            if filtro and filtro not in nombre: continue
+            resultados[nombre] = medir(funcion, repeticiones)
+            print(f"{nombre:<40} {resultados[nombre]['mediana']:>10.3f} ms")
+        connCopia.close()
+    return {"meta": meta, "resultados": resultados}
+
+def comparar(actual, anterior, umbral):
+    """Imprime la diferencia de medianas contra una corrida anterior. Devuelve la lista de regresiones."""
+    regresiones = []
+    print(f"\n{'Caso':<40} {'Antes':>10} {'Ahora':>10} {'Cambio':>8}")
+    for nombre, datos in actual["resultados"].items():
+        previo = anterior["resultados"].get(nombre)
+        if not previo:
+            print(f"{nombre:<40} {'-':>10} {datos['mediana']:>10.3f}    nuevo")
+            continue
+        cambio = (datos["mediana"] - previo["mediana"]) / previo["mediana"] if previo["mediana"] else 0.0
+        marca = "  REGRESIÓN" if cambio > umbral else ""
+        print(f"{nombre:<40} {previo['mediana']:>10.3f} {datos['mediana']:>10.3f} {cambio:>+8.0%}{marca}")
+        if marca:
+            regresiones.append(nombre)
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el rendimiento de las funciones de models.py")
+    parser.add_argument("--db", default="bench.db", help="BD generada con datagen.py (no se modifica)")
+    parser.add_argument("--repeticiones", type=int, default=20, help="Repeticiones por caso")
+    parser.add_argument("--filtro", help="Solo ejecuta los casos cuyo nombre contenga este texto")
+    parser.add_argument("--json", help="Guarda los resultados en este archivo JSON")
+    parser.add_argument("--comparar", help="Archivo JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Aumento de la mediana considerado regresión (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"No existe '{args.db}'. Genérela primero con: python datagen.py --db {args.db}")
+    reporte = ejecutar(args.db, args.repeticiones, args.filtro)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(reporte, json.load(f), args.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} caso(s) con regresión: {', '.join(regresiones)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import json
+import os
+
+class BitacoraCarrito:
+    """
+    Bitácora de solo-agregar (append-only) de las operaciones del carrito.
+
+    Cada cambio del carrito se escribe como una línea JSON pequeña en un archivo local, de modo que si
+    el proceso del punto de venta termina inesperadamente, el carrito se reconstruye al volver a abrir.
+    Cada línea guarda el estado final de la línea afectada (no el incremento), así que reproducir la
+    bitácora es idempotente. Al vaciar el carrito (venta confirmada o ticket en espera) el archivo se
+    trunca, por lo que nunca contiene más que el carrito en curso.
+    """
+    def __init__(self, ruta="carrito.journal"):
+        self.ruta = ruta
+        self.archivo = None
+        self.carrito = None
+
+    def attach(self, carrito):
+        """
+        Reproduce la bitácora existente sobre el carrito y empieza a registrar sus cambios.
+        Devuelve el número de líneas que se recuperaron.
+        """
+        self.carrito = carrito
+        self.replay(carrito)
+        # Se compacta: el archivo queda con el estado actual en lugar del historial completo.
+        # Se escribe a un temporal y se reemplaza, para no perder la bitácora si falla a la mitad.
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for item in carrito:
+                f.write(self.encode(self.recordFor(item)))
+            if carrito.descuentoPorcentaje:
+                f.write(self.encode({"o": "%", "v": carrito.descuentoPorcentaje}))
+        os.replace(temporal, self.ruta)
+        self.archivo = open(self.ruta, "a", encoding="utf-8")
+        carrito.subscribe(self.onCarritoChange)
+        return len(carrito)
+
+    def replay(self, carrito):
+        """Aplica sobre el carrito las operaciones guardadas en el archivo."""
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    # Una línea incompleta solo puede ser la última (escritura interrumpida); se ignora
+                    continue
+                operacion = registro.get("o")
+                if operacion == "s":
+                    carrito.setItem(registro["id"], registro["n"], registro["p"], registro["c"])
+                elif operacion == "d":
+                    carrito.removeItem(registro["id"], registro["p"])
+                elif operacion == "%":
+                    carrito.setDescuento(registro["v"])
+
+    def recordFor(self, item):
+        return {"o": "s", "id": item.id, "n": item.nombre, "p": item.precio, "c": item.cantidad}
+
+    def write(self, registro):
+        """Agrega una línea al archivo. Es una sola escritura pequeña, sin fsync, para no frenar el escaneo."""
+        self.archivo.write(self.encode(registro))
+        self.archivo.flush()
+
+    def encode(self, registro):
+        return json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def onCarritoChange(self, evento, posicion, item):
+        """Suscriptor del carrito: traduce cada evento a un registro de la bitácora."""
+        if evento in ('agregado', 'modificado'):
+            self.write(self.recordFor(item))
+        elif evento == 'eliminado':
+            self.write({"o": "d", "id": item.id, "p": item.precio})
+        elif evento == 'descuento':
+            self.write({"o": "%", "v": self.carrito.descuentoPorcentaje})
+        elif evento == 'vaciado':
+            # El carrito quedó vacío: basta con truncar el archivo
+            self.archivo.truncate(0)
+            self.archivo.seek(0)
+
+    def close(self):
+        if self.archivo:
+            self.archivo.close()
+            self.archivo = None
@@ -0,0 +1,205 @@
+"""
+Búsqueda de productos por nombre tolerante a errores de escritura.
+
+Los nombres se normalizan (minúsculas, sin acentos ni signos: "Lápiz" y "lapiz" son iguales) y se parten en
+trigramas, los grupos de tres letras de cada palabra ("cuaderno" -> "  c", " cu", "cua", "uad", ...). Un
+producto es candidato si comparte suficientes trigramas con lo que se escribió, así que "cuadrno" o
+"celomagico" encuentran "Cuaderno..." y "Cinta Celo Mágico" aunque LIKE no encuentre nada.
+
+El índice vive en memoria: se construye al arrancar con todos los nombres (listas de productos por
+trigrama en arreglos de NumPy) y cada búsqueda cuenta las coincidencias con un solo bincount. Después se
+actualiza de forma incremental, como LibroStock: 'PRAGMA data_version' indica si otra conexión escribió y
+solo se vuelven a indexar los productos cuya 'versionNombre' cambió (altas y cambios de nombre).
+
+Las sugerencias del punto de venta se ordenan además por popularidad reciente (RankingPopularidad): entre
+varios cuadernos igual de parecidos a lo escrito, primero el que más se vende.
+"""
+import heapq
+import math
+import time
+import unicodedata
+from itertools import chain
+
+import numpy as np
+
+from models import Popularidad
+
+MIN_SIMILITUD = 0.45 # Fracción mínima de los trigramas de la búsqueda que debe tener el nombre
+MAX_PENDIENTES = 2000 # Productos reindexados fuera de los arreglos antes de reconstruir el índice completo
+PESO_POPULARIDAD = 0.3 # Cuánto suma a la similitud el producto más vendido (los demás, en escala logarítmica)
+MAX_EDAD_POPULARIDAD_SEG = 600 # Cada cuánto se releen los puntajes de popularidad (incluyen las ventas de otras cajas)
+
+# Después de quitar los acentos todo es ASCII: cualquier signo separa palabras (los saltos de línea se conservan)
+SEPARADORES = str.maketrans({chr(c): " " for c in range(128) if not chr(c).isalnum() and chr(c) != "\n"})
+
+def foldText(texto):
+    """Texto normalizado para comparar: minúsculas, sin acentos y sin signos."""
+    return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii").lower().translate(SEPARADORES)
+
+def wordTrigrams(palabra):
+    """Trigramas de una palabra ya normalizada, con dos espacios al inicio y uno al final."""
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+class IndiceTrigramas:
+    """
+    Índice de trigramas de los nombres de los productos, para usarse desde un solo hilo (el de la interfaz).
+    Hasta que se llama a attachDatabase, las búsquedas no devuelven nada y los modelos buscan con LIKE.
+    """
+    def __init__(self, minSimilitud=MIN_SIMILITUD, maxPendientes=MAX_PENDIENTES):
+        self.minSimilitud, self.maxPendientes = minSimilitud, maxPendientes
+        self.conn = None
+        self.numeros = {} # trigrama -> número de trigrama
+        self.palabras = {} # palabra normalizada -> números de sus trigramas (los nombres repiten mucho las palabras)
+        self.pendientes = {} # idProducto -> trigramas de los productos indexados después de construir los arreglos
+        self.version = -1
+        self.dataVersion = None
+
+    def attachDatabase(self, db_instance):
+        """Construye el índice con todos los productos de la BD (se llama una vez, al arrancar)."""
+        self.conn = db_instance.connect() # Conexión propia, de larga vida, para detectar cambios de otras conexiones
+        self.build()
+
+    def trigramsOf(self, nombre, agregar=True, normalizado=False):
+        """Números de los trigramas de un nombre. Sin 'agregar', los trigramas nuevos se ignoran (búsquedas)."""
+        numeros = set()
+        for palabra in (nombre if normalizado else foldText(nombre)).split():
+            conocidos = self.palabras.get(palabra)
+            if conocidos is None:
+                conocidos = []
+                for trigrama in wordTrigrams(palabra):
+                    numero = self.numeros.get(trigrama)
+                    if numero is None and agregar:
+                        numero = self.numeros[trigrama] = len(self.numeros)
+                    if numero is not None:
+                        conocidos.append(numero)
+                if not agregar:
+                    numeros.update(conocidos)
+                    continue
+                conocidos = self.palabras[palabra] = tuple(conocidos)
+            numeros.update(conocidos)
+        return numeros
+
+    def build(self):
+        """Indexa todos los productos: por cada trigrama, el arreglo de productos que lo contienen."""
+        self.dataVersion = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        filas = self.conn.execute("SELECT idProducto, nombre, versionNombre FROM productos").fetchall()
+        ids = [fila[0] for fila in filas]
+        self.version = max((fila[2] or 0 for fila in filas), default=self.version)
+        # Todos los nombres se normalizan juntos, uno por línea: una sola llamada en lugar de una por producto
+        nombres = foldText("\n".join(fila[1].replace("\n", " ") for fila in filas)).split("\n") if filas else []
+        trigramas = [self.trigramsOf(nombre, normalizado=True) for nombre in nombres]
+        tamanos = np.fromiter(map(len, trigramas), dtype=np.int64, count=len(trigramas))
+        planos = np.fromiter(chain.from_iterable(trigramas), dtype=np.int64, count=int(tamanos.sum()))
+        productos = np.repeat(np.array(ids, dtype=np.int64), tamanos)
+        orden = np.argsort(planos, kind="stable")
+        self.postings = productos[orden].astype(np.int32) # Productos agrupados por trigrama
+        self.inicios = np.searchsorted(planos[orden], np.arange(len(self.numeros) + 1)) # Dónde empieza cada trigrama
+        self.tamanos = np.zeros(max(ids, default=0) + 1, dtype=np.int32) # Trigramas distintos de cada nombre
+        self.tamanos[ids] = tamanos
+        self.vigente = np.zeros(len(self.tamanos), dtype=bool) # Productos cuyos trigramas en los arreglos son los actuales
+        self.vigente[ids] = True
+        self.pendientes = {}
+
+    def refresh(self):
+        """Reindexa solo los productos creados o renombrados desde la última actualización."""
+        dataVersion = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if dataVersion == self.dataVersion:
+            return # Nadie más ha escrito en la BD
+        self.dataVersion = dataVersion
+        cursor = self.conn.execute("SELECT idProducto, nombre, versionNombre FROM productos WHERE versionNombre > ?", (self.version,))
+        for idProducto, nombre, version in cursor:
+            self.pendientes[idProducto] = self.trigramsOf(nombre)
+            if idProducto < len(self.vigente):
+                self.vigente[idProducto] = False
+            self.version = max(self.version, version)
+        if len(self.pendientes) > self.maxPendientes:
+            self.build()
+
+    def remove(self, ids):
+        """Saca del índice productos que ya no existen (se detectan al leer los resultados de una búsqueda)."""
+        for idProducto in ids:
+            self.pendientes.pop(idProducto, None)
+            if idProducto < len(self.vigente):
+                self.vigente[idProducto] = False
+
+    def search(self, texto, limit=50):
+        """
+        Pares (idProducto, similitud) de los productos más parecidos a 'texto', del más al menos parecido. La
+        similitud es la fracción de los trigramas de la búsqueda que aparecen en el nombre, más un poco a favor
+        del nombre más corto (máximo 1.1).
+        """
+        if self.conn is None:
+            return []
+        self.refresh()
+        consulta = self.trigramsOf(texto, agregar=False)
+        total = len(set().union(*map(wordTrigrams, foldText(texto).split()))) # Incluye los trigramas que ningún nombre tiene
+        if not consulta:
+            return []
+        listas = [self.postings[self.inicios[n]:self.inicios[n + 1]] for n in consulta if n + 1 < len(self.inicios)]
+        comunes = np.bincount(np.concatenate(listas), minlength=len(self.tamanos)) if listas else np.zeros(len(self.tamanos), dtype=np.int64)
+        comunes[~self.vigente] = 0
+        candidatos = np.flatnonzero(comunes >= self.minSimilitud * total)
+        puntaje = comunes[candidatos] / total + 0.1 * comunes[candidatos] / self.tamanos[candidatos]
+        if len(candidatos) > limit:
+            mejores = np.argpartition(-puntaje, limit)[:limit]
+            candidatos, puntaje = candidatos[mejores], puntaje[mejores]
+        resultados = list(zip(puntaje.tolist(), candidatos.tolist()))
+        for idProducto, trigramas in self.pendientes.items():
+            enComun = len(consulta & trigramas)
+            if enComun >= self.minSimilitud * total:
+                resultados.append((enComun / total + 0.1 * enComun / len(trigramas), idProducto))
+        resultados.sort(key=lambda r: (-r[0], r[1]))
+        return [(idProducto, similitud) for similitud, idProducto in resultados[:limit]]
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class RankingPopularidad:
+    """
+    Ordena las sugerencias de búsqueda por similitud y popularidad reciente. Los puntajes (tabla popularidad,
+    que cada venta actualiza en su transacción) se guardan en memoria: se releen cada 'maxEdadSeg' segundos
+    y las ventas de esta caja se suman al momento con recordSale.
+    """
+    def __init__(self, peso=PESO_POPULARIDAD, maxEdadSeg=MAX_EDAD_POPULARIDAD_SEG):
+        self.peso, self.maxEdadSeg = peso, maxEdadSeg
+        self.db = None
+        self.puntajes = {} # idProducto -> unidades vendidas con decaimiento
+        self.escala = 1.0 # log1p del mayor puntaje, para que el más vendido sume exactamente 'peso'
+        self.cargado = None
+
+    def attachDatabase(self, db_instance):
+        self.db = db_instance
+        self.refresh()
+
+    def refresh(self):
+        """Relee los puntajes si la copia en memoria ya es más vieja que 'maxEdadSeg'."""
+        if self.db is None or (self.cargado is not None and time.monotonic() - self.cargado < self.maxEdadSeg):
+            return
+        with self.db.connect() as conn:
+            self.puntajes = Popularidad.getScores(conn)
+        self.escala = math.log1p(max(self.puntajes.values(), default=0.0)) or 1.0
+        self.cargado = time.monotonic()
+
+    def recordSale(self, items):
+        """Suma a la copia en memoria una venta ya confirmada en la BD (lista de dicts con 'id' y 'cantidad')."""
+        for item in items:
+            self.puntajes[item['id']] = self.puntajes.get(item['id'], 0.0) + item['cantidad']
+        self.escala = max(self.escala, math.log1p(max(self.puntajes.values(), default=0.0)))
+
+    def score(self, producto):
+        """Similitud con la búsqueda (1.0 si se encontró con LIKE) más el aporte de la popularidad."""
+        return producto.get('similitud', 1.0) + self.peso * math.log1p(self.puntajes.get(producto['idProducto'], 0.0)) / self.escala
+
+    def top(self, productos, k):
+        """
+        Los 'k' productos con mayor puntaje, de mayor a menor, con un heap (no se ordena toda la lista). Entre
+        puntajes iguales se conserva el orden recibido.
+        """
+        self.refresh()
+        return heapq.nlargest(k, productos, key=self.score)
+
+indice = IndiceTrigramas()
+ranking = RankingPopularidad()
@@ -0,0 +1,176 @@
+class ItemCarrito:
+    """
+    Una línea del carrito de compras.
+    Usa __slots__ porque se crean y modifican muchas durante el día y no necesitan atributos dinámicos.
+    """
+    __slots__ = ("id", "nombre", "precio", "cantidad", "subtotal", "posicion")
+
+    def __init__(self, idProducto, nombre, precio, cantidad, posicion=0):
+        self.id = idProducto
+        self.nombre = nombre
+        self.precio = precio
+        self.cantidad = cantidad
+        self.subtotal = precio * cantidad
+        self.posicion = posicion # Lugar de la línea en Carrito.items (lo mantiene el carrito)
+
+    def __getitem__(self, clave):
+        """Permite leer la línea como si fuera un diccionario (item['subtotal']), igual que el carrito anterior."""
+        try:
+            return getattr(self, clave)
+        except AttributeError:
+            raise KeyError(clave)
+
+    def toDict(self):
+        """Devuelve la línea como diccionario, el formato que esperan Venta.create y generarTicketPdf."""
+        return {"id": self.id, "nombre": self.nombre, "precio": self.precio, "cantidad": self.cantidad, "subtotal": self.subtotal}
+
+
+class Carrito:
+    """
+    Modelo del carrito de compras, independiente de la interfaz gráfica.
+
+    Mantiene un índice por (idProducto, precio) para encontrar una línea sin recorrer la lista (cada
+    línea guarda su posición), lleva el subtotal acumulado y avisa de cada cambio a los suscriptores
+    para que la vista solo redibuje la línea afectada.
+
+    Los eventos se notifican como callback(evento, posicion, item), donde evento es uno de:
+    'agregado', 'modificado', 'eliminado', 'vaciado' o 'descuento'.
+    """
+    def __init__(self):
+        self.items = [] # Líneas en el orden en que se muestran
+        self.indice = {} # (idProducto, precio) -> ItemCarrito
+        self.cantidadPorProducto = {} # idProducto -> unidades en el carrito (todas sus líneas)
+        self.subtotal = 0.0
+        self.descuentoPorcentaje = 0.0
+        self.suscriptores = []
+
+    # --- Suscripción a cambios ---
+
+    def subscribe(self, callback):
+        """Registra una función que será llamada en cada cambio del carrito."""
+        self.suscriptores.append(callback)
+
+    def notify(self, evento, posicion=None, item=None):
+        for callback in self.suscriptores:
+            callback(evento, posicion, item)
+
+    # --- Consultas ---
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, posicion):
+        return self.items[posicion]
+
+    def cantidadDe(self, idProducto):
+        """Unidades de un producto que ya están en el carrito, sin importar el precio."""
+        return self.cantidadPorProducto.get(idProducto, 0)
+
+    def getItem(self, idProducto, precio):
+        """Busca la línea de un producto con un precio dado. Devuelve None si no existe."""
+        return self.indice.get((idProducto, precio))
+
+    @property
+    def descuentoMonto(self):
+        return self.subtotal * (self.descuentoPorcentaje / 100)
+
+    @property
+    def total(self):
+        return self.subtotal - self.descuentoMonto
+
+    def toList(self):
+        """Devuelve las líneas como lista de diccionarios (formato usado por Venta.create)."""
+        return [item.toDict() for item in self.items]
+
+    # --- Modificaciones ---
+
+    def add(self, idProducto, nombre, precio, cantidad=1):
+        """
+        Agrega unidades de un producto. Si ya existe una línea con el mismo producto y precio,
+        solo incrementa su cantidad. Devuelve la línea afectada.
+        """
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser mayor a cero.")
+        item = self.indice.get((idProducto, precio))
+        if item:
+            self.changeCantidad(item, item.cantidad + cantidad)
+            self.notify('modificado', item.posicion, item)
+        else:
+            item = ItemCarrito(idProducto, nombre, precio, cantidad, len(self.items))
+            self.items.append(item)
+            self.indice[(idProducto, precio)] = item
+            self.cantidadPorProducto[idProducto] = self.cantidadDe(idProducto) + cantidad
+            self.subtotal += item.subtotal
+            self.notify('agregado', len(self.items) - 1, item)
+        return item
+
+    def setItem(self, idProducto, nombre, precio, cantidad):
+        """
+        Deja la línea (idProducto, precio) con la cantidad exacta indicada, creándola si no existe.
+        Se usa para reconstruir un carrito guardado (bitácora o tickets en espera).
+        """
+        item = self.indice.get((idProducto, precio))
+        if item is None:
+            return self.add(idProducto, nombre, precio, cantidad)
+        self.setCantidad(item.posicion, cantidad)
+        return item
+
+    def removeItem(self, idProducto, precio):
+        """Elimina la línea (idProducto, precio) si existe."""
+        item = self.indice.get((idProducto, precio))
+        if item is not None:
+            self.remove(item.posicion)
+
+    def setCantidad(self, posicion, cantidad):
+        """Fija la cantidad de la línea en la posición dada. Una cantidad de 0 elimina la línea."""
+        if cantidad < 0:
+            raise ValueError("La cantidad no puede ser negativa.")
+        if cantidad == 0:
+            self.remove(posicion)
+            return
+        item = self.items[posicion]
+        self.changeCantidad(item, cantidad)
+        self.notify('modificado', posicion, item)
+
+    def changeCantidad(self, item, cantidad):
+        """Actualiza cantidad, subtotal y acumulados de una línea sin notificar."""
+        diferencia = cantidad - item.cantidad
+        nuevoSubtotal = item.precio * cantidad
+        self.subtotal += nuevoSubtotal - item.subtotal
+        self.cantidadPorProducto[item.id] = self.cantidadDe(item.id) + diferencia
+        item.cantidad = cantidad
+        item.subtotal = nuevoSubtotal
+
+    def remove(self, posicion):
+        """Elimina la línea en la posición dada."""
+        item = self.items.pop(posicion)
+        for siguiente in self.items[posicion:]: # Las líneas posteriores suben un lugar
+            siguiente.posicion -= 1
+        del self.indice[(item.id, item.precio)]
+        restante = self.cantidadDe(item.id) - item.cantidad
+        if restante > 0:
+            self.cantidadPorProducto[item.id] = restante
+        else:
+            self.cantidadPorProducto.pop(item.id, None)
+        # Al vaciarse se reinicia en cero para no arrastrar errores de redondeo
+        self.subtotal = self.subtotal - item.subtotal if self.items else 0.0
+        self.notify('eliminado', posicion, item)
+
+    def clear(self):
+        """Vacía el carrito y quita el descuento."""
+        self.items.clear()
+        self.indice.clear()
+        self.cantidadPorProducto.clear()
+        self.subtotal = 0.0
+        self.descuentoPorcentaje = 0.0
+        self.notify('vaciado')
+
+    def setDescuento(self, porcentaje):
+        """Aplica un descuento porcentual a todo el carrito."""
+        if not 0 <= porcentaje <= 100:
+            raise ValueError("El descuento debe estar entre 0 y 100%.")
+        self.descuentoPorcentaje = porcentaje
+        self.notify('descuento')
@@ -0,0 +1,66 @@
+"""
+Catálogo de productos en memoria para las pantallas que muestran una y otra vez los mismos productos (teclas
+rápidas, navegación por categoría): los diccionarios completos de cada producto (como los de Producto.getById, con
+'categoriaNombre') por idProducto, leídos con una sola consulta por lote.
+
+La copia se invalida como el LibroStock: 'PRAGMA data_version' indica si otra conexión escribió, y solo en
+ese caso se leen los contadores 'versionPrecios' (cambios de precio y recepciones) y 'versionNombre' (altas
+y ediciones de productos); si alguno cambió, se descarta todo. El stock de estos diccionarios es el de la
+carga: para validar una venta se usa el LibroStock.
+"""
+
+class CatalogoProductos:
+    """Productos por idProducto, para usarse desde un solo hilo (el de la interfaz)."""
+    def __init__(self, db_instance):
+        self.conn = db_instance.connect() # Conexión propia, de larga vida, para detectar cambios de otras conexiones
+        self.productos = {} # idProducto -> diccionario del producto
+        self.categorias = {} # idCategoria -> IDs de sus productos, en orden de nombre
+        self.version = None # (versionNombre, versionPrecios) de la copia
+        self.dataVersion = None
+
+    def refresh(self):
+        """Descarta la copia si cambiaron precios o productos. Devuelve True si se descartó."""
+        dataVersion = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if dataVersion == self.dataVersion:
+            return False # Nadie más ha escrito en la BD
+        self.dataVersion = dataVersion
+        version = tuple(self.conn.execute("SELECT valor FROM contadores WHERE nombre IN ('versionNombre', 'versionPrecios') ORDER BY nombre").fetchall())
+        if version == self.version:
+            return False
+        descartada = self.version is not None
+        self.productos, self.categorias, self.version = {}, {}, version
+        return descartada
+
+    def load(self, filtro, params=()):
+        """Lee en una consulta los productos que cumplen 'filtro' (condición sobre 'p') y devuelve sus IDs en orden de nombre."""
+        cursor = self.conn.execute(f"""
+            SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') AS categoriaNombre
+            FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
+            WHERE {filtro} ORDER BY p.nombre
+        """, params)
+        columnas = [description[0] for description in cursor.description]
+        ids = []
+        for fila in cursor:
+            self.productos[fila[0]] = dict(zip(columnas, fila))
+            ids.append(fila[0])
+        return ids
+
+    def get(self, ids):
+        """Diccionarios de los productos 'ids', en ese orden (se omiten los que no existen). Los que faltan se leen juntos."""
+        self.refresh()
+        faltantes = [idProducto for idProducto in ids if idProducto not in self.productos]
+        if faltantes:
+            encontrados = set(self.load(f"p.idProducto IN ({','.join('?' * len(faltantes))})", faltantes))
+            self.productos.update((idProducto, None) for idProducto in faltantes if idProducto not in encontrados) # Eliminados: no se vuelven a buscar
+        return [self.productos[idProducto] for idProducto in ids if self.productos[idProducto] is not None]
+
+    def getCategory(self, idCategoria):
+        """Diccionarios de todos los productos de una categoría, por nombre. La primera vez se leen en una consulta."""
+        self.refresh()
+        ids = self.categorias.get(idCategoria)
+        if ids is None:
+            ids = self.categorias[idCategoria] = self.load("p.idCategoria = ?", (idCategoria,))
+        return [self.productos[idProducto] for idProducto in ids]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,112 @@
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from database import isBusyError
+from metricas import metricas
+
+class ColaEscritura(threading.Thread):
+    """
+    Cola de escritura con un único hilo escritor y confirmación agrupada (group commit).
+
+    Cualquier hilo puede encolar una intención de escritura (Venta.create, Devolucion.create, Gasto.create o
+    cualquier función con la firma funcion(conexion, *args, commit=False)) y recibe un Future propio con el
+    resultado, normalmente el ID asignado. El escritor toma la primera intención y espera unos milisegundos
+    ('ventanaMs') a que lleguen más; todas las que llegan en esa ventana se ejecutan en una sola transacción
+    y se confirman con un solo COMMIT, es decir, un solo fsync para todo el lote.
+
+    Cada intención va en su propio SAVEPOINT: si una falla (por ejemplo, falta de stock) solo se deshace esa
+    y su Future recibe la excepción; las demás del lote se confirman normalmente.
+
+    Las métricas que las intenciones difieren (metricas.defer, por ejemplo las de Venta.create) se registran
+    solo después de que el COMMIT del lote tiene éxito, así que un lote reintentado no las cuenta dos veces.
+    """
+    def __init__(self, db_instance, ventanaMs=3, maxLote=128, intentos=5):
+        super().__init__(name="ColaEscritura", daemon=True)
+        self.db = db_instance
+        self.ventana = ventanaMs / 1000
+        self.maxLote = maxLote
+        self.intentos = intentos
+        self.cola = queue.Queue()
+        # Estadísticas acumuladas (lotes confirmados e intenciones procesadas)
+        self.lotes = 0
+        self.intenciones = 0
+
+    def submit(self, funcion, *args):
+        """Encola una escritura y devuelve un Future con el resultado de funcion(conexion, *args, commit=False)."""
+        future = Future()
+        self.cola.put((funcion, args, future))
+        return future
+
+    def stop(self):
+        """Procesa lo que ya esté en la cola y termina el hilo."""
+        self.cola.put(None)
+
+    def run(self):
+        conn = self.db.connect()
+        conn.isolation_level = None # Control manual de la transacción (BEGIN IMMEDIATE / SAVEPOINT / COMMIT)
+        terminar = False
+        while not terminar:
+            primera = self.cola.get()
+            if primera is None: break
+            lote = [primera]
+            # Ventana de agrupación: se esperan más intenciones hasta que pase la ventana o se llene el lote
+            limite = time.monotonic() + self.ventana
+            while len(lote) < self.maxLote:
+                restante = limite - time.monotonic()
+                try:
+                    siguiente = self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    terminar = True
+                    break
+                lote.append(siguiente)
+            self.executeBatch(conn, lote)
+        conn.close()
+
+    def executeBatch(self, conn, lote):
+        """Ejecuta un lote en una transacción, reintentando el lote completo si la BD está ocupada por otra caja."""
+        for intento in range(self.intentos):
+            try:
+                resultados = self.runTransaction(conn, lote)
+                break
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if not isBusyError(e) or intento == self.intentos - 1:
+                    # Falló la transacción completa: todas las intenciones del lote reciben el error
+                    for _, _, future in lote:
+                        future.set_exception(e)
+                    return
+                time.sleep(0.05 * (2 ** intento) * (0.5 + random.random()))
+        self.lotes += 1
+        self.intenciones += len(lote)
+        metricas.loteEscritura.observe(len(lote))
+        for future, resultado, error, pendientes in resultados:
+            metricas.applyCaptured(pendientes)
+            if error is None:
+                future.set_result(resultado)
+            else:
+                future.set_exception(error)
+
+    def runTransaction(self, conn, lote):
+        resultados = []
+        conn.execute("BEGIN IMMEDIATE")
+        for i, (funcion, args, future) in enumerate(lote):
+            conn.execute(f"SAVEPOINT intento{i}")
+            metricas.capture()
+            try:
+                resultado = funcion(conn, *args, commit=False)
+                conn.execute(f"RELEASE intento{i}")
+                resultados.append((future, resultado, None, metricas.takeCaptured()))
+            except Exception as e:
+                pendientes = metricas.takeCaptured()
+                if isBusyError(e): raise
+                conn.execute(f"ROLLBACK TO intento{i}")
+                conn.execute(f"RELEASE intento{i}")
+                resultados.append((future, None, e, pendientes))
+        conn.execute("COMMIT")
+        return resultados
@@ -0,0 +1,106 @@
+"""
+Conteo físico de inventario (toma de inventario).
+
+Las lecturas del escáner se acumulan en memoria en un ConteoInventario: un diccionario código -> unidades
+contadas. Pueden llegar tecleadas o escaneadas en la ventana de conteo, desde el archivo que descarga un
+lector (un código por línea, o 'codigo,cantidad') o por la API local desde varios lectores a la vez.
+
+Al terminar, AjusteInventario.getVariances (models.py) compara todo el conteo contra productos.stock con
+un solo JOIN y AjusteInventario.apply deja el stock igual a lo contado en una sola transacción,
+registrando cada ajuste en el libro 'ajustesInventario'.
+"""
+import math
+import threading
+
+class ConteoInventario:
+    """Unidades contadas por código de barras. Seguro para recibir lecturas desde varios hilos."""
+    def __init__(self):
+        self.cantidades = {} # codigoBarras -> unidades contadas
+        self.lecturas = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cantidades)
+
+    @staticmethod
+    def parseQuantity(cantidad):
+        """Solo números enteros finitos: '3', 3 o 3.0 (2.7, 'nan' o 1e999 se rechazan, no se truncan)."""
+        try:
+            valor = float(cantidad)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"La cantidad '{cantidad}' no es un número entero.")
+        if not math.isfinite(valor) or not valor.is_integer():
+            raise ValueError(f"La cantidad '{cantidad}' no es un número entero.")
+        return int(valor)
+
+    @staticmethod
+    def parseCode(codigo):
+        codigo = str(codigo).strip() if codigo is not None else ""
+        if not codigo:
+            raise ValueError("El código está vacío.")
+        return codigo
+
+    def add(self, codigo, cantidad=1):
+        """Suma una lectura (por defecto, una unidad). Devuelve el total contado del código."""
+        codigo = self.parseCode(codigo)
+        return self.addBatch([(codigo, cantidad)])[codigo]
+
+    def addBatch(self, lecturas):
+        """
+        Suma un lote de lecturas [(codigo, cantidad), ...] completo o nada: si alguna lectura no es válida o
+        dejaría un conteo negativo, no se suma ninguna (ValueError). Devuelve {codigo: total contado}.
+        """
+        validas = [(self.parseCode(codigo), self.parseQuantity(cantidad)) for codigo, cantidad in lecturas]
+        with self.lock:
+            totales = {}
+            for codigo, cantidad in validas:
+                totales[codigo] = totales.get(codigo, self.cantidades.get(codigo, 0)) + cantidad
+            negativos = [codigo for codigo, total in totales.items() if total < 0]
+            if negativos:
+                raise ValueError(f"El conteo de '{negativos[0]}' no puede quedar negativo.")
+            self.cantidades.update(totales)
+            self.lecturas += len(validas)
+            return totales
+
+    def setCount(self, codigo, cantidad):
+        """Corrige el total contado de un código (0 lo quita del conteo)."""
+        cantidad = self.parseQuantity(cantidad)
+        if cantidad < 0:
+            raise ValueError("La cantidad no puede ser negativa.")
+        with self.lock:
+            if cantidad:
+                self.cantidades[str(codigo)] = cantidad
+            else:
+                self.cantidades.pop(str(codigo), None)
+
+    def addLines(self, lineas):
+        """
+        Suma las lecturas de un archivo de lector: un código por línea, o 'codigo,cantidad' (también con
+        ';' o tabulador). Devuelve la lista de errores por línea; las líneas válidas se suman igual.
+        """
+        errores = []
+        for numero, linea in enumerate(lineas, 1):
+            campos = [c.strip() for c in linea.replace(";", ",").replace("\t", ",").split(",")]
+            if not campos[0]: continue
+            try:
+                self.add(campos[0], campos[1] if len(campos) > 1 and campos[1] else 1)
+            except ValueError as e:
+                errores.append(f"Línea {numero}: {e}")
+        return errores
+
+    def snapshot(self):
+        """Copia del conteo actual ({codigo: unidades})."""
+        with self.lock:
+            return dict(self.cantidades)
+
+    def take(self):
+        """Devuelve el conteo actual y deja el acumulador vacío (para aplicarlo sin perder lecturas nuevas)."""
+        with self.lock:
+            cantidades, self.cantidades, self.lecturas = self.cantidades, {}, 0
+            return cantidades
+
+    def merge(self, cantidades):
+        """Devuelve al acumulador un conteo tomado con take() que no se pudo aplicar."""
+        with self.lock:
+            for codigo, cantidad in cantidades.items():
+                self.cantidades[codigo] = self.cantidades.get(codigo, 0) + cantidad
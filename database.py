@@ -1,112 +1,676 @@
-import sqlite3
-
-class Database:
-    """
-    Clase responsable de manejar la conexión y la estructura de la base de datos.
-    Diseñada con una estructura limpia para un negocio local.
-    """
-    def __init__(self, dbPath="pos.db"):
-        self.dbPath = dbPath
-        self.createTables()
-
-    def connect(self):
-        """Crea y devuelve una nueva conexión a la base de datos."""
-        return sqlite3.connect(self.dbPath)
-
-    def createTables(self):
-        """
-        Contiene todo el esquema de la base de datos.
-        Crea las tablas si no existen al iniciar la aplicación.
-        """
-        with self.connect() as conn:
-            cursor = conn.cursor()
-            
-            # --- TABLA DE USUARIOS ---
-            # Almacena las credenciales y roles para el control de acceso.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS usuarios (
-                    idUsuario INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    passwordHash TEXT NOT NULL,
-                    role TEXT NOT NULL
-                )
-            """)
-            
-            # --- TABLA DE CATEGORÍAS ---
-            # Permite agrupar productos para una mejor organización y filtrado.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS categorias (
-                    idCategoria INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT UNIQUE NOT NULL
-                )
-            """)
-            
-            # --- TABLA DE PRODUCTOS ---
-            # El inventario central de la tienda.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS productos (
-                    idProducto INTEGER PRIMARY KEY AUTOINCREMENT,
-                    codigoBarras TEXT UNIQUE NOT NULL,
-                    nombre TEXT NOT NULL,
-                    descripcion TEXT,
-                    precioVenta REAL NOT NULL,
-                    costoCompra REAL DEFAULT 0,
-                    stock INTEGER NOT NULL,
-                    idCategoria INTEGER,
-                    FOREIGN KEY (idCategoria) REFERENCES categorias(idCategoria)
-                )
-            """)
-
-            # --- TABLAS DE OPERACIONES DE VENTA ---
-            # Tabla principal que registra cada transacción.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS ventas (
-                    idVenta INTEGER PRIMARY KEY AUTOINCREMENT,
-                    fecha TEXT NOT NULL,
-                    subtotal REAL NOT NULL,
-                    descuento REAL DEFAULT 0,
-                    totalVenta REAL NOT NULL,
-                    metodoPago TEXT
-                )
-            """)
-            
-            # Tabla que detalla los productos incluidos en cada venta.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS detallesVenta (
-                    idDetalleVenta INTEGER PRIMARY KEY AUTOINCREMENT,
-                    idVenta INTEGER NOT NULL,
-                    idProducto INTEGER NOT NULL,
-                    cantidad INTEGER NOT NULL,
-                    precioUnitario REAL NOT NULL,
-                    subtotal REAL NOT NULL,
-                    FOREIGN KEY (idVenta) REFERENCES ventas(idVenta),
-                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
-                )
-            """)
-
-            # Registra los productos devueltos por los clientes.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS devoluciones (
-                    idDevolucion INTEGER PRIMARY KEY AUTOINCREMENT,
-                    idVentaOriginal INTEGER NOT NULL,
-                    idProducto INTEGER NOT NULL,
-                    cantidad INTEGER NOT NULL,
-                    montoDevuelto REAL NOT NULL,
-                    fecha TEXT NOT NULL,
-                    FOREIGN KEY (idVentaOriginal) REFERENCES ventas(idVenta),
-                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
-                )
-            """)
-            
-            # --- TABLA DE GASTOS ---
-            # Registra salidas de dinero no relacionadas con la compra de inventario.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS gastos (
-                    idGasto INTEGER PRIMARY KEY AUTOINCREMENT,
-                    fecha TEXT NOT NULL,
-                    descripcion TEXT NOT NULL,
-                    monto REAL NOT NULL
-                )
-            """)
-            
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from profiler import PerfilConsultas
+
+UMBRAL_STOCK_DEFECTO = 5 # Stock mínimo de los productos sin mínimo propio ni pronóstico de ventas
+VIDA_MEDIA_POPULARIDAD_DIAS = 14 # Una venta de hace este número de días pesa la mitad que una de hoy en la popularidad
+
+# Tablas cuyo historial se mueve a los archivos anuales (pos-AAAA.db)
+TABLAS_ARCHIVABLES = ("ventas", "detallesVenta", "pagos", "devoluciones")
+MAX_ARCHIVOS_ADJUNTOS = 8 # Años archivados adjuntos a la vez en una conexión (SQLite admite 10 BD adjuntas)
+
+def archivePath(dbPath, anio):
+    """Ruta del archivo anual de una base de datos: pos.db -> pos-2024.db (en la misma carpeta)."""
+    base, extension = os.path.splitext(dbPath)
+    return f"{base}-{anio}{extension or '.db'}"
+
+def archivedYears(dbPath):
+    """Años que ya tienen archivo (pos-AAAA.db) junto a la base de datos."""
+    carpeta = os.path.dirname(os.path.abspath(dbPath))
+    prefijo, sufijo = os.path.basename(archivePath(dbPath, "AAAA")).split("AAAA")
+    anios = []
+    for nombre in os.listdir(carpeta):
+        anio = nombre[len(prefijo):len(nombre) - len(sufijo)]
+        if nombre.startswith(prefijo) and nombre.endswith(sufijo) and len(anio) == 4 and anio.isdigit():
+            anios.append(int(anio))
+    return sorted(anios)
+
+def rebuildPopularity(cursor):
+    """
+    Recalcula la tabla popularidad desde el historial de ventas (sin confirmar). Solo se toman las ventas de
+    las últimas 8 vidas medias (lo anterior pesa menos de 0.4 %); el peso de cada día va en una tabla temporal
+    para no depender de las funciones matemáticas de SQLite.
+    """
+    hoy = datetime.now().date()
+    dias = 8 * VIDA_MEDIA_POPULARIDAD_DIAS
+    cursor.execute("DELETE FROM popularidad")
+    cursor.execute("CREATE TEMP TABLE pesosPopularidad (dia TEXT PRIMARY KEY, peso REAL NOT NULL)")
+    cursor.executemany("INSERT INTO temp.pesosPopularidad (dia, peso) VALUES (?, ?)",
+                       [((hoy - timedelta(days=n)).isoformat(), 0.5 ** (n / VIDA_MEDIA_POPULARIDAD_DIAS)) for n in range(dias)])
+    cursor.execute("""
+        INSERT INTO popularidad (idProducto, puntaje, dia)
+        SELECT dv.idProducto, SUM(dv.cantidad * w.peso), ?
+        FROM ventas v JOIN detallesVenta dv ON dv.idVenta = v.idVenta
+             JOIN temp.pesosPopularidad w ON w.dia = substr(v.fecha, 1, 10)
+        WHERE v.fecha >= ?
+        GROUP BY dv.idProducto
+    """, (hoy.toordinal(), (hoy - timedelta(days=dias - 1)).isoformat()))
+    cursor.execute("DROP TABLE temp.pesosPopularidad")
+
+def isBusyError(error):
+    """Indica si un error de SQLite se debe a que otra conexión tiene la base de datos bloqueada."""
+    mensaje = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in mensaje or "busy" in mensaje)
+
+def retryOnBusy(dbConnection, operacion, intentos=5, esperaBase=0.05):
+    """
+    Ejecuta operacion() y, si falla porque la BD está ocupada por otra caja, deshace la transacción
+    y vuelve a intentarlo con espera exponencial y un poco de azar (para que las cajas no reintenten a la vez).
+    Si se agotan los intentos, se propaga el último error.
+    """
+    for intento in range(intentos):
+        try:
+            return operacion()
+        except sqlite3.OperationalError as e:
+            if not isBusyError(e) or intento == intentos - 1:
+                raise
+            dbConnection.rollback()
+            time.sleep(esperaBase * (2 ** intento) * (0.5 + random.random()))
+
+class Database:
+    """
+    Clase responsable de manejar la conexión y la estructura de la base de datos.
+    Diseñada con una estructura limpia para un negocio local.
+
+    Soporta varias cajas (procesos) trabajando sobre el mismo archivo: la BD usa modo WAL para que las
+    lecturas no bloqueen a las escrituras, cada conexión espera hasta 'busyTimeout' segundos si otra caja
+    está escribiendo, y las transacciones de escritura empiezan con BEGIN IMMEDIATE para tomar el candado
+    de escritura desde el inicio en lugar de fallar a la mitad.
+    """
+    def __init__(self, dbPath="pos.db", caja="1", busyTimeout=5.0):
+        self.dbPath = dbPath
+        self.caja = caja # Identificador de esta caja (lane); se guarda en cada venta
+        self.busyTimeout = busyTimeout
+        self.perfil = None # PerfilConsultas activo (ver enableProfiler); None = conexiones sin instrumentar
+        self.createTables()
+
+    def connect(self):
+        """Crea y devuelve una nueva conexión a la base de datos."""
+        if self.perfil is not None:
+            return self.perfil.connect(self.dbPath, timeout=self.busyTimeout, isolation_level="IMMEDIATE")
+        return sqlite3.connect(self.dbPath, timeout=self.busyTimeout, isolation_level="IMMEDIATE")
+
+    def enableProfiler(self, umbralMs=50.0, archivoLentas=None):
+        """
+        Activa el perfilador de consultas para las conexiones que se abran a partir de ahora.
+        Las sentencias que tarden 'umbralMs' o más se guardan con su EXPLAIN QUERY PLAN.
+        """
+        self.perfil = PerfilConsultas(umbralMs, archivoLentas)
+        return self.perfil
+
+    def createTables(self):
+        """
+        Contiene todo el esquema de la base de datos.
+        Crea las tablas si no existen al iniciar la aplicación.
+        """
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            # WAL permite que varias cajas lean mientras una escribe. El modo queda guardado en el archivo.
+            cursor.execute("PRAGMA journal_mode=WAL")
+            
+            # --- TABLA DE USUARIOS ---
+            # Almacena las credenciales y roles para el control de acceso.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS usuarios (
+                    idUsuario INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    passwordHash TEXT NOT NULL,
+                    role TEXT NOT NULL
+                )
+            """)
+            
+            # --- TABLA DE CATEGORÍAS ---
+            # Permite agrupar productos para una mejor organización y filtrado.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS categorias (
+                    idCategoria INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nombre TEXT UNIQUE NOT NULL
+                )
+            """)
+            
+            # --- TABLA DE PRODUCTOS ---
+            # El inventario central de la tienda.
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS productos (
+                    idProducto INTEGER PRIMARY KEY AUTOINCREMENT,
+                    codigoBarras TEXT UNIQUE NOT NULL,
+                    nombre TEXT NOT NULL,
+                    descripcion TEXT,
+                    precioVenta REAL NOT NULL,
+                    costoCompra REAL DEFAULT 0,
+                    stock INTEGER NOT NULL,
+                    idCategoria INTEGER,
+                    versionStock INTEGER DEFAULT 0,
+                    minStock INTEGER,
+                    maxStock INTEGER,
+                    umbralStock REAL NOT NULL DEFAULT {UMBRAL_STOCK_DEFECTO},
+                    FOREIGN KEY (idCategoria) REFERENCES categorias(idCategoria)
+                )
+            """)
+
+            # --- TABLAS DE OPERACIONES DE VENTA ---
+            # Tabla principal que registra cada transacción.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ventas (
+                    idVenta INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    subtotal REAL NOT NULL,
+                    descuento REAL DEFAULT 0,
+                    totalVenta REAL NOT NULL,
+                    metodoPago TEXT,
+                    caja TEXT
+                )
+            """)
+            
+            # Tabla que detalla los productos incluidos en cada venta.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS detallesVenta (
+                    idDetalleVenta INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idVenta INTEGER NOT NULL,
+                    idProducto INTEGER NOT NULL,
+                    cantidad INTEGER NOT NULL,
+                    precioUnitario REAL NOT NULL,
+                    subtotal REAL NOT NULL,
+                    costoUnitario REAL DEFAULT 0,
+                    esRecarga INTEGER DEFAULT 0,
+                    FOREIGN KEY (idVenta) REFERENCES ventas(idVenta),
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+
+            # Registra los productos devueltos por los clientes.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS devoluciones (
+                    idDevolucion INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idVentaOriginal INTEGER NOT NULL,
+                    idProducto INTEGER NOT NULL,
+                    cantidad INTEGER NOT NULL,
+                    montoDevuelto REAL NOT NULL,
+                    fecha TEXT NOT NULL,
+                    FOREIGN KEY (idVentaOriginal) REFERENCES ventas(idVenta),
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+            
+            # --- TABLA DE GASTOS ---
+            # Registra salidas de dinero no relacionadas con la compra de inventario.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS gastos (
+                    idGasto INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    descripcion TEXT NOT NULL,
+                    monto REAL NOT NULL
+                )
+            """)
+            
+            # --- TABLA DE CONTADORES ---
+            # Contadores globales monótonos (por ejemplo, la versión del stock que usa el LibroStock).
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS contadores (
+                    nombre TEXT PRIMARY KEY,
+                    valor INTEGER NOT NULL
+                )
+            """)
+
+            # --- TABLA DE TICKETS EN ESPERA ---
+            # Carritos suspendidos para atender a otro cliente; se recuperan más tarde desde cualquier caja.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ticketsEnEspera (
+                    idTicket INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    usuario TEXT,
+                    total REAL NOT NULL,
+                    descuentoPorcentaje REAL DEFAULT 0,
+                    contenido TEXT NOT NULL
+                )
+            """)
+
+            # --- TABLA DE PRONÓSTICOS DE DEMANDA ---
+            # Un renglón por producto con venta reciente (ver pronostico.py): unidades por día, su variación
+            # y el punto de reorden. La lista de bajo stock se lee de aquí, sin recorrer el historial de ventas.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pronosticos (
+                    idProducto INTEGER PRIMARY KEY,
+                    velocidad REAL NOT NULL,
+                    desviacion REAL NOT NULL,
+                    puntoReorden REAL NOT NULL,
+                    actualizado TEXT NOT NULL,
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+
+            # --- TABLA DE HISTORIAL DE PRECIOS ---
+            # Cada cambio de precio o costo aplicado con CambioPrecio (ajustes masivos o lista de proveedor),
+            # con los valores anteriores y nuevos, para poder auditar quién cambió qué y cuándo.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS historialPrecios (
+                    idHistorial INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idProducto INTEGER NOT NULL,
+                    fecha TEXT NOT NULL,
+                    precioAnterior REAL,
+                    precioNuevo REAL,
+                    costoAnterior REAL,
+                    costoNuevo REAL,
+                    origen TEXT,
+                    usuario TEXT,
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxHistorialPreciosProducto ON historialPrecios(idProducto, fecha)")
+
+            # --- TABLAS DE CONTEO FÍSICO DE INVENTARIO ---
+            # Cada conteo aplicado (encabezado con sus totales) y el libro de ajustes: una fila por producto
+            # cuyo stock se corrigió, con el stock del sistema, lo contado y el costo para valuar la diferencia.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS conteosInventario (
+                    idConteo INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    usuario TEXT,
+                    completo INTEGER NOT NULL DEFAULT 0,
+                    productosContados INTEGER NOT NULL,
+                    productosAjustados INTEGER NOT NULL,
+                    diferenciaUnidades INTEGER NOT NULL,
+                    diferenciaValor REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ajustesInventario (
+                    idAjuste INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idConteo INTEGER NOT NULL,
+                    idProducto INTEGER NOT NULL,
+                    stockAnterior INTEGER NOT NULL,
+                    stockContado INTEGER NOT NULL,
+                    diferencia INTEGER NOT NULL,
+                    costoUnitario REAL,
+                    FOREIGN KEY (idConteo) REFERENCES conteosInventario(idConteo),
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxAjustesInventarioConteo ON ajustesInventario(idConteo)")
+
+            # --- TABLAS DE RECEPCIÓN DE MERCANCÍA ---
+            # Cada entrega de un proveedor (encabezado con folio, gastos de flete y totales) y sus renglones:
+            # unidades recibidas, costo de factura y costo aterrizado (factura más su parte de los gastos),
+            # para analizar cuánto costó realmente cada compra.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS recepciones (
+                    idRecepcion INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    proveedor TEXT,
+                    folio TEXT,
+                    usuario TEXT,
+                    lineas INTEGER NOT NULL,
+                    unidades INTEGER NOT NULL,
+                    importe REAL NOT NULL,
+                    gastos REAL NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS detallesRecepcion (
+                    idDetalle INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idRecepcion INTEGER NOT NULL,
+                    idProducto INTEGER NOT NULL,
+                    cantidad INTEGER NOT NULL,
+                    costoFactura REAL NOT NULL,
+                    costoAterrizado REAL NOT NULL,
+                    costoAnterior REAL,
+                    FOREIGN KEY (idRecepcion) REFERENCES recepciones(idRecepcion),
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxDetallesRecepcionRecepcion ON detallesRecepcion(idRecepcion)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxDetallesRecepcionProducto ON detallesRecepcion(idProducto, idRecepcion)")
+
+            # --- TABLA DE CORTES DE CAJA ---
+            # Un renglón por cierre: totales del periodo (desde el corte anterior hasta el día 'hasta'),
+            # por método de pago, y el efectivo esperado contra el contado. El saldo de apertura de cada
+            # corte es el efectivo contado en el anterior, así que los saldos se encadenan.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS cortes (
+                    idCorte INTEGER PRIMARY KEY AUTOINCREMENT,
+                    desde TEXT NOT NULL,
+                    hasta TEXT NOT NULL UNIQUE,
+                    fechaCierre TEXT NOT NULL,
+                    usuario TEXT,
+                    saldoApertura REAL NOT NULL,
+                    numTickets INTEGER DEFAULT 0,
+                    ventasEfectivo REAL DEFAULT 0,
+                    ventasTarjeta REAL DEFAULT 0,
+                    descuentos REAL DEFAULT 0,
+                    devoluciones REAL DEFAULT 0,
+                    gastos REAL DEFAULT 0,
+                    efectivoEsperado REAL NOT NULL,
+                    efectivoContado REAL NOT NULL,
+                    diferencia REAL NOT NULL
+                )
+            """)
+            
+            conn.commit()
+        self.migrate()
+
+    def backup(self, destino):
+        """
+        Copia la base de datos completa a 'destino' usando la API de respaldo de SQLite.
+        A diferencia de copiar el archivo, incluye lo que aún está en el WAL y es seguro con otras cajas abiertas.
+        """
+        origen, copia = self.connect(), sqlite3.connect(destino)
+        try:
+            origen.backup(copia)
+        finally:
+            copia.close()
+            origen.close()
+
+    def restore(self, archivoCopia):
+        """Reemplaza el contenido de la base de datos con el de una copia de seguridad."""
+        copia, destino = sqlite3.connect(archivoCopia), self.connect()
+        try:
+            copia.backup(destino)
+        finally:
+            destino.close()
+            copia.close()
+
+    def archiveYear(self, anio, vacuum=True):
+        """
+        Mueve las ventas, sus detalles y pagos, y las devoluciones de un año fiscal cerrado a 'pos-AAAA.db'.
+        Los reportes los siguen viendo (models.Archivo los adjunta con ATTACH cuando el rango lo requiere),
+        pero la BD de trabajo queda pequeña: escrituras más rápidas y copias de seguridad más cortas.
+
+        Primero se copia y se confirma en el archivo, y después se borra de la BD de trabajo solo lo que ya
+        está en el archivo. Si el proceso se interrumpe, basta con volver a ejecutarlo.
+        Devuelve {tabla: filas archivadas}.
+        """
+        if int(anio) >= datetime.now().year:
+            raise ValueError("Solo se pueden archivar años fiscales ya cerrados.")
+        inicio, fin = f"{anio}-01-01 00:00:00", f"{anio}-12-31 23:59:59"
+        filtros = {
+            "ventas": "fecha BETWEEN ? AND ?",
+            "detallesVenta": "idVenta IN (SELECT idVenta FROM main.ventas WHERE fecha BETWEEN ? AND ?)",
+            "pagos": "fecha BETWEEN ? AND ?",
+            "devoluciones": "fecha BETWEEN ? AND ?",
+        }
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("ATTACH DATABASE ? AS archivo", (archivePath(self.dbPath, anio),))
+            # 1. Copia al archivo (INSERT OR IGNORE: repetir el proceso no duplica filas)
+            movidas = {}
+            for tabla in TABLAS_ARCHIVABLES:
+                self.createArchiveTable(cursor, tabla)
+                columnas = ", ".join(fila[1] for fila in cursor.execute(f"PRAGMA main.table_info({tabla})").fetchall())
+                cursor.execute(f"INSERT OR IGNORE INTO archivo.{tabla} ({columnas}) SELECT {columnas} FROM main.{tabla} WHERE {filtros[tabla]}", (inicio, fin))
+                movidas[tabla] = cursor.rowcount
+            cursor.execute("CREATE INDEX IF NOT EXISTS archivo.idxVentasFecha ON ventas(fecha)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS archivo.idxDetallesVentaIdVenta ON detallesVenta(idVenta)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS archivo.idxDevolucionesFecha ON devoluciones(fecha)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS archivo.idxPagosFecha ON pagos(fecha)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS archivo.idxPagosIdVenta ON pagos(idVenta)")
+            conn.commit()
+            # 2. Borra de la BD de trabajo solo lo que ya quedó guardado en el archivo
+            claves = {"ventas": "idVenta", "detallesVenta": "idDetalleVenta", "pagos": "idPago", "devoluciones": "idDevolucion"}
+            for tabla in ("detallesVenta", "pagos", "devoluciones", "ventas"):
+                cursor.execute(f"DELETE FROM main.{tabla} WHERE {claves[tabla]} IN (SELECT {claves[tabla]} FROM archivo.{tabla})")
+            conn.commit()
+            cursor.execute("DETACH DATABASE archivo")
+            if vacuum:
+                # Devuelve al sistema el espacio liberado; el WAL se vacía para que el archivo realmente encoja
+                cursor.execute("VACUUM")
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return movidas
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def createArchiveTable(self, cursor, tabla):
+        """Crea la tabla en el archivo adjunto con el mismo esquema que en la BD de trabajo (y agrega columnas nuevas)."""
+        sql = cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (tabla,)).fetchone()[0]
+        cursor.execute(sql.replace(f"CREATE TABLE {tabla}", f"CREATE TABLE IF NOT EXISTS archivo.{tabla}", 1))
+        existentes = {fila[1] for fila in cursor.execute(f"PRAGMA archivo.table_info({tabla})").fetchall()}
+        for _, columna, tipo, _, valorDefecto, _ in cursor.execute(f"PRAGMA main.table_info({tabla})").fetchall():
+            if columna not in existentes:
+                cursor.execute(f"ALTER TABLE archivo.{tabla} ADD COLUMN {columna} {tipo}" + (f" DEFAULT {valorDefecto}" if valorDefecto is not None else ""))
+
+    def addColumnIfMissing(self, cursor, tabla, columna, definicion):
+        """
+        Agrega una columna a una tabla existente si aún no la tiene.
+        Devuelve True si la columna fue creada (útil para saber si hay que rellenarla).
+        """
+        cursor.execute(f"PRAGMA table_info({tabla})")
+        if any(fila[1] == columna for fila in cursor.fetchall()):
+            return False
+        cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+        return True
+
+    def migrate(self):
+        """
+        Actualiza bases de datos creadas con versiones anteriores del esquema.
+        Cada paso es idempotente, por lo que se puede ejecutar en cada arranque.
+        """
+        with self.connect() as conn:
+            cursor = conn.cursor()
+
+            # --- Costo al momento de la venta en detallesVenta ---
+            # Las ventas antiguas no guardaban el costo; se rellena con el costo actual del producto,
+            # que es la mejor aproximación disponible. Desde ahora cada venta guarda el suyo.
+            if self.addColumnIfMissing(cursor, "detallesVenta", "costoUnitario", "REAL DEFAULT 0"):
+                cursor.execute("""
+                    UPDATE detallesVenta SET costoUnitario = COALESCE(
+                        (SELECT p.costoCompra FROM productos p WHERE p.idProducto = detallesVenta.idProducto), 0)
+                """)
+            if self.addColumnIfMissing(cursor, "detallesVenta", "esRecarga", "INTEGER DEFAULT 0"):
+                cursor.execute("""
+                    UPDATE detallesVenta SET esRecarga = 1
+                    WHERE idProducto IN (SELECT idProducto FROM productos WHERE nombre = 'Recarga Celular')
+                """)
+
+            # --- Caja (lane) que registró cada venta ---
+            self.addColumnIfMissing(cursor, "ventas", "caja", "TEXT")
+
+            # --- Versión de stock por producto ---
+            # Cada cambio de stock marca al producto con el siguiente valor del contador 'versionStock'.
+            # Así, quien mantenga una copia del stock en memoria solo relee los productos que cambiaron.
+            self.addColumnIfMissing(cursor, "productos", "versionStock", "INTEGER DEFAULT 0")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxProductosVersionStock ON productos(versionStock)")
+            cursor.execute("INSERT OR IGNORE INTO contadores (nombre, valor) VALUES ('versionStock', 0)")
+            for evento in ("INSERT", "UPDATE OF stock"):
+                nombreTrigger = "trgVersionStockInsert" if evento == "INSERT" else "trgVersionStockUpdate"
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {nombreTrigger} AFTER {evento} ON productos
+                    BEGIN
+                        UPDATE contadores SET valor = valor + 1 WHERE nombre = 'versionStock';
+                        UPDATE productos SET versionStock = (SELECT valor FROM contadores WHERE nombre = 'versionStock')
+                        WHERE idProducto = NEW.idProducto;
+                    END
+                """)
+
+            # --- Versión del nombre por producto ---
+            # Igual que 'versionStock', pero para los nombres: el índice de búsqueda en memoria (busqueda.py)
+            # solo vuelve a indexar los productos creados o renombrados desde su última actualización.
+            self.addColumnIfMissing(cursor, "productos", "versionNombre", "INTEGER DEFAULT 0")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxProductosVersionNombre ON productos(versionNombre)")
+            cursor.execute("INSERT OR IGNORE INTO contadores (nombre, valor) VALUES ('versionNombre', 0)")
+            for evento in ("INSERT", "UPDATE OF nombre"):
+                nombreTrigger = "trgVersionNombreInsert" if evento == "INSERT" else "trgVersionNombreUpdate"
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {nombreTrigger} AFTER {evento} ON productos
+                    BEGIN
+                        UPDATE contadores SET valor = valor + 1 WHERE nombre = 'versionNombre';
+                        UPDATE productos SET versionNombre = (SELECT valor FROM contadores WHERE nombre = 'versionNombre')
+                        WHERE idProducto = NEW.idProducto;
+                    END
+                """)
+
+            # --- Libro de movimientos de stock ---
+            # Cada cambio de stock (venta, devolución, reabasto, ajuste, conteo...) se inserta aquí, en la misma
+            # transacción, y el trigger lo aplica a productos.stock: el stock es la suma de los movimientos del
+            # producto. Los movimientos 'inicial' y 'correccion' solo documentan un stock que ya está en el
+            # producto (el de alta, o una diferencia encontrada por MovimientoStock.verify), no lo modifican.
+            existeMovimientos = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movimientosStock'").fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS movimientosStock (
+                    idMovimiento INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idProducto INTEGER NOT NULL,
+                    fecha TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    cantidad INTEGER NOT NULL,
+                    referencia INTEGER,
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+            # Historial de un producto sin recorrer la tabla, y suma por producto (verificación) leyendo solo el índice
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxMovimientosStockProducto ON movimientosStock(idProducto, cantidad)")
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trgMovimientoStock AFTER INSERT ON movimientosStock
+                WHEN NEW.tipo NOT IN ('inicial', 'correccion')
+                BEGIN
+                    UPDATE productos SET stock = stock + NEW.cantidad WHERE idProducto = NEW.idProducto;
+                END
+            """)
+            for evento in ("UPDATE", "DELETE"):
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trgMovimientoStockSoloInsercion{evento.capitalize()} BEFORE {evento} ON movimientosStock
+                    BEGIN
+                        SELECT RAISE(ABORT, 'El libro de movimientos de stock no se puede modificar.');
+                    END
+                """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trgMovimientoStockAlta AFTER INSERT ON productos WHEN NEW.stock != 0
+                BEGIN
+                    INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad) VALUES (NEW.idProducto, datetime('now', 'localtime'), 'inicial', NEW.stock);
+                END
+            """)
+            if not existeMovimientos:
+                # El stock que ya tenían los productos queda como su movimiento inicial
+                cursor.execute("""
+                    INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad)
+                    SELECT idProducto, datetime('now', 'localtime'), 'inicial', stock FROM productos WHERE stock != 0
+                """)
+
+            # --- Mínimo y máximo de stock por producto ---
+            # minStock y maxStock los define el usuario (NULL = automático). umbralStock es el mínimo vigente:
+            # minStock si existe, si no el punto de reorden del pronóstico y, sin ventas recientes, el valor por
+            # defecto. Con el umbral en la misma fila, un índice parcial contiene solo los productos bajo su
+            # mínimo y los triggers mantienen su conteo en 'contadores' sin recorrer la tabla.
+            self.addColumnIfMissing(cursor, "productos", "minStock", "INTEGER")
+            self.addColumnIfMissing(cursor, "productos", "maxStock", "INTEGER")
+            if self.addColumnIfMissing(cursor, "productos", "umbralStock", f"REAL NOT NULL DEFAULT {UMBRAL_STOCK_DEFECTO}"):
+                cursor.execute("UPDATE productos SET umbralStock = COALESCE((SELECT f.puntoReorden FROM pronosticos f WHERE f.idProducto = productos.idProducto), ?)", (UMBRAL_STOCK_DEFECTO,))
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxProductosBajoStock ON productos(stock) WHERE stock <= umbralStock AND nombre != 'Recarga Celular'")
+            bajo = lambda fila: f"({fila}.stock <= {fila}.umbralStock AND {fila}.nombre != 'Recarga Celular')"
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trgUmbralStock AFTER UPDATE OF minStock ON productos
+                BEGIN
+                    UPDATE productos SET umbralStock = COALESCE(NEW.minStock, (SELECT puntoReorden FROM pronosticos WHERE idProducto = NEW.idProducto), {UMBRAL_STOCK_DEFECTO})
+                    WHERE idProducto = NEW.idProducto;
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trgUmbralStockInsert AFTER INSERT ON productos WHEN NEW.minStock IS NOT NULL
+                BEGIN
+                    UPDATE productos SET umbralStock = NEW.minStock WHERE idProducto = NEW.idProducto;
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trgBajoStockInsert AFTER INSERT ON productos WHEN {bajo("NEW")}
+                BEGIN
+                    UPDATE contadores SET valor = valor + 1 WHERE nombre = 'productosBajoStock';
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trgBajoStockDelete AFTER DELETE ON productos WHEN {bajo("OLD")}
+                BEGIN
+                    UPDATE contadores SET valor = valor - 1 WHERE nombre = 'productosBajoStock';
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trgBajoStockUpdate AFTER UPDATE OF stock, umbralStock, nombre ON productos
+                WHEN {bajo("OLD")} != {bajo("NEW")}
+                BEGIN
+                    UPDATE contadores SET valor = valor + {bajo("NEW")} - {bajo("OLD")} WHERE nombre = 'productosBajoStock';
+                END
+            """)
+            # El conteo se rehace en cada arranque (lee solo el índice parcial), así se corrige cualquier desfase
+            cursor.execute("""
+                INSERT OR REPLACE INTO contadores (nombre, valor)
+                VALUES ('productosBajoStock', (SELECT COUNT(*) FROM productos WHERE stock <= umbralStock AND nombre != 'Recarga Celular'))
+            """)
+
+            # --- Versión del catálogo de precios ---
+            # Cada cambio masivo de precios la incrementa una sola vez; quien guarde precios en memoria la
+            # compara para saber si debe releerlos.
+            cursor.execute("INSERT OR IGNORE INTO contadores (nombre, valor) VALUES ('versionPrecios', 0)")
+
+            # --- Pagos de cada venta ---
+            # Una venta puede pagarse con varios métodos (por ejemplo, parte con tarjeta y el resto en efectivo).
+            # Cada pago guarda el monto aplicado y, en efectivo, lo recibido y el cambio. La fecha se repite
+            # aquí para que el desglose por método de un período se obtenga con una sola lectura del índice.
+            existePagos = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pagos'").fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pagos (
+                    idPago INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idVenta INTEGER NOT NULL,
+                    fecha TEXT NOT NULL,
+                    metodo TEXT NOT NULL,
+                    monto REAL NOT NULL,
+                    recibido REAL,
+                    cambio REAL DEFAULT 0,
+                    FOREIGN KEY (idVenta) REFERENCES ventas(idVenta)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxPagosFecha ON pagos(fecha)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxPagosIdVenta ON pagos(idVenta)")
+            if not existePagos:
+                # Las ventas anteriores tienen un solo pago por el total; lo recibido y el cambio no se guardaban
+                cursor.execute("""
+                    INSERT INTO pagos (idVenta, fecha, metodo, monto)
+                    SELECT idVenta, fecha, COALESCE(metodoPago, 'Efectivo'), totalVenta FROM ventas
+                """)
+
+            # --- Índices por fecha ---
+            # El corte de caja y los reportes de un periodo corto leen solo las filas de esos días.
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxVentasFecha ON ventas(fecha)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxDevolucionesFecha ON devoluciones(fecha)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxGastosFecha ON gastos(fecha)")
+            # Las líneas de un ticket (o de un rango de tickets) sin recorrer toda la tabla
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxDetallesVentaIdVenta ON detallesVenta(idVenta)")
+
+            # --- Popularidad reciente de los productos ---
+            # Unidades vendidas con decaimiento exponencial, al día 'dia' (número ordinal de la fecha). Cada venta
+            # la actualiza en su misma transacción (models.Popularidad); sirve para ordenar las sugerencias del
+            # buscador. Solo tiene filas de los productos que se han vendido. Al crearla se llena con el historial.
+            existePopularidad = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'popularidad'").fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS popularidad (
+                    idProducto INTEGER PRIMARY KEY,
+                    puntaje REAL NOT NULL,
+                    dia INTEGER NOT NULL,
+                    FOREIGN KEY (idProducto) REFERENCES productos(idProducto)
+                )
+            """)
+            if not existePopularidad:
+                rebuildPopularity(cursor)
+
+            # --- Productos por categoría ---
+            # La navegación por categoría del punto de venta lee una categoría completa, ya en orden de nombre.
+            cursor.execute("CREATE INDEX IF NOT EXISTS idxProductosCategoria ON productos(idCategoria, nombre)")
+
+            # --- Teclas rápidas del punto de venta ---
+            # Los productos que más se venden en cada día de la semana (0 = domingo) y hora (-1 = todo el día),
+            # en orden. Las calcula teclasrapidas.py una vez al día; el punto de venta las lee al abrir.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS teclasRapidas (
+                    diaSemana INTEGER NOT NULL,
+                    hora INTEGER NOT NULL,
+                    posicion INTEGER NOT NULL,
+                    idProducto INTEGER NOT NULL,
+                    veces INTEGER NOT NULL,
+                    PRIMARY KEY (diaSemana, hora, posicion)
+                ) WITHOUT ROWID
+            """)
+
             conn.commit()
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+Generador de datos sintéticos para pruebas de rendimiento.
+
+Crea una base de datos con un catálogo realista (categorías, miles de productos con códigos de barras,
+precios y costos) y un historial de ventas, detalles, pagos, devoluciones y gastos de varios años. Es
+determinista: con la misma semilla y los mismos parámetros se obtiene exactamente la misma base de datos.
+
+- La popularidad de los productos sigue una distribución de cola larga (pocos productos venden mucho).
+- El volumen de ventas varía por día de la semana y por hora (más ventas por la tarde y en fin de semana).
+- Cerca del 1 % de las ventas tienen devoluciones y cada día hay algunos gastos operativos.
+
+Uso:
+    python datagen.py --db bench.db --productos 10000 --dias 730 --ventas-dia 300
+    python datagen.py --db grande.db --productos 500000 --dias 1095 --ventas-dia 1500 --semilla 7
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from database import Database, rebuildPopularity
+
+CATEGORIAS = [
+    "Papelería", "Dulces", "Bebidas", "Botanas", "Abarrotes", "Lácteos", "Limpieza", "Higiene Personal",
+    "Farmacia", "Ferretería", "Electrónica", "Juguetes", "Mascotas", "Panadería", "Congelados", "Regalos",
+]
+SUSTANTIVOS = [
+    "Lápiz", "Cuaderno", "Borrador", "Pluma", "Marcador", "Chocolate", "Paleta", "Chicle", "Refresco", "Agua",
+    "Jugo", "Papas", "Galletas", "Arroz", "Frijol", "Aceite", "Leche", "Yogur", "Queso", "Jabón", "Cloro",
+    "Detergente", "Shampoo", "Pasta Dental", "Cepillo", "Pila", "Foco", "Cable", "Cinta", "Pegamento",
+    "Tijeras", "Regla", "Carpeta", "Sobre", "Croquetas", "Pan", "Helado", "Servilletas", "Vasos", "Platos",
+]
+ADJETIVOS = [
+    "Clásico", "Premium", "Económico", "Grande", "Chico", "Mediano", "Light", "Integral", "Picante", "Natural",
+    "Azul", "Rojo", "Verde", "Negro", "Blanco", "Familiar", "Infantil", "Extra", "Original", "Deluxe",
+]
+MARCAS = [
+    "Adosa", "Norma", "Bic", "Scribe", "Sabritas", "Bimbo", "Lala", "Alpura", "Ariel", "Colgate",
+    "Nestlé", "Barcel", "Gamesa", "Coca-Cola", "Jumex", "Duracell", "Pelikan", "Maped", "La Costeña", "Zote",
+]
+PRESENTACIONES = ["", " 250 ml", " 500 ml", " 1 L", " 100 g", " 500 g", " 1 kg", " Paquete 3", " Paquete 6", " Caja 12"]
+GASTOS = [("Luz", 300, 1500), ("Agua", 80, 400), ("Renta", 2500, 6000), ("Internet", 350, 600),
+          ("Limpieza", 50, 300), ("Papelería interna", 30, 200), ("Transporte", 40, 250), ("Mantenimiento", 100, 1200)]
+PESO_DIA_SEMANA = [0.85, 0.9, 0.9, 0.95, 1.1, 1.35, 1.0] # Lunes a domingo
+PESO_HORA = {h: p for h, p in zip(range(8, 22), [0.4, 0.6, 0.8, 0.9, 1.0, 1.2, 1.3, 1.3, 1.4, 1.5, 1.4, 1.1, 0.8, 0.5])}
+LOTE = 5000 # Filas por executemany
+
+def limpiarArchivo(dbPath):
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(dbPath + sufijo):
+            os.remove(dbPath + sufijo)
+
+def generarCatalogo(conn, rng, numProductos):
+    """Inserta las categorías y los productos. Devuelve la lista [(idProducto, precioVenta, costoCompra), ...]."""
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO categorias (nombre) VALUES (?)", [(c,) for c in CATEGORIAS])
+    idsCategorias = [fila[0] for fila in cursor.execute("SELECT idCategoria FROM categorias ORDER BY idCategoria")]
+
+    catalogo = []
+    filas = []
+    # La recarga celular existe siempre, igual que en la tienda real
+    filas.append(("0000000000000", "Recarga Celular", "Recarga de tiempo aire", 1.00, 0.0, 1000, None))
+    catalogo.append((1, 1.00, 0.0))
+    nombres = itertools.product(SUSTANTIVOS, MARCAS, ADJETIVOS, PRESENTACIONES)
+    for i in range(1, numProductos):
+        sustantivo, marca, adjetivo, presentacion = next(nombres, (rng.choice(SUSTANTIVOS), rng.choice(MARCAS), rng.choice(ADJETIVOS), f" #{i}"))
+        costo = round(rng.lognormvariate(3.0, 0.9), 2)
+        precio = round(costo * rng.uniform(1.2, 1.8), 2)
+        stock = rng.randint(0, 300)
+        filas.append((f"75{i:011d}", f"{sustantivo} {marca} {adjetivo}{presentacion}", "", precio, costo, stock, rng.choice(idsCategorias)))
+        catalogo.append((i + 1, precio, costo))
+    for inicio in range(0, len(filas), LOTE):
+        cursor.executemany("INSERT INTO productos (codigoBarras, nombre, descripcion, precioVenta, costoCompra, stock, idCategoria) VALUES (?, ?, ?, ?, ?, ?, ?)", filas[inicio:inicio + LOTE])
+    conn.commit()
+    return catalogo
+
+def generarHistorial(conn, rng, catalogo, dias, ventasPorDia, hasta, cajas):
+    """Genera 'dias' días de ventas, detalles, devoluciones y gastos que terminan en la fecha 'hasta'."""
+    cursor = conn.cursor()
+    # Pesos acumulados de popularidad (cola larga tipo Zipf) para elegir productos en O(log n)
+    pesos = list(itertools.accumulate(1.0 / (rango + 1) ** 0.9 for rango in range(len(catalogo) - 1)))
+    orden = list(range(1, len(catalogo)))
+    rng.shuffle(orden) # La popularidad no depende del ID del producto
+    horas, pesosHora = list(PESO_HORA), list(PESO_HORA.values())
+
+    idVenta = 0
+    totales = {"ventas": 0, "detalles": 0, "pagos": 0, "devoluciones": 0, "gastos": 0}
+    for numDia in range(dias):
+        dia = hasta - timedelta(days=dias - 1 - numDia)
+        numVentas = max(1, int(rng.gauss(ventasPorDia * PESO_DIA_SEMANA[dia.weekday()], ventasPorDia * 0.1)))
+        ventas, detalles, pagos, devoluciones = [], [], [], []
+        segundosDelDia = sorted(h * 3600 + rng.randrange(3600) for h in rng.choices(horas, pesosHora, k=numVentas))
+        for segundos in segundosDelDia:
+            idVenta += 1
+            fecha = (dia + timedelta(seconds=segundos)).strftime("%Y-%m-%d %H:%M:%S")
+            lineas = []
+            if rng.random() < 0.03:
+                monto = rng.choice((20, 30, 50, 100, 150, 200))
+                lineas.append((catalogo[0][0], 1, monto + 1.00, 0.0, 1))
+            numLineas = min(len(orden), max(1, int(rng.expovariate(1 / 2.5)) + 1))
+            for rango in set(rng.choices(range(len(orden)), cum_weights=pesos, k=numLineas)):
+                idProducto, precio, costo = catalogo[orden[rango]]
+                lineas.append((idProducto, rng.choice((1, 1, 1, 2, 2, 3)), precio, costo, 0))
+            subtotal = round(sum(cantidad * precio for _, cantidad, precio, _, _ in lineas), 2)
+            descuento = round(subtotal * rng.choice((5, 10, 15)) / 100, 2) if rng.random() < 0.05 else 0.0
+            metodo = "Tarjeta" if rng.random() < 0.3 else "Efectivo"
+            ventas.append((idVenta, fecha, subtotal, descuento, subtotal - descuento, metodo, rng.choice(cajas)))
+            # En efectivo se paga con el siguiente múltiplo de 50 (sin usar el generador, para no alterar los demás datos)
+            recibido = -(-(subtotal - descuento) // 50) * 50 if metodo == "Efectivo" else None
+            pagos.append((idVenta, fecha, metodo, subtotal - descuento, recibido, recibido - (subtotal - descuento) if recibido is not None else 0.0))
+            for idProducto, cantidad, precio, costo, esRecarga in lineas:
+                detalles.append((idVenta, idProducto, cantidad, precio, cantidad * precio, costo, esRecarga))
+            # Devolución de la última línea (las recargas no se devuelven), unos días después de la venta
+            if rng.random() < 0.01 and not lineas[-1][4]:
+                idProducto, cantidad, precio, _, _ = lineas[-1]
+                fechaDev = (dia + timedelta(days=rng.randint(0, 7), seconds=segundos)).strftime("%Y-%m-%d %H:%M:%S")
+                if fechaDev[:10] <= hasta.strftime("%Y-%m-%d"):
+                    devoluciones.append((idVenta, idProducto, 1, precio, fechaDev))
+        gastos = []
+        for descripcion, minimo, maximo in GASTOS:
+            if rng.random() < 0.12:
+                fecha = (dia + timedelta(hours=rng.randint(9, 20), minutes=rng.randrange(60))).strftime("%Y-%m-%d %H:%M:%S")
+                gastos.append((fecha, descripcion, round(rng.uniform(minimo, maximo), 2)))
+
+        cursor.executemany("INSERT INTO ventas (idVenta, fecha, subtotal, descuento, totalVenta, metodoPago, caja) VALUES (?, ?, ?, ?, ?, ?, ?)", ventas)
+        cursor.executemany("INSERT INTO detallesVenta (idVenta, idProducto, cantidad, precioUnitario, subtotal, costoUnitario, esRecarga) VALUES (?, ?, ?, ?, ?, ?, ?)", detalles)
+        cursor.executemany("INSERT INTO pagos (idVenta, fecha, metodo, monto, recibido, cambio) VALUES (?, ?, ?, ?, ?, ?)", pagos)
+        cursor.executemany("INSERT INTO devoluciones (idVentaOriginal, idProducto, cantidad, montoDevuelto, fecha) VALUES (?, ?, ?, ?, ?)", devoluciones)
+        cursor.executemany("INSERT INTO gastos (fecha, descripcion, monto) VALUES (?, ?, ?)", gastos)
+        totales["ventas"] += len(ventas)
+        totales["detalles"] += len(detalles)
+        totales["pagos"] += len(pagos)
+        totales["devoluciones"] += len(devoluciones)
+        totales["gastos"] += len(gastos)
+        if numDia % 30 == 29:
+            conn.commit()
+    rebuildPopularity(cursor) # Las ventas se insertaron directamente, sin pasar por Venta.create
+    conn.commit()
+    return totales
+
+def generar(dbPath, productos=10000, dias=730, ventasPorDia=300, semilla=42, hasta=None, cajas=("1",)):
+    """
+    Crea (o recrea) 'dbPath' con datos sintéticos y devuelve un resumen con los conteos generados.
+    'hasta' es la fecha del último día del historial (por defecto, hoy), para que los reportes
+    del día, la semana y el mes tengan datos.
+    """
+    rng = random.Random(semilla)
+    hasta = datetime.strptime(hasta, "%Y-%m-%d") if hasta else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    limpiarArchivo(dbPath)
+    db = Database(dbPath)
+    conn = db.connect()
+    conn.execute("PRAGMA synchronous=OFF") # Solo para la carga inicial; las cajas usan su propia configuración
+    catalogo = generarCatalogo(conn, rng, productos)
+    totales = generarHistorial(conn, rng, catalogo, dias, ventasPorDia, hasta, list(cajas))
+    conn.execute("ANALYZE")
+    conn.close()
+    totales["productos"] = len(catalogo)
+    return totales
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una base de datos sintética y determinista para pruebas de rendimiento")
+    parser.add_argument("--db", default="bench.db", help="Archivo de BD a crear (se recrea si existe)")
+    parser.add_argument("--productos", type=int, default=10000, help="Productos en el catálogo (10 mil a 500 mil)")
+    parser.add_argument("--dias", type=int, default=730, help="Días de historial")
+    parser.add_argument("--ventas-dia", type=int, default=300, help="Ventas promedio por día")
+    parser.add_argument("--cajas", type=int, default=2, help="Número de cajas entre las que se reparten las ventas")
+    parser.add_argument("--hasta", help="Último día del historial (AAAA-MM-DD); por defecto, hoy")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    totales = generar(args.db, args.productos, args.dias, args.ventas_dia, args.semilla, args.hasta, [str(i + 1) for i in range(args.cajas)])
+    print(f"Base de datos '{args.db}' generada en {time.perf_counter() - inicio:.1f} s")
+    print(", ".join(f"{nombre}: {valor:,}" for nombre, valor in totales.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Medición de latencia de la interfaz (Tkinter).
+
+- @traced() mide cuánto tarda cada manejador de eventos (escanear, agregar al carrito, cobrar, refrescar listas...).
+- Un latido con after() detecta los bloqueos del bucle principal: si el latido llega tarde, la diferencia
+  es el tiempo que la interfaz estuvo congelada.
+- Para cada acción se guardan las últimas muestras y se calculan p50, p95 y p99 móviles; el resumen se ve
+  en la ventana de diagnóstico y se escribe periódicamente en un archivo de registro.
+
+Se activa con [Diagnostico] latencia_ui = 1 en config.info. La decisión se toma al decorar: con el monitor
+apagado, @traced devuelve la función original sin envolver, así que no hay costo alguno.
+"""
+import functools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+BLOQUEO_BUCLE = "Bucle principal (bloqueo)"
+
+class MonitorLatencia:
+    """Muestras recientes de latencia por acción de la interfaz."""
+    def __init__(self):
+        self.activo = False
+        self.maxMuestras = 500
+        self.intervaloLatido = 0.1 # Segundos entre latidos
+        self.archivoLog = None
+        self.intervaloLog = 60 # Segundos entre escrituras del registro
+        self.muestras = {} # accion -> deque con las últimas latencias (ms)
+        self.totales = {} # accion -> número total de mediciones desde el inicio
+        self.lock = threading.Lock()
+        self.root = None
+        self.esperado = None
+        self.jobs = []
+
+    def enable(self, maxMuestras=500, intervaloLatidoMs=100, archivoLog="latencia-ui.log", intervaloLogSeg=60):
+        """Activa el monitor. Debe llamarse antes de definir las clases cuyos métodos usan @traced."""
+        self.activo = True
+        self.maxMuestras = maxMuestras
+        self.intervaloLatido = intervaloLatidoMs / 1000
+        self.archivoLog = archivoLog
+        self.intervaloLog = intervaloLogSeg
+
+    def record(self, accion, ms):
+        with self.lock:
+            muestras = self.muestras.get(accion)
+            if muestras is None:
+                muestras = self.muestras[accion] = deque(maxlen=self.maxMuestras)
+            muestras.append(ms)
+            self.totales[accion] = self.totales.get(accion, 0) + 1
+
+    def summary(self):
+        """[(accion, llamadas, p50, p95, p99, max), ...] sobre las muestras recientes, ordenado por p95 descendente."""
+        with self.lock:
+            copia = {accion: sorted(muestras) for accion, muestras in self.muestras.items()}
+            totales = dict(self.totales)
+        filas = []
+        for accion, valores in copia.items():
+            if not valores: continue
+            p = lambda q: valores[min(len(valores) - 1, int(q / 100 * len(valores)))]
+            filas.append((accion, totales[accion], p(50), p(95), p(99), valores[-1]))
+        return sorted(filas, key=lambda fila: fila[3], reverse=True)
+
+    def reset(self):
+        with self.lock:
+            self.muestras.clear()
+            self.totales.clear()
+
+    # --- Latido del bucle principal y registro periódico ---
+
+    def start(self, root):
+        """Inicia el latido y el registro periódico sobre la ventana raíz de Tkinter."""
+        if not self.activo: return
+        self.root = root
+        self.esperado = time.perf_counter() + self.intervaloLatido
+        self.jobs = [root.after(int(self.intervaloLatido * 1000), self.heartbeat),
+                     root.after(int(self.intervaloLog * 1000), self.writeLog)]
+
+    def heartbeat(self):
+        ahora = time.perf_counter()
+        # Lo que el latido se atrasó es el tiempo que el bucle principal estuvo ocupado
+        self.record(BLOQUEO_BUCLE, max(0.0, (ahora - self.esperado) * 1000))
+        self.esperado = ahora + self.intervaloLatido
+        self.jobs[0] = self.root.after(int(self.intervaloLatido * 1000), self.heartbeat)
+
+    def writeLog(self):
+        if self.archivoLog:
+            fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                with open(self.archivoLog, "a", encoding="utf-8") as f:
+                    for accion, llamadas, p50, p95, p99, maximo in self.summary():
+                        f.write(f"{fecha}\t{accion}\tn={llamadas}\tp50={p50:.1f}\tp95={p95:.1f}\tp99={p99:.1f}\tmax={maximo:.1f} ms\n")
+            except OSError:
+                pass # El diagnóstico nunca debe interrumpir la venta
+        self.jobs[1] = self.root.after(int(self.intervaloLog * 1000), self.writeLog)
+
+    def stop(self):
+        if self.root is None: return
+        for job in self.jobs:
+            self.root.after_cancel(job)
+        self.root = None
+
+monitor = MonitorLatencia()
+
+def traced(accion=None):
+    """
+    Decorador que mide la duración de un manejador de la interfaz con el nombre 'accion'
+    (por defecto, Clase.metodo). Con el monitor apagado devuelve la función sin cambios.
+    """
+    def decorar(funcion):
+        if not monitor.activo:
+            return funcion
+        nombre = accion or funcion.__qualname__
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                monitor.record(nombre, (time.perf_counter() - inicio) * 1000)
+        return envoltura
+    return decorar
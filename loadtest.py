@@ -0,0 +1,142 @@
+"""
+Prueba de carga para el modo multi-caja.
+
+Lanza N cajeros vendiendo contra el mismo archivo de base de datos y reporta el rendimiento (ventas
+por segundo) y la latencia de cobro (p50, p95, p99 y máxima).
+
+- Modo 'procesos' (por defecto): cada cajero es un proceso con su propia conexión y cada venta es una
+  transacción con su propio COMMIT (como varias instancias de main.py).
+- Modo 'cola': cada cajero es un hilo que envía sus ventas a la cola de escritura (colaescritura.py),
+  que agrupa las ventas concurrentes en una sola transacción (como la API local).
+
+Uso:
+    python loadtest.py --cajas 4 --ventas 500
+    python loadtest.py --cajas 16 --ventas 200 --modo cola
+    python loadtest.py --db prueba.db --cajas 8 --ventas 200 --json resultados.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from colaescritura import ColaEscritura
+from database import Database
+from models import Venta
+
+def prepararBaseDatos(dbPath, numProductos):
+    """Crea una BD nueva con productos de stock muy alto para que las ventas no fallen por falta de stock."""
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(dbPath + sufijo):
+            os.remove(dbPath + sufijo)
+    db = Database(dbPath)
+    with db.connect() as conn:
+        conn.executemany(
+            "INSERT INTO productos (codigoBarras, nombre, descripcion, precioVenta, costoCompra, stock, idCategoria) VALUES (?, ?, '', ?, ?, ?, NULL)",
+            [(f"LT{i:08d}", f"Producto de prueba {i}", 10.0 + i % 90, 5.0 + i % 40, 10 ** 9) for i in range(numProductos)]
+        )
+        conn.commit()
+
+def carritoAleatorio(rng, numProductos):
+    carrito = []
+    for idProducto in rng.sample(range(1, numProductos + 1), rng.randint(1, 5)):
+        cantidad = rng.randint(1, 3)
+        precio = 10.0 + (idProducto - 1) % 90
+        carrito.append({"id": idProducto, "nombre": f"Producto de prueba {idProducto - 1}", "precio": precio, "cantidad": cantidad, "subtotal": precio * cantidad})
+    return carrito
+
+def simularCajero(argumentos):
+    """Proceso de un cajero: registra 'numVentas' ventas y devuelve sus latencias en segundos."""
+    dbPath, caja, numVentas, numProductos, semilla = argumentos
+    rng = random.Random(semilla)
+    db = Database(dbPath, caja=caja)
+    latencias, errores = [], 0
+    conn = db.connect()
+    for _ in range(numVentas):
+        carrito = carritoAleatorio(rng, numProductos)
+        inicio = time.perf_counter()
+        try:
+            Venta.create(conn, carrito, "Efectivo", 0.0, caja=caja)
+            latencias.append(time.perf_counter() - inicio)
+        except sqlite3.Error:
+            errores += 1
+    conn.close()
+    return latencias, errores
+
+def simularCajeroEnCola(cola, argumentos):
+    """Hilo de un cajero: envía sus ventas a la cola de escritura y espera cada confirmación."""
+    _, caja, numVentas, numProductos, semilla = argumentos
+    rng = random.Random(semilla)
+    latencias, errores = [], 0
+    for _ in range(numVentas):
+        carrito = carritoAleatorio(rng, numProductos)
+        inicio = time.perf_counter()
+        try:
+            cola.submit(Venta.create, carrito, "Efectivo", 0.0, caja).result()
+            latencias.append(time.perf_counter() - inicio)
+        except (sqlite3.Error, ValueError):
+            errores += 1
+    return latencias, errores
+
+def percentil(valoresOrdenados, p):
+    if not valoresOrdenados:
+        return 0.0
+    indice = min(len(valoresOrdenados) - 1, int(round(p / 100 * (len(valoresOrdenados) - 1))))
+    return valoresOrdenados[indice]
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de varias cajas sobre un mismo pos.db")
+    parser.add_argument("--db", default="loadtest.db", help="Archivo de BD a usar (se recrea)")
+    parser.add_argument("--cajas", type=int, default=4, help="Número de cajas (procesos) simultáneas")
+    parser.add_argument("--ventas", type=int, default=200, help="Ventas por caja")
+    parser.add_argument("--productos", type=int, default=1000, help="Productos en el catálogo de prueba")
+    parser.add_argument("--modo", choices=("procesos", "cola"), default="procesos", help="Un proceso por caja, o hilos sobre la cola de escritura")
+    parser.add_argument("--ventana-ms", type=float, default=3, help="Ventana de agrupación de la cola de escritura (modo 'cola')")
+    parser.add_argument("--json", help="Guarda los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    prepararBaseDatos(args.db, args.productos)
+    tareas = [(args.db, f"L{i + 1}", args.ventas, args.productos, i) for i in range(args.cajas)]
+
+    inicio = time.perf_counter()
+    if args.modo == "cola":
+        cola = ColaEscritura(Database(args.db), ventanaMs=args.ventana_ms)
+        cola.start()
+        with ThreadPoolExecutor(args.cajas) as hilos:
+            resultados = list(hilos.map(lambda tarea: simularCajeroEnCola(cola, tarea), tareas))
+        cola.stop()
+        cola.join()
+    else:
+        with multiprocessing.Pool(args.cajas) as pool:
+            resultados = pool.map(simularCajero, tareas)
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(lat for lats, _ in resultados for lat in lats)
+    errores = sum(err for _, err in resultados)
+    reporte = {
+        "modo": args.modo,
+        "cajas": args.cajas,
+        "ventasPorCaja": args.ventas,
+        "ventasRegistradas": len(latencias),
+        "errores": errores,
+        "duracionSeg": round(duracion, 3),
+        "ventasPorSeg": round(len(latencias) / duracion, 1) if duracion else 0.0,
+        "latenciaMs": {nombre: round(percentil(latencias, p) * 1000, 2) for nombre, p in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+    }
+
+    if args.modo == "cola":
+        reporte["lotes"] = cola.lotes
+        reporte["ventasPorLote"] = round(cola.intenciones / cola.lotes, 1) if cola.lotes else 0.0
+        print(f"Lotes confirmados: {reporte['lotes']} | Ventas por lote: {reporte['ventasPorLote']}")
+    print(f"Modo: {reporte['modo']} | Cajas: {reporte['cajas']} | Ventas registradas: {reporte['ventasRegistradas']} | Errores: {reporte['errores']}")
+    print(f"Duración: {reporte['duracionSeg']} s | Rendimiento: {reporte['ventasPorSeg']} ventas/s")
+    print("Latencia de cobro (ms): " + ", ".join(f"{k}={v}" for k, v in reporte["latenciaMs"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Métricas de operación de la tienda en formato de texto de Prometheus.
+
+Las métricas se alimentan desde los caminos que ya existen (Venta.create, la cola de escritura, el libro
+de stock, Database) y se guardan en memoria, así que consultarlas no ejecuta los reportes pesados del
+dashboard. Solo lo que no se puede contar en memoria (tamaño de la BD y del WAL, productos con stock
+bajo) se calcula al momento de la consulta, y el conteo de stock bajo se guarda unos segundos.
+
+ExportadorMetricas publica todo en http://127.0.0.1:<puerto>/metrics ([Metricas] puerto en config.info,
+o --metrics-port en api.py). Cada caja es un proceso con sus propias métricas, así que cada una usa su
+propio puerto.
+"""
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def formatValue(valor):
+    """Valor numérico sin pérdida de precisión (los enteros, sin decimales ni notación científica)."""
+    valor = float(valor)
+    return str(int(valor)) if valor.is_integer() else repr(valor)
+
+class Contador:
+    """Valor que solo crece (por ejemplo, ventas registradas)."""
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda):
+        self.nombre, self.ayuda = nombre, ayuda
+        self.valor = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, cantidad=1):
+        with self.lock:
+            self.valor += cantidad
+
+    def render(self):
+        return [f"{self.nombre} {formatValue(self.valor)}"]
+
+class Medidor:
+    """Valor que se calcula al consultar las métricas mediante una función."""
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, funcion):
+        self.nombre, self.ayuda, self.funcion = nombre, ayuda, funcion
+
+    def render(self):
+        try:
+            return [f"{self.nombre} {formatValue(self.funcion())}"]
+        except Exception:
+            return [] # Una métrica que no se pudo calcular se omite, sin romper las demás
+
+class Histograma:
+    """Distribución de valores en cubetas acumulativas (por ejemplo, latencia de cobro)."""
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, limites):
+        self.nombre, self.ayuda, self.limites = nombre, ayuda, list(limites)
+        self.cubetas = [0] * len(self.limites)
+        self.suma = 0.0
+        self.cuenta = 0
+        self.lock = threading.Lock()
+
+    def observe(self, valor):
+        with self.lock:
+            self.suma += valor
+            self.cuenta += 1
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    self.cubetas[i] += 1
+                    break
+
+    def render(self):
+        with self.lock:
+            cubetas, suma, cuenta = list(self.cubetas), self.suma, self.cuenta
+        lineas, acumulado = [], 0
+        for limite, cantidad in zip(self.limites, cubetas):
+            acumulado += cantidad
+            lineas.append(f'{self.nombre}_bucket{{le="{limite:g}"}} {acumulado}')
+        lineas.append(f'{self.nombre}_bucket{{le="+Inf"}} {cuenta}')
+        lineas.append(f"{self.nombre}_sum {formatValue(suma)}")
+        lineas.append(f"{self.nombre}_count {cuenta}")
+        return lineas
+
+class RegistroMetricas:
+    """Conjunto de métricas del proceso y su representación en formato de texto de Prometheus."""
+    def __init__(self):
+        self.metricas = {}
+        self.ventasRecientes = deque() # Momentos (monotónicos) de las ventas del último minuto
+        self.lockRecientes = threading.Lock()
+        self.diferidas = threading.local() # Observaciones de escrituras sin confirmar, por hilo (ver capture)
+        self.db = None
+
+        self.ventas = self.add(Contador("pos_ventas_total", "Ventas registradas por este proceso"))
+        self.importeVentas = self.add(Contador("pos_ventas_importe_total", "Importe total vendido (con descuento)"))
+        self.tamanoTicket = self.add(Histograma("pos_ticket_articulos", "Artículos por ticket", (1, 2, 3, 5, 8, 13, 21, 34)))
+        self.importeTicket = self.add(Histograma("pos_ticket_importe", "Importe por ticket", (10, 25, 50, 100, 200, 500, 1000, 2500)))
+        self.latenciaCobro = self.add(Histograma("pos_cobro_latencia_segundos", "Duración de la transacción de la venta",
+                                                 (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)))
+        self.ventasFallidas = self.add(Contador("pos_ventas_rechazadas_total", "Ventas rechazadas (falta de stock u otro error)"))
+        self.loteEscritura = self.add(Histograma("pos_cola_escritura_lote", "Intenciones confirmadas por transacción en la cola de escritura", (1, 2, 4, 8, 16, 32, 64, 128)))
+        self.libroAciertos = self.add(Contador("pos_libro_stock_aciertos_total", "Consultas de stock resueltas en memoria"))
+        self.libroFallos = self.add(Contador("pos_libro_stock_fallos_total", "Consultas de stock que tuvieron que ir a la BD"))
+        self.tareasFallidas = self.add(Contador("pos_tareas_fondo_fallidas_total", "Tareas de fondo que fallaron (pronósticos, teclas rápidas)"))
+        self.add(Medidor("pos_ventas_por_minuto", "Ventas registradas en los últimos 60 segundos", self.salesLastMinute))
+        self.add(Medidor("pos_libro_stock_tasa_aciertos", "Proporción de consultas de stock resueltas en memoria", self.hitRate))
+
+    def add(self, metrica):
+        self.metricas[metrica.nombre] = metrica
+        return metrica
+
+    def defer(self, funcion, *args):
+        """
+        Registra la observación funcion(*args) de una escritura que todavía no se confirma. Dentro de capture
+        (la cola de escritura) se guarda para aplicarla después del COMMIT; fuera de capture se aplica ya.
+        """
+        pendientes = getattr(self.diferidas, "pendientes", None)
+        if pendientes is None:
+            funcion(*args)
+        else:
+            pendientes.append((funcion, args))
+
+    def capture(self):
+        """Empieza a guardar las observaciones diferidas de este hilo."""
+        self.diferidas.pendientes = []
+
+    def takeCaptured(self):
+        """Termina la captura y devuelve las observaciones guardadas, para aplicarlas con applyCaptured."""
+        pendientes, self.diferidas.pendientes = getattr(self.diferidas, "pendientes", None) or [], None
+        return pendientes
+
+    def applyCaptured(self, pendientes):
+        for funcion, args in pendientes:
+            funcion(*args)
+
+    def observeSale(self, articulos, importe, segundos):
+        """Registra una venta confirmada: tamaño del ticket, importe y duración de la transacción."""
+        self.ventas.inc()
+        self.importeVentas.inc(importe)
+        self.tamanoTicket.observe(articulos)
+        self.importeTicket.observe(importe)
+        self.latenciaCobro.observe(segundos)
+        ahora = time.monotonic()
+        with self.lockRecientes:
+            self.ventasRecientes.append(ahora)
+
+    def salesLastMinute(self):
+        limite = time.monotonic() - 60
+        with self.lockRecientes:
+            while self.ventasRecientes and self.ventasRecientes[0] < limite:
+                self.ventasRecientes.popleft()
+            return len(self.ventasRecientes)
+
+    def hitRate(self):
+        total = self.libroAciertos.valor + self.libroFallos.valor
+        return self.libroAciertos.valor / total if total else 0.0
+
+    def attachDatabase(self, db_instance, cacheSegundos=30):
+        """Agrega las métricas que dependen de la BD: tamaño del archivo y del WAL, y productos por reordenar."""
+        from models import Producto # Import local: models importa este módulo para registrar las ventas
+        self.db = db_instance
+        cache = {"momento": 0.0, "valor": 0}
+
+        def bajoStock():
+            if time.monotonic() - cache["momento"] > cacheSegundos:
+                conn = db_instance.connect()
+                try:
+                    # Solo lee el contador: los pronósticos (que cambian los mínimos) los actualizan el punto de
+                    # venta, el dashboard y la ventana de productos por reordenar, no el hilo de /metrics
+                    cache["valor"] = Producto.countLowStock(conn)
+                finally:
+                    conn.close()
+                cache["momento"] = time.monotonic()
+            return cache["valor"]
+
+        tamano = lambda ruta: os.path.getsize(ruta) if os.path.exists(ruta) else 0
+        self.add(Medidor("pos_db_bytes", "Tamaño del archivo de la base de datos", lambda: tamano(db_instance.dbPath)))
+        self.add(Medidor("pos_db_wal_bytes", "Tamaño del archivo WAL", lambda: tamano(db_instance.dbPath + "-wal")))
+        self.add(Medidor("pos_productos_bajo_stock", "Productos con stock menor o igual a su mínimo (propio o punto de reorden)", bajoStock))
+
+    def render(self):
+        lineas = []
+        for metrica in list(self.metricas.values()):
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.render())
+        return "\n".join(lineas) + "\n"
+
+metricas = RegistroMetricas()
+
+class ExportadorMetricas(threading.Thread):
+    """Hilo que sirve /metrics por HTTP en localhost."""
+    def __init__(self, registro=metricas, host="127.0.0.1", puerto=9108):
+        super().__init__(name="ExportadorMetricas", daemon=True)
+        registroServidor = registro
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = registroServidor.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass # Sin ruido en la consola por cada consulta
+
+        self.servidor = ThreadingHTTPServer((host, puerto), Manejador)
+
+    def run(self):
+        self.servidor.serve_forever()
+
+    def stop(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
@@ -1,507 +1,1545 @@
-import hashlib
-from datetime import datetime, timedelta
-
-class Usuario:
-    """Clase que maneja la lógica de negocio para los usuarios."""
-    @staticmethod
-    def hashPassword(password):
-        """Genera un hash SHA256 para una contraseña dada."""
-        return hashlib.sha256(password.encode()).hexdigest()
-
-    @staticmethod
-    def verifyCredentials(dbConnection, username, password):
-        """Verifica si el usuario y la contraseña coinciden con un registro en la BD."""
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT passwordHash, role FROM usuarios WHERE username = ?", (username,))
-        result = cursor.fetchone()
-        if result and result[0] == Usuario.hashPassword(password):
-            return result[1] # Devuelve el rol si las credenciales son correctas
-        return None
-
-    @staticmethod
-    def create(dbConnection, username, password, role):
-        """Crea un nuevo usuario en la base de datos."""
-        if not all([username, password, role]):
-            raise ValueError("Todos los campos son requeridos.")
-        if role not in ['admin', 'cajero']:
-            raise ValueError("El rol debe ser 'admin' o 'cajero'.")
-        try:
-            cursor = dbConnection.cursor()
-            cursor.execute("INSERT INTO usuarios (username, passwordHash, role) VALUES (?, ?, ?)", (username, Usuario.hashPassword(password), role))
-            dbConnection.commit()
-        except dbConnection.IntegrityError:
-            raise ValueError(f"El nombre de usuario '{username}' ya existe.")
-
-    @staticmethod
-    def update(dbConnection, userId, username, password, role):
-        """Actualiza los datos de un usuario. Si la contraseña está vacía, no se modifica."""
-        if not all([username, role]):
-            raise ValueError("El nombre de usuario y el rol son requeridos.")
-        if role not in ['admin', 'cajero']:
-            raise ValueError("El rol debe ser 'admin' o 'cajero'.")
-        try:
-            cursor = dbConnection.cursor()
-            if password:
-                cursor.execute("UPDATE usuarios SET username = ?, passwordHash = ?, role = ? WHERE idUsuario = ?", (username, Usuario.hashPassword(password), role, userId))
-            else:
-                cursor.execute("UPDATE usuarios SET username = ?, role = ? WHERE idUsuario = ?", (username, role, userId))
-            dbConnection.commit()
-        except dbConnection.IntegrityError:
-            raise ValueError(f"El nombre de usuario '{username}' ya pertenece a otro usuario.")
-
-    @staticmethod
-    def delete(dbConnection, userId):
-        """Elimina un usuario por su ID."""
-        cursor = dbConnection.cursor()
-        cursor.execute("DELETE FROM usuarios WHERE idUsuario = ?", (userId,))
-        dbConnection.commit()
-        
-    @staticmethod
-    def getAll(dbConnection):
-        """Obtiene una lista de todos los usuarios (sin sus contraseñas)."""
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT idUsuario, username, role FROM usuarios")
-        return cursor.fetchall()
-
-    @staticmethod
-    def createDefaultAdminIfNeeded(dbConnection):
-        """Si no hay usuarios en la BD, crea un usuario 'admin' con contraseña 'admin'."""
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM usuarios")
-        if cursor.fetchone()[0] == 0:
-            Usuario.create(dbConnection, "admin", "admin", "admin")
-            print("Usuario 'admin' por defecto creado con contraseña 'admin'.")
-
-# ---------------------------------------------------------------------------
-
-class Categoria:
-    """Clase que maneja la lógica de negocio para las categorías de productos."""
-    @staticmethod
-    def create(dbConnection, nombre):
-        try:
-            cursor = dbConnection.cursor()
-            cursor.execute("INSERT INTO categorias (nombre) VALUES (?)", (nombre,))
-            dbConnection.commit()
-        except dbConnection.IntegrityError:
-            raise ValueError(f"La categoría '{nombre}' ya existe.")
-
-    @staticmethod
-    def getAll(dbConnection):
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT idCategoria, nombre FROM categorias ORDER BY nombre")
-        return cursor.fetchall()
-
-# ---------------------------------------------------------------------------
-
-class Producto:
-    """Clase para todas las operaciones relacionadas con el inventario de productos."""
-    @staticmethod
-    def getAll(dbConnection, categoriaId=None):
-        """Obtiene todos los productos, opcionalmente filtrados por categoría."""
-        cursor = dbConnection.cursor()
-        query = "SELECT p.idProducto, p.codigoBarras, p.nombre, IFNULL(c.nombre, 'Sin Categoría'), p.precioVenta, p.costoCompra, p.stock FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria"
-        params = []
-        if categoriaId:
-            query += " WHERE p.idCategoria = ?"
-            params.append(categoriaId)
-        query += " ORDER BY p.nombre"
-        cursor.execute(query, params)
-        return cursor.fetchall()
-    
-    @staticmethod
-    def searchInventory(dbConnection, term):
-        """Busca productos en el inventario por nombre o código de barras."""
-        cursor = dbConnection.cursor()
-        query = """
-            SELECT p.idProducto, p.codigoBarras, p.nombre, IFNULL(c.nombre, 'Sin Categoría'), 
-                   p.precioVenta, p.costoCompra, p.stock 
-            FROM productos p 
-            LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
-            WHERE p.nombre LIKE ? OR p.codigoBarras LIKE ?
-            ORDER BY p.nombre
-        """
-        cursor.execute(query, (f"%{term}%", f"%{term}%"))
-        return cursor.fetchall()
-
-    @staticmethod
-    def getLowStock(dbConnection, limit=5):
-        """Obtiene una lista de productos con stock bajo o igual al límite especificado."""
-        cursor = dbConnection.cursor()
-        cursor.execute("""
-            SELECT p.idProducto, p.codigoBarras, p.nombre, IFNULL(c.nombre, 'Sin Categoría'), p.stock 
-            FROM productos p 
-            LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
-            WHERE p.stock <= ? AND p.nombre != 'Recarga Celular'
-            ORDER BY p.stock ASC
-        """, (limit,))
-        return cursor.fetchall()
-
-    @staticmethod
-    def getByBarcode(dbConnection, barcode):
-        """Busca un producto específico por su código de barras."""
-        cursor = dbConnection.cursor()
-        query = "SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria WHERE p.codigoBarras = ?"
-        cursor.execute(query, (barcode,))
-        fila = cursor.fetchone()
-        if fila:
-            column_names = [description[0] for description in cursor.description]
-            return dict(zip(column_names, fila))
-        return None
-
-    @staticmethod
-    def getById(dbConnection, productoId):
-        """Obtiene los datos completos de un producto por su ID."""
-        cursor = dbConnection.cursor()
-        query = "SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria WHERE p.idProducto = ?"
-        cursor.execute(query, (productoId,))
-        fila = cursor.fetchone()
-        if fila:
-            column_names = [description[0] for description in cursor.description]
-            return dict(zip(column_names, fila))
-        return None
-
-    @staticmethod
-    def searchByName(dbConnection, partialName):
-        """Busca productos por una coincidencia parcial en el nombre."""
-        cursor = dbConnection.cursor()
-        query = "SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria WHERE p.nombre LIKE ? ORDER BY nombre"
-        cursor.execute(query, (f"%{partialName}%",))
-        filas = cursor.fetchall()
-        if filas:
-            column_names = [description[0] for description in cursor.description]
-            return [dict(zip(column_names, fila)) for fila in filas]
-        return []
-    
-    @staticmethod
-    def create(dbConnection, codigoBarras, nombre, precioVenta, costoCompra, stock, idCategoria):
-        """Crea un nuevo producto en la base de datos."""
-        try:
-            cursor = dbConnection.cursor()
-            cursor.execute("INSERT INTO productos (codigoBarras, nombre, descripcion, precioVenta, costoCompra, stock, idCategoria) VALUES (?, ?, ?, ?, ?, ?, ?)", (codigoBarras, nombre, "", float(precioVenta), float(costoCompra), int(stock), idCategoria))
-            dbConnection.commit()
-        except dbConnection.IntegrityError: raise ValueError(f"El código de barras '{codigoBarras}' ya existe.")
-
-    @staticmethod
-    def update(dbConnection, productoId, codigoBarras, nombre, precioVenta, costoCompra, stock, idCategoria):
-        """Actualiza los datos de un producto existente."""
-        try:
-            cursor = dbConnection.cursor()
-            cursor.execute("UPDATE productos SET codigoBarras=?, nombre=?, precioVenta=?, costoCompra=?, stock=?, idCategoria=? WHERE idProducto=?", (codigoBarras, nombre, precioVenta, costoCompra, stock, idCategoria, productoId))
-            dbConnection.commit()
-        except dbConnection.IntegrityError: raise ValueError(f"El código de barras '{codigoBarras}' ya pertenece a otro producto.")
-
-    @staticmethod
-    def delete(dbConnection, productoId):
-        """Elimina un producto de la base de datos."""
-        cursor = dbConnection.cursor()
-        cursor.execute("DELETE FROM productos WHERE idProducto = ?", (productoId,))
-        dbConnection.commit()
-
-    @staticmethod
-    def updateStock(dbConnection, productoId, cantidad):
-        """Ajusta el stock de un producto. Usa valores negativos para decrementos (ventas)."""
-        cursor = dbConnection.cursor()
-        cursor.execute("UPDATE productos SET stock = stock + ? WHERE idProducto = ?", (cantidad, productoId))
-        dbConnection.commit()
-
-    @staticmethod
-    def populateInitialProducts(dbConnection):
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM productos")
-        if cursor.fetchone()[0] > 0: return
-        
-        # Crear categoría de dulces y obtener su ID
-        try:
-            Categoria.create(dbConnection, "Dulces")
-        except ValueError:
-            pass # La categoría ya existe
-        
-        cursor.execute("SELECT idCategoria FROM categorias WHERE nombre = 'Dulces'")
-        id_dulces_result = cursor.fetchone()
-        id_dulces = id_dulces_result[0] if id_dulces_result else None
-
-
-        productosIniciales = [
-            ("7501031310017", "Lápiz HB #2", "Lápiz de grafito para escritura general", 3.50, 1.50, 100, "Papelería"),
-            ("7501031310024", "Cuaderno Profesional 100 Hojas Raya", "Cuaderno de 100 hojas a raya", 25.00, 12.00, 50, "Papelería"),
-            ("7501031310031", "Borrador de Goma", "Borrador de goma blanco, no mancha", 4.00, 2.00, 75, "Papelería"),
-            ("7501031310048", "Celomágico Mediano Adhesivo (Adosa)", "Cinta adhesiva mágica, acabado mate, 50 yardas", 30.00, 15.00, 40, "Papelería"),
-            ("7501031310055", "Euroformas Cuaderno Profesional 5x8", "Cuaderno profesional de 5x8 pulgadas", 28.00, 13.00, 35, "Papelería"),
-        ]
-        try:
-            cursor.executemany("INSERT INTO productos (codigoBarras, nombre, descripcion, precioVenta, costoCompra, stock, idCategoria) VALUES (?, ?, ?, ?, ?, ?, ?)", productosIniciales)
-            dbConnection.commit()
-            print("Productos iniciales insertados.")
-        except dbConnection.IntegrityError: pass
-
-# ---------------------------------------------------------------------------
-
-class Venta:
-    """Clase para la lógica de ventas y la generación de reportes financieros."""
-    @staticmethod
-    def create(dbConnection, carrito, metodoPago, descuento):
-        """
-        Registra una nueva venta, sus detalles y actualiza el stock de los productos vendidos.
-        Devuelve el ID de la venta creada.
-        """
-        cursor = dbConnection.cursor()
-        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        subtotal = sum(item['subtotal'] for item in carrito)
-        total = subtotal - descuento
-        
-        cursor.execute("INSERT INTO ventas (fecha, subtotal, descuento, totalVenta, metodoPago) VALUES (?, ?, ?, ?, ?)", (fecha, subtotal, descuento, total, metodoPago))
-        ventaId = cursor.lastrowid
-        
-        for item in carrito:
-            cursor.execute("INSERT INTO detallesVenta (idVenta, idProducto, cantidad, precioUnitario, subtotal) VALUES (?, ?, ?, ?, ?)", (ventaId, item['id'], item['cantidad'], item['precio'], item['subtotal']))
-            # Las recargas no descuentan stock del inventario físico
-            if not item['nombre'].startswith("Recarga Celular"):
-                 Producto.updateStock(dbConnection, item['id'], -item['cantidad'])
-
-        dbConnection.commit()
-        return ventaId
-
-    @staticmethod
-    def getById(dbConnection, ventaId):
-        """Obtiene todos los datos de una venta, incluyendo sus detalles, por su ID."""
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT * FROM ventas WHERE idVenta = ?", (ventaId,))
-        venta = cursor.fetchone()
-        if not venta: return None
-
-        column_names = [d[0] for d in cursor.description]
-        ventaData = dict(zip(column_names, venta))
-
-        cursor.execute("SELECT dv.*, p.nombre FROM detallesVenta dv JOIN productos p ON dv.idProducto = p.idProducto WHERE dv.idVenta = ?", (ventaId,))
-        detalles = cursor.fetchall()
-        
-        column_names_detalles = [d[0] for d in cursor.description]
-        ventaData['detalles'] = [dict(zip(column_names_detalles, d)) for d in detalles]
-        return ventaData
-
-    @staticmethod
-    def get_date_range(periodo):
-        """Función de ayuda para obtener las fechas de inicio y fin según un período ('dia', 'semana', 'mes')."""
-        hoy = datetime.now()
-        if periodo == 'dia':
-            start_date = hoy.strftime('%Y-%m-%d')
-            end_date = start_date
-        elif periodo == 'semana':
-            start_date = (hoy - timedelta(days=hoy.weekday())).strftime('%Y-%m-%d')
-            end_date = hoy.strftime('%Y-%m-%d')
-        elif periodo == 'mes':
-            start_date = hoy.strftime('%Y-%m-01')
-            end_date = hoy.strftime('%Y-%m-%d')
-        else:
-            return None, None
-        return f'{start_date} 00:00:00', f'{end_date} 23:59:59'
-
-    @staticmethod
-    def getReporteVentas(dbConnection, periodo):
-        """
-        Genera un reporte de ventas simple para un período dado.
-        Calcula totales brutos, netos, descuentos, devoluciones y los productos más vendidos.
-        """
-        start, end = Venta.get_date_range(periodo)
-        cursor = dbConnection.cursor()
-        
-        cursor.execute("SELECT COALESCE(SUM(totalVenta), 0), COALESCE(SUM(descuento), 0), COUNT(idVenta) FROM ventas WHERE fecha BETWEEN ? AND ?", (start, end))
-        totalNeto, totalDesc, numTickets = cursor.fetchone()
-        
-        cursor.execute("SELECT COALESCE(SUM(montoDevuelto), 0) FROM devoluciones WHERE fecha BETWEEN ? AND ?", (start, end))
-        totalDevoluciones = cursor.fetchone()[0]
-
-        totalBruto = totalNeto + totalDesc
-        ventasNetasFinal = totalNeto - totalDevoluciones
-        
-        cursor.execute("""
-            SELECT p.nombre, SUM(dv.cantidad) as total_vendido
-            FROM detallesVenta dv
-            JOIN ventas v ON dv.idVenta = v.idVenta
-            JOIN productos p ON dv.idProducto = p.idProducto
-            WHERE v.fecha BETWEEN ? AND ? AND p.nombre != 'Recarga Celular'
-            GROUP BY p.idProducto ORDER BY total_vendido DESC LIMIT 5
-        """, (start, end))
-        productosMasVendidos = cursor.fetchall()
-
-        return {
-            'totalBruto': totalBruto, 'totalDescuentos': totalDesc, 'totalDevoluciones': totalDevoluciones,
-            'ventasNetas': ventasNetasFinal, 'numTickets': numTickets, 'productosMasVendidos': productosMasVendidos
-        }
-
-    @staticmethod
-    def getReporteGanancias(dbConnection, periodo):
-        """
-        Genera un reporte financiero detallado, calculando la ganancia neta estimada.
-        Considera ingresos, costos de productos, descuentos, devoluciones y otros gastos.
-        """
-        start, end = Venta.get_date_range(periodo)
-        cursor = dbConnection.cursor()
-        # Ingresos
-        cursor.execute("SELECT COALESCE(SUM(totalVenta), 0), COALESCE(SUM(descuento), 0) FROM ventas WHERE fecha BETWEEN ? AND ?", (start, end))
-        ingresosNetos, totalDesc = cursor.fetchone()
-        ingresosBrutos = ingresosNetos + totalDesc
-        # Costo de mercancía vendida (excluyendo recargas)
-        cursor.execute("""
-            SELECT COALESCE(SUM(dv.cantidad * p.costoCompra), 0)
-            FROM detallesVenta dv JOIN productos p ON dv.idProducto = p.idProducto
-            WHERE dv.idVenta IN (SELECT idVenta FROM ventas WHERE fecha BETWEEN ? AND ?) AND p.nombre != 'Recarga Celular'
-        """, (start, end))
-        costosTotales = cursor.fetchone()[0]
-        # Ganancia e ingresos por recargas
-        cursor.execute("""
-            SELECT COALESCE(SUM(dv.cantidad), 0) FROM detallesVenta dv JOIN productos p ON dv.idProducto = p.idProducto
-            WHERE dv.idVenta IN (SELECT idVenta FROM ventas WHERE fecha BETWEEN ? AND ?) AND p.nombre = 'Recarga Celular'
-        """, (start, end))
-        gananciaRecargas = cursor.fetchone()[0]
-        cursor.execute("""
-            SELECT COALESCE(SUM(dv.subtotal), 0) FROM detallesVenta dv JOIN productos p ON dv.idProducto = p.idProducto
-            WHERE dv.idVenta IN (SELECT idVenta FROM ventas WHERE fecha BETWEEN ? AND ?) AND p.nombre = 'Recarga Celular'
-        """, (start, end))
-        ingresoTotalRecargas = cursor.fetchone()[0]
-        # Egresos (devoluciones y gastos)
-        cursor.execute("SELECT COALESCE(SUM(montoDevuelto), 0) FROM devoluciones WHERE fecha BETWEEN ? AND ?", (start, end))
-        totalDevoluciones = cursor.fetchone()[0]
-        cursor.execute("SELECT COALESCE(SUM(monto), 0) FROM gastos WHERE DATE(fecha) BETWEEN ? AND ?", (start.split(' ')[0], end.split(' ')[0]))
-        totalGastos = cursor.fetchone()[0]
-        return {
-            'ingresosBrutos': ingresosBrutos, 'costosTotales': costosTotales,
-            'totalDescuentos': totalDesc, 'totalDevoluciones': totalDevoluciones,
-            'totalGastos': totalGastos, 'gananciaRecargas': gananciaRecargas,
-            'ingresoTotalRecargas': ingresoTotalRecargas
-        }
-        
-    @staticmethod
-    def getDashboardData(dbConnection):
-        """Obtiene los datos clave para las tarjetas de resumen del dashboard (ventas de hoy, tickets, etc.)."""
-        start, end = Venta.get_date_range('dia')
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT COALESCE(SUM(totalVenta), 0), COUNT(idVenta) FROM ventas WHERE fecha BETWEEN ? AND ?", (start, end))
-        ventasHoy, ticketsHoy = cursor.fetchone()
-        cursor.execute("SELECT COUNT(idProducto) FROM productos WHERE stock <= 5 AND nombre != 'Recarga Celular'")
-        bajoStock = cursor.fetchone()[0]
-        return {'ventasNetasHoy': ventasHoy, 'numTicketsHoy': ticketsHoy, 'productosBajoStock': bajoStock}
-
-    @staticmethod
-    def getVentasUltimosDias(dbConnection, dias=7):
-        """
-        Calcula las ventas totales para cada uno de los últimos 'dias'.
-        Devuelve un diccionario con abreviaturas de días de la semana en español como claves.
-        """
-        ventas = {}
-        dias_es = {"Mon": "Lun", "Tue": "Mar", "Wed": "Mié", "Thu": "Jue", "Fri": "Vie", "Sat": "Sáb", "Sun": "Dom"}
-        hoy = datetime.now()
-        
-        for i in range(dias):
-            fecha_dt = hoy - timedelta(days=i)
-            fecha_str = fecha_dt.strftime('%Y-%m-%d')
-            
-            cursor = dbConnection.cursor()
-            cursor.execute("SELECT COALESCE(SUM(totalVenta), 0) FROM ventas WHERE DATE(fecha) = ?", (fecha_str,))
-            total = cursor.fetchone()[0]
-            
-            dia_semana_en = fecha_dt.strftime('%a')
-            dia_semana_es = dias_es.get(dia_semana_en, dia_semana_en)
-            
-            ventas[dia_semana_es] = total
-            
-        # Devuelve el diccionario en orden cronológico (los días más antiguos primero)
-        return dict(reversed(list(ventas.items())))
-
-    @staticmethod
-    def getVentasPorCategoria(dbConnection, periodo):
-        """Obtiene el total de ingresos agrupado por categoría para un período dado."""
-        start, end = Venta.get_date_range(periodo)
-        cursor = dbConnection.cursor()
-        cursor.execute("""
-            SELECT IFNULL(c.nombre, 'Sin Categoría'), SUM(dv.subtotal) 
-            FROM detallesVenta dv
-            JOIN productos p ON dv.idProducto = p.idProducto
-            LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
-            JOIN ventas v ON dv.idVenta = v.idVenta
-            WHERE v.fecha BETWEEN ? AND ?
-            GROUP BY c.nombre HAVING SUM(dv.subtotal) > 0.01
-            ORDER BY SUM(dv.subtotal) DESC
-        """, (start, end))
-        return cursor.fetchall()
-        
-    @staticmethod
-    def getTopProductos(dbConnection, periodo, limit=5):
-        """Obtiene los productos más vendidos por ingresos en un período."""
-        start, end = Venta.get_date_range(periodo)
-        cursor = dbConnection.cursor()
-        cursor.execute("""
-            SELECT p.nombre, SUM(dv.subtotal) as total
-            FROM detallesVenta dv
-            JOIN productos p ON dv.idProducto = p.idProducto
-            JOIN ventas v ON dv.idVenta = v.idVenta
-            WHERE v.fecha BETWEEN ? AND ?
-            GROUP BY p.nombre ORDER BY total DESC LIMIT ?
-        """, (start, end, limit))
-        return cursor.fetchall()
-
-    @staticmethod
-    def getLibroDiario(dbConnection, periodo):
-        """Combina ventas, gastos y devoluciones en un solo historial cronológico (libro diario)."""
-        start, end = Venta.get_date_range(periodo)
-        cursor = dbConnection.cursor()
-        query = f"""
-            SELECT fecha, 'Venta Ticket #' || idVenta, totalVenta, 'venta', idVenta FROM ventas WHERE fecha BETWEEN ? AND ?
-            UNION ALL
-            SELECT fecha, 'Gasto: ' || descripcion, -monto, 'gasto', idGasto FROM gastos WHERE fecha BETWEEN ? AND ?
-            UNION ALL
-            SELECT fecha, 'Devolución de Venta #' || idVentaOriginal, -montoDevuelto, 'devolucion', idDevolucion FROM devoluciones WHERE fecha BETWEEN ? AND ?
-            ORDER BY fecha DESC
-        """
-        start_date, end_date = start.split(' ')[0], end.split(' ')[0]
-        params = (start, end, f"{start_date} 00:00:00", f"{end_date} 23:59:59", start, end)
-        cursor.execute(query, params)
-        return cursor.fetchall()
-
-# ---------------------------------------------------------------------------
-
-class Devolucion:
-    """Clase para manejar la lógica de las devoluciones."""
-    @staticmethod
-    def create(dbConnection, idVentaOriginal, items):
-        """
-        Registra una devolución, detallando los productos y el monto.
-        Actualiza (incrementa) el stock de los productos devueltos.
-        """
-        cursor = dbConnection.cursor()
-        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for item in items:
-            cursor.execute("""
-                INSERT INTO devoluciones (idVentaOriginal, idProducto, cantidad, montoDevuelto, fecha)
-                VALUES (?, ?, ?, ?, ?)
-            """, (idVentaOriginal, item['idProducto'], item['cantidad'], item['montoDevuelto'], fecha))
-            # Las recargas no se devuelven al stock.
-            if not item['nombreProducto'].startswith("Recarga Celular"):
-                Producto.updateStock(dbConnection, item['idProducto'], item['cantidad'])
-        dbConnection.commit()
-
-# ---------------------------------------------------------------------------
-
-class Gasto:
-    """Clase para manejar la lógica de los gastos operativos."""
-    @staticmethod
-    def create(dbConnection, descripcion, monto):
-        """Registra un nuevo gasto en la base de datos."""
-        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor = dbConnection.cursor()
-        cursor.execute("INSERT INTO gastos (fecha, descripcion, monto) VALUES (?, ?, ?)", (fecha, descripcion, monto))
-        dbConnection.commit()
-
-    @staticmethod
-    def getByDate(dbConnection, fecha):
-        """Obtiene todos los gastos registrados en una fecha específica."""
-        cursor = dbConnection.cursor()
-        cursor.execute("SELECT idGasto, fecha, descripcion, monto FROM gastos WHERE DATE(fecha) = ? ORDER BY fecha DESC", (fecha,))
-        return cursor.fetchall()
-
-    @staticmethod
-    def delete(dbConnection, gastoId):
-        """Elimina un gasto por su ID."""
-        cursor = dbConnection.cursor()
-        cursor.execute("DELETE FROM gastos WHERE idGasto = ?", (gastoId,))
-        dbConnection.commit()
\ No newline at end of file
+import hashlib
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta
+
+from database import retryOnBusy, archivePath, archivedYears, VIDA_MEDIA_POPULARIDAD_DIAS, MAX_ARCHIVOS_ADJUNTOS
+from metricas import metricas
+
+class Usuario:
+    """Clase que maneja la lógica de negocio para los usuarios."""
+    @staticmethod
+    def hashPassword(password):
+        """Genera un hash SHA256 para una contraseña dada."""
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    @staticmethod
+    def verifyCredentials(dbConnection, username, password):
+        """Verifica si el usuario y la contraseña coinciden con un registro en la BD."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT passwordHash, role FROM usuarios WHERE username = ?", (username,))
+        result = cursor.fetchone()
+        if result and result[0] == Usuario.hashPassword(password):
+            return result[1] # Devuelve el rol si las credenciales son correctas
+        return None
+
+    @staticmethod
+    def create(dbConnection, username, password, role):
+        """Crea un nuevo usuario en la base de datos."""
+        if not all([username, password, role]):
+            raise ValueError("Todos los campos son requeridos.")
+        if role not in ['admin', 'cajero']:
+            raise ValueError("El rol debe ser 'admin' o 'cajero'.")
+        try:
+            cursor = dbConnection.cursor()
+            cursor.execute("INSERT INTO usuarios (username, passwordHash, role) VALUES (?, ?, ?)", (username, Usuario.hashPassword(password), role))
+            dbConnection.commit()
+        except dbConnection.IntegrityError:
+            raise ValueError(f"El nombre de usuario '{username}' ya existe.")
+
+    @staticmethod
+    def update(dbConnection, userId, username, password, role):
+        """Actualiza los datos de un usuario. Si la contraseña está vacía, no se modifica."""
+        if not all([username, role]):
+            raise ValueError("El nombre de usuario y el rol son requeridos.")
+        if role not in ['admin', 'cajero']:
+            raise ValueError("El rol debe ser 'admin' o 'cajero'.")
+        try:
+            cursor = dbConnection.cursor()
+            if password:
+                cursor.execute("UPDATE usuarios SET username = ?, passwordHash = ?, role = ? WHERE idUsuario = ?", (username, Usuario.hashPassword(password), role, userId))
+            else:
+                cursor.execute("UPDATE usuarios SET username = ?, role = ? WHERE idUsuario = ?", (username, role, userId))
+            dbConnection.commit()
+        except dbConnection.IntegrityError:
+            raise ValueError(f"El nombre de usuario '{username}' ya pertenece a otro usuario.")
+
+    @staticmethod
+    def delete(dbConnection, userId):
+        """Elimina un usuario por su ID."""
+        cursor = dbConnection.cursor()
+        cursor.execute("DELETE FROM usuarios WHERE idUsuario = ?", (userId,))
+        dbConnection.commit()
+        
+    @staticmethod
+    def getAll(dbConnection):
+        """Obtiene una lista de todos los usuarios (sin sus contraseñas)."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT idUsuario, username, role FROM usuarios")
+        return cursor.fetchall()
+
+    @staticmethod
+    def createDefaultAdminIfNeeded(dbConnection):
+        """Si no hay usuarios en la BD, crea un usuario 'admin' con contraseña 'admin'."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM usuarios")
+        if cursor.fetchone()[0] == 0:
+            Usuario.create(dbConnection, "admin", "admin", "admin")
+            print("Usuario 'admin' por defecto creado con contraseña 'admin'.")
+
+# ---------------------------------------------------------------------------
+
+class Categoria:
+    """Clase que maneja la lógica de negocio para las categorías de productos."""
+    @staticmethod
+    def create(dbConnection, nombre):
+        try:
+            cursor = dbConnection.cursor()
+            cursor.execute("INSERT INTO categorias (nombre) VALUES (?)", (nombre,))
+            dbConnection.commit()
+        except dbConnection.IntegrityError:
+            raise ValueError(f"La categoría '{nombre}' ya existe.")
+
+    @staticmethod
+    def getAll(dbConnection):
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT idCategoria, nombre FROM categorias ORDER BY nombre")
+        return cursor.fetchall()
+
+# ---------------------------------------------------------------------------
+
+class Producto:
+    """Clase para todas las operaciones relacionadas con el inventario de productos."""
+    @staticmethod
+    def getAll(dbConnection, categoriaId=None):
+        """Obtiene todos los productos, opcionalmente filtrados por categoría."""
+        cursor = dbConnection.cursor()
+        query = "SELECT p.idProducto, p.codigoBarras, p.nombre, IFNULL(c.nombre, 'Sin Categoría'), p.precioVenta, p.costoCompra, p.stock FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria"
+        params = []
+        if categoriaId:
+            query += " WHERE p.idCategoria = ?"
+            params.append(categoriaId)
+        query += " ORDER BY p.nombre"
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    
+    @staticmethod
+    def searchIndexed(dbConnection, indice, term, columnas, limit=50):
+        """
+        Filas ('columnas', la primera debe ser p.idProducto) de los productos que el índice de trigramas
+        (busqueda.py) considera más parecidos a 'term', en ese orden. Devuelve (filas, nombres de las columnas,
+        similitud de cada fila). Los IDs que ya no existen (productos eliminados) se sacan del índice.
+        """
+        similitudes = dict(indice.search(term, limit))
+        ids = list(similitudes)
+        if not ids:
+            return [], [], []
+        cursor = dbConnection.cursor()
+        cursor.execute(f"""
+            SELECT {columnas} FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
+            WHERE p.idProducto IN ({','.join('?' * len(ids))})
+        """, ids)
+        filas = {fila[0]: fila for fila in cursor.fetchall()}
+        if len(filas) < len(ids):
+            indice.remove([i for i in ids if i not in filas])
+        encontrados = [i for i in ids if i in filas]
+        return [filas[i] for i in encontrados], [description[0] for description in cursor.description], [similitudes[i] for i in encontrados]
+
+    @staticmethod
+    def searchInventory(dbConnection, term, indice=None, limit=500):
+        """
+        Busca productos en el inventario por nombre o código de barras. Con el índice de trigramas, un texto que
+        no es un código se busca por parecido (tolera errores y acentos); si el índice no encuentra nada, con LIKE.
+        """
+        if indice is not None and not term.isdigit():
+            filas, _, _ = Producto.searchIndexed(dbConnection, indice, term, "p.idProducto, p.codigoBarras, p.nombre, IFNULL(c.nombre, 'Sin Categoría'), p.precioVenta, p.costoCompra, p.stock", limit)
+            if filas:
+                return filas
+        cursor = dbConnection.cursor()
+        query = """
+            SELECT p.idProducto, p.codigoBarras, p.nombre, IFNULL(c.nombre, 'Sin Categoría'), 
+                   p.precioVenta, p.costoCompra, p.stock 
+            FROM productos p 
+            LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
+            WHERE p.nombre LIKE ? OR p.codigoBarras LIKE ?
+            ORDER BY p.nombre
+        """
+        cursor.execute(query, (f"%{term}%", f"%{term}%"))
+        return cursor.fetchall()
+
+    @staticmethod
+    def getLowStock(dbConnection, diasPedido=14):
+        """
+        Obtiene los productos con stock menor o igual a su mínimo vigente (umbralStock: el mínimo propio, el
+        punto de reorden del pronóstico o el valor por defecto). Se leen del índice parcial idxProductosBajoStock.
+        Cada fila: (id, código, nombre, categoría, stock, unidades por día, mínimo, días de cobertura, cantidad
+        sugerida: hasta maxStock si está definido, si no 'diasPedido' días de venta más el mínimo). Los más urgentes primero.
+        """
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT p.idProducto, p.codigoBarras, p.nombre, IFNULL(c.nombre, 'Sin Categoría'), p.stock,
+                   f.velocidad, p.umbralStock, p.stock / f.velocidad,
+                   CASE WHEN p.maxStock IS NOT NULL THEN MAX(0, p.maxStock - p.stock)
+                        ELSE MAX(0, CAST(p.umbralStock + f.velocidad * ? - p.stock + 0.999 AS INTEGER)) END
+            FROM productos p 
+            LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
+            LEFT JOIN pronosticos f ON f.idProducto = p.idProducto
+            WHERE p.stock <= p.umbralStock AND p.nombre != 'Recarga Celular'
+            ORDER BY p.stock / f.velocidad IS NULL, p.stock / f.velocidad, p.stock ASC
+        """, (diasPedido,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def countLowStock(dbConnection):
+        """Número de productos bajo su mínimo, sin recargas. Lo mantienen los triggers de productos (ver Database.migrate)."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT valor FROM contadores WHERE nombre = 'productosBajoStock'")
+        fila = cursor.fetchone()
+        return fila[0] if fila else 0
+
+    @staticmethod
+    def getLowStockIds(dbConnection):
+        """Conjunto de IDs de los productos bajo su mínimo (para resaltarlos en el inventario)."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT idProducto FROM productos WHERE stock <= umbralStock AND nombre != 'Recarga Celular'")
+        return {fila[0] for fila in cursor.fetchall()}
+
+    @staticmethod
+    def parseStockLimits(minStock, maxStock):
+        """Valida el mínimo y el máximo de stock de un producto. Vacío o None significa automático / sin máximo."""
+        limites = []
+        for nombre, valor in (("mínimo", minStock), ("máximo", maxStock)):
+            if valor is None or str(valor).strip() == "":
+                limites.append(None)
+                continue
+            try:
+                valor = int(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"El stock {nombre} debe ser un número entero.")
+            if valor < 0: raise ValueError(f"El stock {nombre} no puede ser negativo.")
+            limites.append(valor)
+        if None not in limites and limites[1] < limites[0]:
+            raise ValueError("El stock máximo no puede ser menor que el mínimo.")
+        return tuple(limites)
+
+    @staticmethod
+    def getByBarcode(dbConnection, barcode):
+        """Busca un producto específico por su código de barras."""
+        cursor = dbConnection.cursor()
+        query = "SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria WHERE p.codigoBarras = ?"
+        cursor.execute(query, (barcode,))
+        fila = cursor.fetchone()
+        if fila:
+            column_names = [description[0] for description in cursor.description]
+            return dict(zip(column_names, fila))
+        return None
+
+    @staticmethod
+    def getById(dbConnection, productoId):
+        """Obtiene los datos completos de un producto por su ID."""
+        cursor = dbConnection.cursor()
+        query = "SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria WHERE p.idProducto = ?"
+        cursor.execute(query, (productoId,))
+        fila = cursor.fetchone()
+        if fila:
+            column_names = [description[0] for description in cursor.description]
+            return dict(zip(column_names, fila))
+        return None
+
+    @staticmethod
+    def getByCategory(dbConnection, categoriaId):
+        """Datos completos (como getById) de todos los productos de una categoría, por nombre, en una sola consulta."""
+        cursor = dbConnection.cursor()
+        query = "SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria WHERE p.idCategoria = ? ORDER BY p.nombre"
+        cursor.execute(query, (categoriaId,))
+        column_names = [description[0] for description in cursor.description]
+        return [dict(zip(column_names, fila)) for fila in cursor.fetchall()]
+
+    @staticmethod
+    def searchByName(dbConnection, partialName, indice=None, limit=50):
+        """
+        Busca productos por una coincidencia parcial en el nombre. Con el índice de trigramas (busqueda.py)
+        tolera errores de escritura y acentos, y devuelve los 'limit' más parecidos primero, cada uno con su
+        'similitud'; si el índice no encuentra nada, se busca con LIKE.
+        """
+        if indice is not None:
+            filas, columnas, similitudes = Producto.searchIndexed(dbConnection, indice, partialName, "p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre", limit)
+            if filas:
+                return [dict(zip(columnas, fila), similitud=similitud) for fila, similitud in zip(filas, similitudes)]
+        cursor = dbConnection.cursor()
+        query = "SELECT p.*, IFNULL(c.nombre, 'Sin Categoría') as categoriaNombre FROM productos p LEFT JOIN categorias c ON p.idCategoria = c.idCategoria WHERE p.nombre LIKE ? ORDER BY nombre"
+        cursor.execute(query, (f"%{partialName}%",))
+        filas = cursor.fetchall()
+        if filas:
+            column_names = [description[0] for description in cursor.description]
+            return [dict(zip(column_names, fila)) for fila in filas]
+        return []
+    
+    @staticmethod
+    def create(dbConnection, codigoBarras, nombre, precioVenta, costoCompra, stock, idCategoria, minStock=None, maxStock=None):
+        """Crea un nuevo producto en la base de datos. Sin minStock, su mínimo se calcula automáticamente."""
+        minStock, maxStock = Producto.parseStockLimits(minStock, maxStock)
+        try:
+            cursor = dbConnection.cursor()
+            cursor.execute("INSERT INTO productos (codigoBarras, nombre, descripcion, precioVenta, costoCompra, stock, idCategoria, minStock, maxStock) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (codigoBarras, nombre, "", float(precioVenta), float(costoCompra), int(stock), idCategoria, minStock, maxStock))
+            dbConnection.commit()
+        except dbConnection.IntegrityError: raise ValueError(f"El código de barras '{codigoBarras}' ya existe.")
+
+    @staticmethod
+    def update(dbConnection, productoId, codigoBarras, nombre, precioVenta, costoCompra, stock, idCategoria, minStock=None, maxStock=None):
+        """
+        Actualiza los datos de un producto existente, incluidos su mínimo y máximo de stock (None = automático / sin máximo).
+        Si el stock cambia, la diferencia se registra como movimiento 'edicion'.
+        """
+        minStock, maxStock = Producto.parseStockLimits(minStock, maxStock)
+        try:
+            cursor = dbConnection.cursor()
+            cursor.execute("UPDATE productos SET codigoBarras=?, nombre=?, precioVenta=?, costoCompra=?, idCategoria=?, minStock=?, maxStock=? WHERE idProducto=?", (codigoBarras, nombre, precioVenta, costoCompra, idCategoria, minStock, maxStock, productoId))
+            MovimientoStock.recordSet(cursor, productoId, int(stock), "edicion")
+            dbConnection.commit()
+        except dbConnection.IntegrityError: raise ValueError(f"El código de barras '{codigoBarras}' ya pertenece a otro producto.")
+
+    @staticmethod
+    def delete(dbConnection, productoId):
+        """Elimina un producto de la base de datos."""
+        cursor = dbConnection.cursor()
+        cursor.execute("DELETE FROM productos WHERE idProducto = ?", (productoId,))
+        dbConnection.commit()
+
+    @staticmethod
+    def updateStock(dbConnection, productoId, cantidad, tipo="ajuste", referencia=None):
+        """
+        Ajusta el stock de un producto. Usa valores negativos para decrementos.
+        El ajuste es condicional: si dejaría el stock en negativo (por ejemplo, porque otra caja
+        vendió esas unidades mientras tanto) no se aplica y se lanza ValueError.
+        Queda registrado en el libro de movimientos con el 'tipo' indicado (por ejemplo, 'reabasto').
+        """
+        cursor = dbConnection.cursor()
+        if not MovimientoStock.record(cursor, productoId, cantidad, tipo, referencia):
+            dbConnection.rollback()
+            raise ValueError("El ajuste dejaría el stock en negativo o el producto no existe.")
+        dbConnection.commit()
+
+    @staticmethod
+    def populateInitialProducts(dbConnection):
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM productos")
+        if cursor.fetchone()[0] > 0: return
+        
+        # Crear categoría de dulces y obtener su ID
+        try:
+            Categoria.create(dbConnection, "Dulces")
+        except ValueError:
+            pass # La categoría ya existe
+        
+        cursor.execute("SELECT idCategoria FROM categorias WHERE nombre = 'Dulces'")
+        id_dulces_result = cursor.fetchone()
+        id_dulces = id_dulces_result[0] if id_dulces_result else None
+
+
+        productosIniciales = [
+            ("7501031310017", "Lápiz HB #2", "Lápiz de grafito para escritura general", 3.50, 1.50, 100, "Papelería"),
+            ("7501031310024", "Cuaderno Profesional 100 Hojas Raya", "Cuaderno de 100 hojas a raya", 25.00, 12.00, 50, "Papelería"),
+            ("7501031310031", "Borrador de Goma", "Borrador de goma blanco, no mancha", 4.00, 2.00, 75, "Papelería"),
+            ("7501031310048", "Celomágico Mediano Adhesivo (Adosa)", "Cinta adhesiva mágica, acabado mate, 50 yardas", 30.00, 15.00, 40, "Papelería"),
+            ("7501031310055", "Euroformas Cuaderno Profesional 5x8", "Cuaderno profesional de 5x8 pulgadas", 28.00, 13.00, 35, "Papelería"),
+        ]
+        try:
+            cursor.executemany("INSERT INTO productos (codigoBarras, nombre, descripcion, precioVenta, costoCompra, stock, idCategoria) VALUES (?, ?, ?, ?, ?, ?, ?)", productosIniciales)
+            dbConnection.commit()
+            print("Productos iniciales insertados.")
+        except dbConnection.IntegrityError: pass
+
+# ---------------------------------------------------------------------------
+
+class MovimientoStock:
+    """
+    Libro de movimientos de stock (solo inserción). productos.stock es la suma de los movimientos de cada
+    producto: el trigger trgMovimientoStock aplica cada movimiento al insertarlo (ver Database.migrate).
+    Tipos: 'inicial', 'venta', 'devolucion', 'reabasto', 'ajuste', 'edicion', 'conteo', 'recepcion' y 'correccion'.
+    """
+    @staticmethod
+    def record(cursor, productoId, cantidad, tipo, referencia=None, fecha=None):
+        """
+        Inserta un movimiento (sin confirmar) solo si el stock no queda negativo.
+        Devuelve False si no se registró (stock insuficiente o el producto no existe).
+        """
+        fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute("""
+            INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad, referencia)
+            SELECT idProducto, ?, ?, ?, ? FROM productos WHERE idProducto = ? AND stock + ? >= 0
+        """, (fecha, tipo, cantidad, referencia, productoId, cantidad))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def recordSet(cursor, productoId, stock, tipo, referencia=None):
+        """Lleva el stock del producto al valor indicado registrando la diferencia (nada si no cambia)."""
+        if stock < 0: raise ValueError("El stock no puede ser negativo.")
+        cursor.execute("""
+            INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad, referencia)
+            SELECT idProducto, ?, ?, ? - stock, ? FROM productos WHERE idProducto = ? AND stock != ?
+        """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), tipo, stock, referencia, productoId, stock))
+
+    @staticmethod
+    def getHistory(dbConnection, productoId, limit=200):
+        """Últimos movimientos de un producto: (idMovimiento, fecha, tipo, cantidad, referencia, stock resultante)."""
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT * FROM (
+                SELECT idMovimiento, fecha, tipo, cantidad, referencia, SUM(cantidad) OVER (ORDER BY idMovimiento) AS saldo
+                FROM movimientosStock WHERE idProducto = ?
+            ) ORDER BY idMovimiento DESC LIMIT ?
+        """, (productoId, limit))
+        return cursor.fetchall()
+
+    @staticmethod
+    def verify(dbConnection, registrar=False):
+        """
+        Recalcula el stock de todos los productos a partir del libro (una sola lectura agrupada del índice) y
+        devuelve las diferencias: [(idProducto, código, nombre, stock, stock según el libro, diferencia)].
+        Una diferencia significa que el stock se modificó sin pasar por el libro. Con 'registrar', cada
+        diferencia se documenta con un movimiento 'correccion' para que el libro vuelva a cuadrar con el stock.
+        """
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT p.idProducto, p.codigoBarras, p.nombre, p.stock, COALESCE(m.total, 0), p.stock - COALESCE(m.total, 0)
+            FROM productos p LEFT JOIN (SELECT idProducto, SUM(cantidad) AS total FROM movimientosStock GROUP BY idProducto) m
+                 ON m.idProducto = p.idProducto
+            WHERE p.stock != COALESCE(m.total, 0)
+            ORDER BY ABS(p.stock - COALESCE(m.total, 0)) DESC
+        """)
+        diferencias = cursor.fetchall()
+        if registrar and diferencias:
+            fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cursor.executemany("INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad) VALUES (?, ?, 'correccion', ?)",
+                               [(fila[0], fecha, fila[5]) for fila in diferencias])
+            dbConnection.commit()
+        return diferencias
+
+# ---------------------------------------------------------------------------
+
+class Popularidad:
+    """
+    Popularidad reciente de cada producto: unidades vendidas con decaimiento exponencial (una venta de hace
+    VIDA_MEDIA_POPULARIDAD_DIAS días pesa la mitad que una de hoy). Cada venta la actualiza en su misma
+    transacción; el buscador la usa para ordenar las sugerencias (ver busqueda.RankingPopularidad).
+    """
+    @staticmethod
+    def decay(puntaje, dias):
+        """Puntaje después de 'dias' días sin ventas."""
+        return puntaje * 0.5 ** (dias / VIDA_MEDIA_POPULARIDAD_DIAS)
+
+    @staticmethod
+    def record(cursor, cantidades, dia=None):
+        """
+        Suma las unidades vendidas {idProducto: unidades} (sin confirmar). El puntaje acumulado de cada
+        producto se lleva primero al día de hoy.
+        """
+        dia = dia or datetime.now().date().toordinal()
+        ids = list(cantidades)
+        cursor.execute(f"SELECT idProducto, puntaje, dia FROM popularidad WHERE idProducto IN ({','.join('?' * len(ids))})", ids)
+        previos = {idProducto: Popularidad.decay(puntaje, dia - diaPuntaje) for idProducto, puntaje, diaPuntaje in cursor.fetchall()}
+        cursor.executemany("INSERT OR REPLACE INTO popularidad (idProducto, puntaje, dia) VALUES (?, ?, ?)",
+                           [(idProducto, previos.get(idProducto, 0.0) + cantidad, dia) for idProducto, cantidad in cantidades.items()])
+
+    @staticmethod
+    def getScores(dbConnection):
+        """Puntaje de popularidad al día de hoy de cada producto vendido: {idProducto: puntaje}."""
+        hoy = datetime.now().date().toordinal()
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT idProducto, puntaje, dia FROM popularidad")
+        return {idProducto: Popularidad.decay(puntaje, hoy - dia) for idProducto, puntaje, dia in cursor.fetchall()}
+
+# ---------------------------------------------------------------------------
+
+class CambioPrecio:
+    """
+    Cambios masivos de precio y costo: por porcentaje o monto fijo sobre una categoría (o todo el catálogo),
+    o desde la lista de precios de un proveedor. Primero se arma el plan (la vista previa, sin modificar nada)
+    y después se aplica completo en una sola transacción, que también guarda el historial de precios.
+    Cada cambio del plan: (idProducto, código, nombre, precioAnterior, precioNuevo, costoAnterior, costoNuevo).
+    """
+    @staticmethod
+    def planByCategory(dbConnection, idCategoria=None, campo="precio", porcentaje=0.0, monto=0.0):
+        """
+        Aplica 'porcentaje' (por ejemplo 10 = +10 %) y después 'monto' al precio, al costo o a ambos
+        (campo: 'precio', 'costo' o 'ambos') de los productos de la categoría (None = todas). Sin recargas.
+        """
+        if campo not in ("precio", "costo", "ambos"):
+            raise ValueError("El campo debe ser 'precio', 'costo' o 'ambos'.")
+        try:
+            factor, monto = 1 + float(porcentaje or 0) / 100, float(monto or 0)
+        except (TypeError, ValueError):
+            raise ValueError("El porcentaje y el monto deben ser números.")
+        if not (math.isfinite(factor) and math.isfinite(monto)):
+            raise ValueError("El porcentaje y el monto deben ser números finitos.")
+        nuevo = lambda columna, aplica: f"ROUND({columna} * ? + ?, 2)" if aplica else columna
+        params = [factor, monto] * ((campo != "costo") + (campo != "precio")) # Uno por cada columna que cambia
+        filtro = ""
+        if idCategoria is not None:
+            filtro = "AND idCategoria = ?"
+            params.append(idCategoria)
+        cursor = dbConnection.cursor()
+        cursor.execute(f"""
+            SELECT * FROM (
+                SELECT idProducto, codigoBarras, nombre, precioVenta, {nuevo("precioVenta", campo != "costo")} AS precioNuevo,
+                       costoCompra, {nuevo("costoCompra", campo != "precio")} AS costoNuevo
+                FROM productos WHERE nombre != 'Recarga Celular' {filtro}
+            ) WHERE precioNuevo != precioVenta OR costoNuevo IS NOT costoCompra
+            ORDER BY nombre
+        """, params)
+        return CambioPrecio.validate(cursor.fetchall())
+
+    @staticmethod
+    def planFromSupplier(dbConnection, filas, mantenerMargen=True):
+        """
+        Plan a partir de la lista de un proveedor: [(codigoBarras, costo, precio), ...] (precio puede ser None).
+        Sin precio, y con 'mantenerMargen', el precio de venta sube o baja en la misma proporción que el costo.
+        Devuelve (cambios, códigos que no existen en el catálogo).
+        """
+        lista = []
+        for codigo, costo, precio in filas:
+            try:
+                lista.append((str(codigo).strip(), float(costo), None if precio in (None, "") else float(precio)))
+            except (TypeError, ValueError):
+                raise ValueError(f"Costo o precio inválido para el código '{codigo}'.")
+            if not all(math.isfinite(valor) for valor in lista[-1][1:] if valor is not None):
+                raise ValueError(f"Costo o precio inválido para el código '{codigo}'.")
+        cursor = dbConnection.cursor()
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS listaProveedor (codigoBarras TEXT PRIMARY KEY, costo REAL, precio REAL)")
+        cursor.execute("DELETE FROM temp.listaProveedor")
+        cursor.executemany("INSERT OR REPLACE INTO temp.listaProveedor (codigoBarras, costo, precio) VALUES (?, ?, ?)", lista)
+        precioNuevo = "COALESCE(l.precio, ROUND(p.precioVenta * l.costo / p.costoCompra, 2))" if mantenerMargen else "COALESCE(l.precio, p.precioVenta)"
+        cursor.execute(f"""
+            SELECT * FROM (
+                SELECT p.idProducto, p.codigoBarras, p.nombre, p.precioVenta,
+                       CASE WHEN l.precio IS NULL AND COALESCE(p.costoCompra, 0) <= 0 THEN p.precioVenta ELSE {precioNuevo} END AS precioNuevo,
+                       p.costoCompra, ROUND(l.costo, 2) AS costoNuevo
+                FROM temp.listaProveedor l JOIN productos p ON p.codigoBarras = l.codigoBarras
+                WHERE p.nombre != 'Recarga Celular'
+            ) WHERE precioNuevo != precioVenta OR costoNuevo IS NOT costoCompra
+            ORDER BY nombre
+        """)
+        cambios = cursor.fetchall()
+        cursor.execute("SELECT l.codigoBarras FROM temp.listaProveedor l LEFT JOIN productos p ON p.codigoBarras = l.codigoBarras WHERE p.idProducto IS NULL")
+        noEncontrados = [fila[0] for fila in cursor.fetchall()]
+        cursor.execute("DELETE FROM temp.listaProveedor")
+        dbConnection.commit() # Cierra la transacción implícita de la tabla temporal (la conexión puede ser de larga vida)
+        return CambioPrecio.validate(cambios), noEncontrados
+
+    @staticmethod
+    def validate(cambios):
+        negativos = sum(1 for cambio in cambios if cambio[4] < 0 or (cambio[6] is not None and cambio[6] < 0))
+        if negativos:
+            raise ValueError(f"El cambio dejaría {negativos} producto(s) con precio o costo negativo.")
+        return cambios
+
+    @staticmethod
+    def apply(dbConnection, cambios, origen, usuario=None):
+        """
+        Aplica un plan en una sola transacción: guarda el historial, actualiza los productos e incrementa la
+        versión del catálogo ('versionPrecios'). Solo se aplican los productos cuyo precio y costo siguen
+        como en la vista previa (otra caja pudo cambiarlos mientras tanto).
+        Devuelve (aplicados, omitidos).
+        """
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        def aplicar():
+            cursor = dbConnection.cursor()
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS cambiosPrecio (
+                    idProducto INTEGER PRIMARY KEY, precioAnterior REAL, precioNuevo REAL, costoAnterior REAL, costoNuevo REAL
+                )
+            """)
+            cursor.execute("DELETE FROM temp.cambiosPrecio")
+            cursor.executemany("INSERT INTO temp.cambiosPrecio VALUES (?, ?, ?, ?, ?)",
+                               ((c[0], c[3], c[4], c[5], c[6]) for c in cambios))
+            cursor.execute("""
+                DELETE FROM temp.cambiosPrecio WHERE idProducto NOT IN (
+                    SELECT c.idProducto FROM temp.cambiosPrecio c JOIN productos p ON p.idProducto = c.idProducto
+                    WHERE p.precioVenta = c.precioAnterior AND p.costoCompra IS c.costoAnterior)
+            """)
+            cursor.execute("""
+                INSERT INTO historialPrecios (idProducto, fecha, precioAnterior, precioNuevo, costoAnterior, costoNuevo, origen, usuario)
+                SELECT idProducto, ?, precioAnterior, precioNuevo, costoAnterior, costoNuevo, ?, ? FROM temp.cambiosPrecio
+            """, (fecha, origen, usuario))
+            aplicados = cursor.rowcount
+            cursor.execute("""
+                UPDATE productos SET
+                    precioVenta = (SELECT c.precioNuevo FROM temp.cambiosPrecio c WHERE c.idProducto = productos.idProducto),
+                    costoCompra = (SELECT c.costoNuevo FROM temp.cambiosPrecio c WHERE c.idProducto = productos.idProducto)
+                WHERE idProducto IN (SELECT idProducto FROM temp.cambiosPrecio)
+            """)
+            cursor.execute("DELETE FROM temp.cambiosPrecio")
+            if aplicados:
+                cursor.execute("UPDATE contadores SET valor = valor + 1 WHERE nombre = 'versionPrecios'")
+            dbConnection.commit()
+            return aplicados
+        aplicados = retryOnBusy(dbConnection, aplicar)
+        return aplicados, len(cambios) - aplicados
+
+    @staticmethod
+    def getCatalogVersion(dbConnection):
+        """Versión del catálogo de precios: cambia después de cada CambioPrecio.apply que modificó algo."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT valor FROM contadores WHERE nombre = 'versionPrecios'")
+        fila = cursor.fetchone()
+        return fila[0] if fila else 0
+
+    @staticmethod
+    def getHistory(dbConnection, idProducto=None, limit=200):
+        """Últimos cambios de precio: (fecha, código, nombre, precioAnterior, precioNuevo, costoAnterior, costoNuevo, origen, usuario)."""
+        filtro, params = "", []
+        if idProducto is not None:
+            filtro, params = "WHERE h.idProducto = ?", [idProducto]
+        cursor = dbConnection.cursor()
+        cursor.execute(f"""
+            SELECT h.fecha, p.codigoBarras, p.nombre, h.precioAnterior, h.precioNuevo, h.costoAnterior, h.costoNuevo, h.origen, h.usuario
+            FROM historialPrecios h LEFT JOIN productos p ON p.idProducto = h.idProducto
+            {filtro} ORDER BY h.idHistorial DESC LIMIT ?
+        """, params + [limit])
+        return cursor.fetchall()
+
+# ---------------------------------------------------------------------------
+
+class AjusteInventario:
+    """
+    Conciliación de un conteo físico contra el stock del sistema. El conteo es {codigoBarras: unidades}
+    (ver conteo.py). En un conteo completo, los productos que no se contaron se consideran en cero.
+    Cada diferencia: (idProducto, código, nombre, stock del sistema, contado, diferencia, costo unitario).
+    """
+    @staticmethod
+    def loadCount(cursor, cantidades):
+        """Pasa el conteo a la tabla temporal 'conteoFisico' para compararlo con productos en un solo JOIN."""
+        filas = []
+        for codigo, cantidad in cantidades.items():
+            cantidad = int(cantidad)
+            if cantidad < 0: raise ValueError(f"La cantidad contada de '{codigo}' no puede ser negativa.")
+            filas.append((str(codigo), cantidad))
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS conteoFisico (codigoBarras TEXT PRIMARY KEY, contado INTEGER NOT NULL)")
+        cursor.execute("DELETE FROM temp.conteoFisico")
+        cursor.executemany("INSERT INTO temp.conteoFisico (codigoBarras, contado) VALUES (?, ?)", filas)
+
+    @staticmethod
+    def variancesQuery(completo):
+        """Consulta de las diferencias entre temp.conteoFisico y productos (sin recargas)."""
+        if completo:
+            return """
+                SELECT p.idProducto, p.codigoBarras, p.nombre, p.stock, COALESCE(c.contado, 0) AS contado,
+                       COALESCE(c.contado, 0) - p.stock AS diferencia, p.costoCompra AS costo
+                FROM productos p LEFT JOIN temp.conteoFisico c ON c.codigoBarras = p.codigoBarras
+                WHERE p.nombre != 'Recarga Celular' AND COALESCE(c.contado, 0) != p.stock
+            """
+        return """
+            SELECT p.idProducto, p.codigoBarras, p.nombre, p.stock, c.contado AS contado,
+                   c.contado - p.stock AS diferencia, p.costoCompra AS costo
+            FROM temp.conteoFisico c JOIN productos p ON p.codigoBarras = c.codigoBarras
+            WHERE p.nombre != 'Recarga Celular' AND c.contado != p.stock
+        """
+
+    @staticmethod
+    def getVariances(dbConnection, cantidades, completo=False):
+        """
+        Compara el conteo con productos.stock. Devuelve (diferencias, de mayor a menor valor absoluto, y los
+        códigos contados que no existen en el catálogo).
+        """
+        cursor = dbConnection.cursor()
+        AjusteInventario.loadCount(cursor, cantidades)
+        cursor.execute(f"SELECT * FROM ({AjusteInventario.variancesQuery(completo)}) ORDER BY ABS(diferencia * COALESCE(costo, 0)) DESC, nombre")
+        diferencias = cursor.fetchall()
+        cursor.execute("SELECT c.codigoBarras FROM temp.conteoFisico c LEFT JOIN productos p ON p.codigoBarras = c.codigoBarras WHERE p.idProducto IS NULL")
+        noEncontrados = [fila[0] for fila in cursor.fetchall()]
+        cursor.execute("DELETE FROM temp.conteoFisico")
+        dbConnection.commit() # Cierra la transacción implícita de la tabla temporal (la conexión puede ser de larga vida)
+        return diferencias, noEncontrados
+
+    @staticmethod
+    def apply(dbConnection, cantidades, completo=False, usuario=None, commit=True):
+        """
+        Deja el stock de cada producto con diferencia igual a lo contado, en una sola transacción: guarda el
+        encabezado del conteo, una fila del libro de ajustes por producto y sus movimientos de stock ('conteo').
+        Las diferencias se recalculan dentro de la transacción, contra el stock de ese momento.
+        Con commit=False se escribe dentro de la transacción del llamador (cola de escritura del servicio).
+        Devuelve el resumen: {'idConteo', 'productosContados', 'productosAjustados', 'diferenciaUnidades', 'diferenciaValor'}.
+        """
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        def aplicar():
+            cursor = dbConnection.cursor()
+            AjusteInventario.loadCount(cursor, cantidades)
+            cursor.execute("DROP TABLE IF EXISTS temp.ajustesConteo")
+            cursor.execute(f"CREATE TEMP TABLE ajustesConteo AS {AjusteInventario.variancesQuery(completo)}")
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(diferencia), 0), COALESCE(SUM(diferencia * COALESCE(costo, 0)), 0) FROM temp.ajustesConteo")
+            ajustados, unidades, valor = cursor.fetchone()
+            cursor.execute("""
+                INSERT INTO conteosInventario (fecha, usuario, completo, productosContados, productosAjustados, diferenciaUnidades, diferenciaValor)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (fecha, usuario, int(bool(completo)), len(cantidades), ajustados, unidades, valor))
+            idConteo = cursor.lastrowid
+            cursor.execute("""
+                INSERT INTO ajustesInventario (idConteo, idProducto, stockAnterior, stockContado, diferencia, costoUnitario)
+                SELECT ?, idProducto, stock, contado, diferencia, costo FROM temp.ajustesConteo
+            """, (idConteo,))
+            cursor.execute("""
+                INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad, referencia)
+                SELECT idProducto, ?, 'conteo', diferencia, ? FROM temp.ajustesConteo
+            """, (fecha, idConteo))
+            cursor.execute("DROP TABLE temp.ajustesConteo")
+            cursor.execute("DELETE FROM temp.conteoFisico")
+            if commit:
+                dbConnection.commit()
+            return {'idConteo': idConteo, 'productosContados': len(cantidades), 'productosAjustados': ajustados,
+                    'diferenciaUnidades': unidades, 'diferenciaValor': valor}
+        return retryOnBusy(dbConnection, aplicar) if commit else aplicar()
+
+    @staticmethod
+    def getAll(dbConnection, limit=50):
+        """Conteos aplicados, del más reciente al más antiguo."""
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT idConteo, fecha, usuario, completo, productosContados, productosAjustados, diferenciaUnidades, diferenciaValor
+            FROM conteosInventario ORDER BY idConteo DESC LIMIT ?
+        """, (limit,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def getDetails(dbConnection, idConteo):
+        """Ajustes de un conteo: (código, nombre, stockAnterior, stockContado, diferencia, costoUnitario)."""
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT p.codigoBarras, p.nombre, a.stockAnterior, a.stockContado, a.diferencia, a.costoUnitario
+            FROM ajustesInventario a LEFT JOIN productos p ON p.idProducto = a.idProducto
+            WHERE a.idConteo = ? ORDER BY ABS(a.diferencia * COALESCE(a.costoUnitario, 0)) DESC
+        """, (idConteo,))
+        return cursor.fetchall()
+
+# ---------------------------------------------------------------------------
+
+class Recepcion:
+    """
+    Recepción de mercancía de un proveedor. Los renglones son [(codigoBarras, cantidad, costo), ...]; el costo
+    de factura es opcional (una lista escaneada no lo trae) y sin él se usa el costo actual del producto.
+    Los gastos de la entrega (flete, maniobras) se reparten en proporción al importe de cada renglón para
+    obtener el costo aterrizado, que pasa a ser el costo de compra del producto.
+    Cada renglón del plan: (idProducto, código, nombre, stock, cantidad, costoAnterior, costoFactura, costoAterrizado).
+    """
+    @staticmethod
+    def loadLines(cursor, lineas):
+        """
+        Pasa los renglones a la tabla temporal 'lineasRecepcion' para cruzarlos con productos en un solo JOIN.
+        Un código repetido se suma; su costo queda como el promedio ponderado de los renglones que lo traen.
+        """
+        agrupado = {}
+        for codigo, cantidad, costo in lineas:
+            codigo = str(codigo or "").strip()
+            if not codigo: raise ValueError("Hay un renglón sin código.")
+            try:
+                cantidad, costo = float(cantidad), None if costo in (None, "") else float(costo)
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"Cantidad o costo inválido para el código '{codigo}'.")
+            if not math.isfinite(cantidad) or not cantidad.is_integer():
+                raise ValueError(f"La cantidad recibida de '{codigo}' debe ser un número entero.")
+            if costo is not None and not math.isfinite(costo):
+                raise ValueError(f"Cantidad o costo inválido para el código '{codigo}'.")
+            cantidad = int(cantidad)
+            if cantidad <= 0: raise ValueError(f"La cantidad recibida de '{codigo}' debe ser mayor a cero.")
+            if costo is not None and costo < 0: raise ValueError(f"El costo de '{codigo}' no puede ser negativo.")
+            total, unidadesConCosto, importe = agrupado.get(codigo, (0, 0, 0.0))
+            if costo is not None:
+                unidadesConCosto, importe = unidadesConCosto + cantidad, importe + cantidad * costo
+            agrupado[codigo] = (total + cantidad, unidadesConCosto, importe)
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS lineasRecepcion (codigoBarras TEXT PRIMARY KEY, cantidad INTEGER NOT NULL, costo REAL)")
+        cursor.execute("DELETE FROM temp.lineasRecepcion")
+        cursor.executemany("INSERT INTO temp.lineasRecepcion (codigoBarras, cantidad, costo) VALUES (?, ?, ?)",
+                           [(codigo, total, importe / conCosto if conCosto else None) for codigo, (total, conCosto, importe) in agrupado.items()])
+
+    @staticmethod
+    def prorate(cursor, gastos):
+        """
+        Factor y monto por unidad con que los gastos se suman al costo de factura: en proporción al importe,
+        o por unidad si la recepción no tiene importe (todo a costo cero).
+        """
+        cursor.execute(f"SELECT COALESCE(SUM(cantidad * costoFactura), 0), COALESCE(SUM(cantidad), 0) FROM ({Recepcion.linesQuery()})", (1.0, 0.0))
+        importe, unidades = cursor.fetchone()
+        if gastos and importe > 0:
+            return 1 + gastos / importe, 0.0
+        if gastos and unidades:
+            return 1.0, gastos / unidades
+        return 1.0, 0.0
+
+    @staticmethod
+    def linesQuery():
+        """Renglones de temp.lineasRecepcion que existen en el catálogo; recibe (factor, monto por unidad) del prorrateo."""
+        return """
+            SELECT p.idProducto, p.codigoBarras, p.nombre, p.stock, l.cantidad, p.costoCompra AS costoAnterior,
+                   COALESCE(l.costo, p.costoCompra, 0) AS costoFactura,
+                   ROUND(COALESCE(l.costo, p.costoCompra, 0) * ? + ?, 2) AS costoAterrizado, l.costo AS costoLista
+            FROM temp.lineasRecepcion l JOIN productos p ON p.codigoBarras = l.codigoBarras
+            WHERE p.nombre != 'Recarga Celular'
+        """
+
+    @staticmethod
+    def parseExpenses(gastos):
+        try:
+            gastos = float(gastos or 0)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("Los gastos de la recepción deben ser un número.")
+        if not math.isfinite(gastos): raise ValueError("Los gastos de la recepción deben ser un número.")
+        if gastos < 0: raise ValueError("Los gastos de la recepción no pueden ser negativos.")
+        return gastos
+
+    @staticmethod
+    def plan(dbConnection, lineas, gastos=0.0):
+        """
+        Vista previa de la recepción, sin modificar nada. Devuelve (renglones ordenados por nombre, y los
+        códigos que no existen en el catálogo).
+        """
+        gastos = Recepcion.parseExpenses(gastos)
+        cursor = dbConnection.cursor()
+        Recepcion.loadLines(cursor, lineas)
+        factor, porUnidad = Recepcion.prorate(cursor, gastos)
+        cursor.execute(f"""
+            SELECT idProducto, codigoBarras, nombre, stock, cantidad, costoAnterior, costoFactura, costoAterrizado
+            FROM ({Recepcion.linesQuery()}) ORDER BY nombre
+        """, (factor, porUnidad))
+        renglones = cursor.fetchall()
+        cursor.execute("SELECT l.codigoBarras FROM temp.lineasRecepcion l LEFT JOIN productos p ON p.codigoBarras = l.codigoBarras WHERE p.idProducto IS NULL")
+        noEncontrados = [fila[0] for fila in cursor.fetchall()]
+        cursor.execute("DELETE FROM temp.lineasRecepcion")
+        dbConnection.commit() # Cierra la transacción implícita de la tabla temporal (la conexión puede ser de larga vida)
+        return renglones, noEncontrados
+
+    @staticmethod
+    def apply(dbConnection, lineas, proveedor=None, folio=None, gastos=0.0, usuario=None, commit=True):
+        """
+        Registra la recepción en una sola transacción: el encabezado, un renglón por producto con su costo
+        aterrizado, los movimientos de stock ('recepcion') y el nuevo costo de compra de los productos que
+        traían costo (o a los que se repartieron gastos), que también queda en el historial de precios.
+        Los códigos que no existen en el catálogo se omiten; la vista previa los muestra.
+        Con commit=False se escribe dentro de la transacción del llamador (cola de escritura del servicio).
+        Devuelve el resumen: {'idRecepcion', 'lineas', 'unidades', 'importe', 'gastos', 'costosActualizados'}.
+        """
+        gastos = Recepcion.parseExpenses(gastos)
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        def aplicar():
+            cursor = dbConnection.cursor()
+            Recepcion.loadLines(cursor, lineas)
+            factor, porUnidad = Recepcion.prorate(cursor, gastos)
+            cursor.execute("DROP TABLE IF EXISTS temp.renglonesRecepcion")
+            cursor.execute(f"CREATE TEMP TABLE renglonesRecepcion AS {Recepcion.linesQuery()}", (factor, porUnidad))
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(cantidad), 0), COALESCE(SUM(cantidad * costoFactura), 0) FROM temp.renglonesRecepcion")
+            numLineas, unidades, importe = cursor.fetchone()
+            if not numLineas:
+                raise ValueError("Ningún código de la recepción existe en el catálogo.")
+            cursor.execute("""
+                INSERT INTO recepciones (fecha, proveedor, folio, usuario, lineas, unidades, importe, gastos)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (fecha, proveedor or None, folio or None, usuario, numLineas, unidades, round(importe, 2), gastos))
+            idRecepcion = cursor.lastrowid
+            cursor.execute("""
+                INSERT INTO detallesRecepcion (idRecepcion, idProducto, cantidad, costoFactura, costoAterrizado, costoAnterior)
+                SELECT ?, idProducto, cantidad, costoFactura, costoAterrizado, costoAnterior FROM temp.renglonesRecepcion
+            """, (idRecepcion,))
+            cursor.execute("""
+                INSERT INTO movimientosStock (idProducto, fecha, tipo, cantidad, referencia)
+                SELECT idProducto, ?, 'recepcion', cantidad, ? FROM temp.renglonesRecepcion
+            """, (fecha, idRecepcion))
+            # Solo cambia el costo de los renglones que traían costo de factura o recibieron parte de los gastos
+            cursor.execute("DELETE FROM temp.renglonesRecepcion WHERE (costoLista IS NULL AND ? = 0) OR costoAterrizado IS costoAnterior", (gastos,))
+            cursor.execute("""
+                INSERT INTO historialPrecios (idProducto, fecha, precioAnterior, precioNuevo, costoAnterior, costoNuevo, origen, usuario)
+                SELECT r.idProducto, ?, p.precioVenta, p.precioVenta, r.costoAnterior, r.costoAterrizado, ?, ?
+                FROM temp.renglonesRecepcion r JOIN productos p ON p.idProducto = r.idProducto
+            """, (fecha, f"Recepción #{idRecepcion}", usuario))
+            costosActualizados = cursor.rowcount
+            cursor.execute("""
+                UPDATE productos SET costoCompra = (SELECT r.costoAterrizado FROM temp.renglonesRecepcion r WHERE r.idProducto = productos.idProducto)
+                WHERE idProducto IN (SELECT idProducto FROM temp.renglonesRecepcion)
+            """)
+            if costosActualizados:
+                cursor.execute("UPDATE contadores SET valor = valor + 1 WHERE nombre = 'versionPrecios'")
+            cursor.execute("DROP TABLE temp.renglonesRecepcion")
+            cursor.execute("DELETE FROM temp.lineasRecepcion")
+            if commit:
+                dbConnection.commit()
+            return {'idRecepcion': idRecepcion, 'lineas': numLineas, 'unidades': unidades, 'importe': round(importe, 2),
+                    'gastos': gastos, 'costosActualizados': costosActualizados}
+        return retryOnBusy(dbConnection, aplicar) if commit else aplicar()
+
+    @staticmethod
+    def getAll(dbConnection, limit=50):
+        """Recepciones registradas, de la más reciente a la más antigua."""
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT idRecepcion, fecha, proveedor, folio, usuario, lineas, unidades, importe, gastos
+            FROM recepciones ORDER BY idRecepcion DESC LIMIT ?
+        """, (limit,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def getDetails(dbConnection, idRecepcion):
+        """Renglones de una recepción: (código, nombre, cantidad, costoFactura, costoAterrizado, costoAnterior)."""
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT p.codigoBarras, p.nombre, d.cantidad, d.costoFactura, d.costoAterrizado, d.costoAnterior
+            FROM detallesRecepcion d LEFT JOIN productos p ON p.idProducto = d.idProducto
+            WHERE d.idRecepcion = ? ORDER BY p.nombre
+        """, (idRecepcion,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def getProductHistory(dbConnection, idProducto, limit=50):
+        """Compras de un producto, de la más reciente a la más antigua: (fecha, proveedor, folio, cantidad, costoFactura, costoAterrizado)."""
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT r.fecha, r.proveedor, r.folio, d.cantidad, d.costoFactura, d.costoAterrizado
+            FROM detallesRecepcion d JOIN recepciones r ON r.idRecepcion = d.idRecepcion
+            WHERE d.idProducto = ? ORDER BY d.idRecepcion DESC LIMIT ?
+        """, (idProducto, limit))
+        return cursor.fetchall()
+
+# ---------------------------------------------------------------------------
+
+class Venta:
+    """Clase para la lógica de ventas y la generación de reportes financieros."""
+    @staticmethod
+    def create(dbConnection, carrito, metodoPago, descuento, caja=None, commit=True, pagos=None):
+        """
+        Registra una nueva venta, sus detalles y pagos, y actualiza el stock de los productos vendidos.
+        'caja' identifica la terminal que hizo la venta cuando varias cajas comparten la BD.
+        'pagos' permite dividir el cobro: [{'metodo': 'Tarjeta', 'monto': 100}, {'metodo': 'Efectivo',
+        'monto': 50, 'recibido': 100}, ...]. Sin 'pagos' se registra un solo pago por el total con 'metodoPago'.
+        Si otra caja tiene la BD ocupada, la transacción se reintenta con espera exponencial.
+        Con commit=False la venta se escribe dentro de la transacción del llamador (por ejemplo, el
+        escritor único del servicio), que se encarga de confirmar o deshacer y de los reintentos; las
+        métricas de la venta se difieren (metricas.defer) para que la cola las registre después del COMMIT.
+        Devuelve el ID de la venta creada.
+        """
+        inicio = time.perf_counter()
+        try:
+            if not commit:
+                ventaId = Venta.insertSale(dbConnection, carrito, metodoPago, descuento, caja, commit=False, pagos=pagos)
+            else:
+                ventaId = retryOnBusy(dbConnection, lambda: Venta.insertSale(dbConnection, carrito, metodoPago, descuento, caja, pagos=pagos))
+        except ValueError:
+            if commit:
+                metricas.ventasFallidas.inc()
+            else:
+                metricas.defer(metricas.ventasFallidas.inc)
+            raise
+        observacion = (sum(item['cantidad'] for item in carrito), sum(item['subtotal'] for item in carrito) - descuento, time.perf_counter() - inicio)
+        if commit:
+            metricas.observeSale(*observacion)
+        else:
+            metricas.defer(metricas.observeSale, *observacion)
+        return ventaId
+
+    @staticmethod
+    def insertSale(dbConnection, carrito, metodoPago, descuento, caja, commit=True, pagos=None):
+        """Escribe la venta en una sola transacción (BEGIN IMMEDIATE). Usar Venta.create."""
+        cursor = dbConnection.cursor()
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        subtotal = sum(item['subtotal'] for item in carrito)
+        total = subtotal - descuento
+        pagos = Venta.normalizePayments(total, metodoPago, pagos)
+        if len({pago['metodo'] for pago in pagos}) > 1:
+            metodoPago = "Mixto"
+        
+        cursor.execute("INSERT INTO ventas (fecha, subtotal, descuento, totalVenta, metodoPago, caja) VALUES (?, ?, ?, ?, ?, ?)", (fecha, subtotal, descuento, total, metodoPago, caja))
+        ventaId = cursor.lastrowid
+        cursor.executemany("INSERT INTO pagos (idVenta, fecha, metodo, monto, recibido, cambio) VALUES (?, ?, ?, ?, ?, ?)",
+                           [(ventaId, fecha, pago['metodo'], pago['monto'], pago['recibido'], pago['cambio']) for pago in pagos])
+        
+        for item in carrito:
+            esRecarga = item['nombre'].startswith("Recarga Celular")
+            # Se guarda el costo vigente al momento de la venta para que los reportes de ganancias
+            # no cambien si después se edita el costo del producto.
+            cursor.execute("""
+                INSERT INTO detallesVenta (idVenta, idProducto, cantidad, precioUnitario, subtotal, costoUnitario, esRecarga)
+                VALUES (?, ?, ?, ?, ?, COALESCE((SELECT costoCompra FROM productos WHERE idProducto = ?), 0), ?)
+            """, (ventaId, item['id'], item['cantidad'], item['precio'], item['subtotal'], item['id'], int(esRecarga)))
+            # Las recargas no descuentan stock del inventario físico.
+            # El descuento es condicional y sin confirmar aún: si otra caja vendió las últimas unidades,
+            # se revierte la venta completa en lugar de dejar el stock en negativo.
+            if not esRecarga:
+                if not MovimientoStock.record(cursor, item['id'], -item['cantidad'], "venta", ventaId, fecha):
+                    if commit: dbConnection.rollback()
+                    raise ValueError(f"No hay suficiente stock para '{item['nombre']}'. La venta no se registró.")
+
+        cantidades = {}
+        for item in carrito:
+            cantidades[item['id']] = cantidades.get(item['id'], 0) + item['cantidad']
+        Popularidad.record(cursor, cantidades)
+
+        if commit: dbConnection.commit()
+        return ventaId
+
+    @staticmethod
+    def normalizePayments(total, metodoPago, pagos=None):
+        """
+        Valida los pagos de una venta y calcula el cambio del efectivo.
+        Los montos deben sumar el total; en efectivo, lo recibido (si se indica) no puede ser menor al monto.
+        """
+        if not pagos:
+            return [{'metodo': metodoPago, 'monto': total, 'recibido': None, 'cambio': 0.0}]
+        normalizados = []
+        for pago in pagos:
+            monto = round(float(pago['monto']), 2)
+            if not math.isfinite(monto):
+                raise ValueError(f"El monto del pago en {pago['metodo']} no es un número válido.")
+            if monto <= 0:
+                raise ValueError("Los montos de los pagos deben ser mayores a cero.")
+            recibido = pago.get('recibido')
+            if recibido is not None:
+                recibido = float(recibido)
+                if not math.isfinite(recibido):
+                    raise ValueError(f"Lo recibido en {pago['metodo']} no es un número válido.")
+                if recibido < monto:
+                    raise ValueError(f"Lo recibido en {pago['metodo']} (${recibido:.2f}) es menor que el monto (${monto:.2f}).")
+            normalizados.append({'metodo': pago['metodo'], 'monto': monto, 'recibido': recibido, 'cambio': recibido - monto if recibido is not None else 0.0})
+        if abs(sum(pago['monto'] for pago in normalizados) - total) > 0.005:
+            raise ValueError(f"Los pagos suman ${sum(pago['monto'] for pago in normalizados):.2f} y el total es ${total:.2f}.")
+        return normalizados
+
+    @staticmethod
+    def getById(dbConnection, ventaId):
+        """
+        Obtiene todos los datos de una venta, incluyendo sus detalles y pagos, por su ID. Si no está en la BD
+        de trabajo se busca en los años archivados, uno a la vez y del más reciente al más antiguo.
+        """
+        venta = Venta.readSale(dbConnection, "main", ventaId)
+        if venta is not None or not Archivo.mainPath(dbConnection):
+            return venta
+        for anio in reversed(archivedYears(Archivo.mainPath(dbConnection))):
+            alias, adjuntado = Archivo.attachYear(dbConnection, anio)
+            if alias is None: continue
+            try:
+                venta = Venta.readSale(dbConnection, alias, ventaId)
+            finally:
+                if adjuntado: Archivo.detach(dbConnection, alias) # Solo se separa lo que adjuntó esta búsqueda
+            if venta is not None:
+                return venta
+        return None
+
+    @staticmethod
+    def readSale(dbConnection, esquema, ventaId):
+        """Venta con sus detalles y pagos leída del esquema 'esquema' ('main' o el alias de un año archivado), o None."""
+        cursor = dbConnection.cursor()
+        cursor.execute(f"SELECT * FROM {esquema}.ventas WHERE idVenta = ?", (ventaId,))
+        venta = cursor.fetchone()
+        if not venta: return None
+
+        column_names = [d[0] for d in cursor.description]
+        ventaData = dict(zip(column_names, venta))
+
+        cursor.execute(f"SELECT dv.*, p.nombre FROM {esquema}.detallesVenta dv JOIN main.productos p ON dv.idProducto = p.idProducto WHERE dv.idVenta = ?", (ventaId,))
+        detalles = cursor.fetchall()
+        
+        column_names_detalles = [d[0] for d in cursor.description]
+        ventaData['detalles'] = [dict(zip(column_names_detalles, d)) for d in detalles]
+
+        ventaData['pagos'] = []
+        if dbConnection.execute(f"PRAGMA {esquema}.table_info(pagos)").fetchall(): # Los archivos antiguos pueden no tener pagos
+            cursor.execute(f"SELECT metodo, monto, recibido, cambio FROM {esquema}.pagos WHERE idVenta = ? ORDER BY idPago", (ventaId,))
+            ventaData['pagos'] = [dict(zip(('metodo', 'monto', 'recibido', 'cambio'), p)) for p in cursor.fetchall()]
+        return ventaData
+
+    @staticmethod
+    def get_date_range(periodo):
+        """Función de ayuda para obtener las fechas de inicio y fin según un período ('dia', 'semana', 'mes')."""
+        hoy = datetime.now()
+        if periodo == 'dia':
+            start_date = hoy.strftime('%Y-%m-%d')
+            end_date = start_date
+        elif periodo == 'semana':
+            start_date = (hoy - timedelta(days=hoy.weekday())).strftime('%Y-%m-%d')
+            end_date = hoy.strftime('%Y-%m-%d')
+        elif periodo == 'mes':
+            start_date = hoy.strftime('%Y-%m-01')
+            end_date = hoy.strftime('%Y-%m-%d')
+        else:
+            return None, None
+        return f'{start_date} 00:00:00', f'{end_date} 23:59:59'
+
+    @staticmethod
+    def getReporteVentas(dbConnection, periodo):
+        """
+        Genera un reporte de ventas simple para un período dado.
+        Calcula totales brutos, netos, descuentos, devoluciones y los productos más vendidos.
+        """
+        start, end = Venta.get_date_range(periodo)
+        ventas, detallesVenta, devoluciones = Archivo.sources(dbConnection, start, end)
+        cursor = dbConnection.cursor()
+        
+        cursor.execute(f"SELECT COALESCE(SUM(totalVenta), 0), COALESCE(SUM(descuento), 0), COUNT(idVenta) FROM {ventas} WHERE fecha BETWEEN ? AND ?", (start, end))
+        totalNeto, totalDesc, numTickets = cursor.fetchone()
+        
+        cursor.execute(f"SELECT COALESCE(SUM(montoDevuelto), 0) FROM {devoluciones} WHERE fecha BETWEEN ? AND ?", (start, end))
+        totalDevoluciones = cursor.fetchone()[0]
+
+        totalBruto = totalNeto + totalDesc
+        ventasNetasFinal = totalNeto - totalDevoluciones
+        
+        cursor.execute(f"""
+            SELECT p.nombre, SUM(dv.cantidad) as total_vendido
+            FROM {detallesVenta} dv
+            JOIN {ventas} v ON dv.idVenta = v.idVenta
+            JOIN productos p ON dv.idProducto = p.idProducto
+            WHERE v.fecha BETWEEN ? AND ? AND p.nombre != 'Recarga Celular'
+            GROUP BY p.idProducto ORDER BY total_vendido DESC LIMIT 5
+        """, (start, end))
+        productosMasVendidos = cursor.fetchall()
+
+        return {
+            'totalBruto': totalBruto, 'totalDescuentos': totalDesc, 'totalDevoluciones': totalDevoluciones,
+            'ventasNetas': ventasNetasFinal, 'numTickets': numTickets, 'productosMasVendidos': productosMasVendidos,
+            'porMetodo': Venta.getResumenPagos(dbConnection, start, end)
+        }
+
+    @staticmethod
+    def getResumenPagos(dbConnection, start, end):
+        """
+        Desglose por método de pago entre 'start' y 'end' en una sola lectura de 'pagos'.
+        Devuelve {metodo: {'ventas', 'monto', 'recibido', 'cambio'}}; una venta mixta cuenta en cada método que usó.
+        """
+        pagos, = Archivo.sources(dbConnection, start, end, tablas=("pagos",))
+        cursor = dbConnection.cursor()
+        cursor.execute(f"""
+            SELECT metodo, COUNT(DISTINCT idVenta), COALESCE(SUM(monto), 0), COALESCE(SUM(recibido), 0), COALESCE(SUM(cambio), 0)
+            FROM {pagos} WHERE fecha BETWEEN ? AND ? GROUP BY metodo ORDER BY metodo
+        """, (start, end))
+        return {metodo: {'ventas': numVentas, 'monto': monto, 'recibido': recibido, 'cambio': cambio}
+                for metodo, numVentas, monto, recibido, cambio in cursor.fetchall()}
+
+    @staticmethod
+    def getReporteGanancias(dbConnection, periodo):
+        """
+        Genera un reporte financiero detallado, calculando la ganancia neta estimada.
+        Considera ingresos, costos de productos, descuentos, devoluciones y otros gastos.
+        """
+        start, end = Venta.get_date_range(periodo)
+        ventas, detallesVenta, devoluciones = Archivo.sources(dbConnection, start, end)
+        cursor = dbConnection.cursor()
+        # Ingresos
+        cursor.execute(f"SELECT COALESCE(SUM(totalVenta), 0), COALESCE(SUM(descuento), 0) FROM {ventas} WHERE fecha BETWEEN ? AND ?", (start, end))
+        ingresosNetos, totalDesc = cursor.fetchone()
+        ingresosBrutos = ingresosNetos + totalDesc
+        # Costo de mercancía vendida (excluyendo recargas) y desglose de recargas en una sola pasada.
+        # Se usa el costo guardado en cada detalle, sin depender del costo actual del producto.
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(CASE WHEN esRecarga = 0 THEN cantidad * costoUnitario END), 0),
+                   COALESCE(SUM(CASE WHEN esRecarga = 1 THEN cantidad END), 0),
+                   COALESCE(SUM(CASE WHEN esRecarga = 1 THEN subtotal END), 0)
+            FROM {detallesVenta}
+            WHERE idVenta IN (SELECT idVenta FROM {ventas} WHERE fecha BETWEEN ? AND ?)
+        """, (start, end))
+        costosTotales, gananciaRecargas, ingresoTotalRecargas = cursor.fetchone()
+        # Egresos (devoluciones y gastos)
+        cursor.execute(f"SELECT COALESCE(SUM(montoDevuelto), 0) FROM {devoluciones} WHERE fecha BETWEEN ? AND ?", (start, end))
+        totalDevoluciones = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(SUM(monto), 0) FROM gastos WHERE DATE(fecha) BETWEEN ? AND ?", (start.split(' ')[0], end.split(' ')[0]))
+        totalGastos = cursor.fetchone()[0]
+        return {
+            'ingresosBrutos': ingresosBrutos, 'costosTotales': costosTotales,
+            'totalDescuentos': totalDesc, 'totalDevoluciones': totalDevoluciones,
+            'totalGastos': totalGastos, 'gananciaRecargas': gananciaRecargas,
+            'ingresoTotalRecargas': ingresoTotalRecargas
+        }
+        
+    @staticmethod
+    def getDashboardData(dbConnection):
+        """Obtiene los datos clave para las tarjetas de resumen del dashboard (ventas de hoy, tickets, etc.)."""
+        start, end = Venta.get_date_range('dia')
+        cursor = dbConnection.cursor()
+        # Total, tickets y desglose efectivo/otros métodos en una sola lectura de los pagos del día
+        cursor.execute("""
+            SELECT COALESCE(SUM(monto), 0), COUNT(DISTINCT idVenta),
+                   COALESCE(SUM(CASE WHEN metodo = 'Efectivo' THEN monto END), 0)
+            FROM pagos WHERE fecha BETWEEN ? AND ?
+        """, (start, end))
+        ventasHoy, ticketsHoy, efectivoHoy = cursor.fetchone()
+        bajoStock = Producto.countLowStock(dbConnection)
+        return {'ventasNetasHoy': ventasHoy, 'numTicketsHoy': ticketsHoy, 'productosBajoStock': bajoStock,
+                'efectivoHoy': efectivoHoy, 'otrosMetodosHoy': ventasHoy - efectivoHoy}
+
+    @staticmethod
+    def getVentasUltimosDias(dbConnection, dias=7):
+        """
+        Calcula las ventas totales para cada uno de los últimos 'dias'.
+        Devuelve un diccionario con abreviaturas de días de la semana en español como claves.
+        """
+        ventas = {}
+        dias_es = {"Mon": "Lun", "Tue": "Mar", "Wed": "Mié", "Thu": "Jue", "Fri": "Vie", "Sat": "Sáb", "Sun": "Dom"}
+        hoy = datetime.now()
+        ventasFuente, _, _ = Archivo.sources(dbConnection, (hoy - timedelta(days=dias - 1)).strftime('%Y-%m-%d'), hoy.strftime('%Y-%m-%d'))
+        
+        for i in range(dias):
+            fecha_dt = hoy - timedelta(days=i)
+            fecha_str = fecha_dt.strftime('%Y-%m-%d')
+            
+            cursor = dbConnection.cursor()
+            cursor.execute(f"SELECT COALESCE(SUM(totalVenta), 0) FROM {ventasFuente} WHERE DATE(fecha) = ?", (fecha_str,))
+            total = cursor.fetchone()[0]
+            
+            dia_semana_en = fecha_dt.strftime('%a')
+            dia_semana_es = dias_es.get(dia_semana_en, dia_semana_en)
+            
+            ventas[dia_semana_es] = total
+            
+        # Devuelve el diccionario en orden cronológico (los días más antiguos primero)
+        return dict(reversed(list(ventas.items())))
+
+    @staticmethod
+    def getVentasPorCategoria(dbConnection, periodo):
+        """Obtiene el total de ingresos agrupado por categoría para un período dado."""
+        start, end = Venta.get_date_range(periodo)
+        ventas, detallesVenta, _ = Archivo.sources(dbConnection, start, end)
+        cursor = dbConnection.cursor()
+        cursor.execute(f"""
+            SELECT IFNULL(c.nombre, 'Sin Categoría'), SUM(dv.subtotal) 
+            FROM {detallesVenta} dv
+            JOIN productos p ON dv.idProducto = p.idProducto
+            LEFT JOIN categorias c ON p.idCategoria = c.idCategoria
+            JOIN {ventas} v ON dv.idVenta = v.idVenta
+            WHERE v.fecha BETWEEN ? AND ?
+            GROUP BY c.nombre HAVING SUM(dv.subtotal) > 0.01
+            ORDER BY SUM(dv.subtotal) DESC
+        """, (start, end))
+        return cursor.fetchall()
+        
+    @staticmethod
+    def getTopProductos(dbConnection, periodo, limit=5):
+        """Obtiene los productos más vendidos por ingresos en un período."""
+        start, end = Venta.get_date_range(periodo)
+        ventas, detallesVenta, _ = Archivo.sources(dbConnection, start, end)
+        cursor = dbConnection.cursor()
+        cursor.execute(f"""
+            SELECT p.nombre, SUM(dv.subtotal) as total
+            FROM {detallesVenta} dv
+            JOIN productos p ON dv.idProducto = p.idProducto
+            JOIN {ventas} v ON dv.idVenta = v.idVenta
+            WHERE v.fecha BETWEEN ? AND ?
+            GROUP BY p.nombre ORDER BY total DESC LIMIT ?
+        """, (start, end, limit))
+        return cursor.fetchall()
+
+    @staticmethod
+    def getLibroDiario(dbConnection, periodo):
+        """Combina ventas, gastos y devoluciones en un solo historial cronológico (libro diario)."""
+        start, end = Venta.get_date_range(periodo)
+        ventas, _, devoluciones = Archivo.sources(dbConnection, start, end)
+        cursor = dbConnection.cursor()
+        query = f"""
+            SELECT fecha, 'Venta Ticket #' || idVenta, totalVenta, 'venta', idVenta FROM {ventas} WHERE fecha BETWEEN ? AND ?
+            UNION ALL
+            SELECT fecha, 'Gasto: ' || descripcion, -monto, 'gasto', idGasto FROM gastos WHERE fecha BETWEEN ? AND ?
+            UNION ALL
+            SELECT fecha, 'Devolución de Venta #' || idVentaOriginal, -montoDevuelto, 'devolucion', idDevolucion FROM {devoluciones} WHERE fecha BETWEEN ? AND ?
+            ORDER BY fecha DESC
+        """
+        start_date, end_date = start.split(' ')[0], end.split(' ')[0]
+        params = (start, end, f"{start_date} 00:00:00", f"{end_date} 23:59:59", start, end)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+# ---------------------------------------------------------------------------
+
+class Archivo:
+    """
+    Acceso transparente a los años archivados (pos-AAAA.db, ver Database.archiveYear).
+    Los reportes piden sus tablas con Archivo.sources: si el rango no toca ningún año archivado se usan las
+    tablas normales; si lo toca, los archivos se adjuntan con ATTACH y cada tabla se reemplaza por una
+    subconsulta UNION ALL con las filas de la BD de trabajo y las de esos años. Las conexiones de larga vida
+    conservan los años adjuntos, hasta MAX_ARCHIVOS_ADJUNTOS: antes de pasar de ese número se separan los
+    que ya no se necesitan.
+    """
+    @staticmethod
+    def attachedYears(dbConnection):
+        """{alias: ruta} de las BD adjuntas a la conexión (incluye 'main')."""
+        return {fila[1]: fila[2] for fila in dbConnection.execute("PRAGMA database_list").fetchall()}
+
+    @staticmethod
+    def mainPath(dbConnection):
+        """Ruta de la BD de trabajo ('' si está en memoria)."""
+        return Archivo.attachedYears(dbConnection)["main"]
+
+    @staticmethod
+    def attachYear(dbConnection, anio):
+        """Adjunta el archivo de un año. Devuelve (alias, True si se adjuntó ahora); (None, False) si no existe."""
+        adjuntas = Archivo.attachedYears(dbConnection)
+        nombre = f"archivo{anio}"
+        if nombre in adjuntas:
+            return nombre, False
+        ruta = archivePath(adjuntas["main"], anio)
+        if not adjuntas["main"] or not os.path.exists(ruta):
+            return None, False
+        dbConnection.execute(f"ATTACH DATABASE ? AS {nombre}", (ruta,))
+        return nombre, True
+
+    @staticmethod
+    def detach(dbConnection, alias):
+        dbConnection.execute(f"DETACH DATABASE {alias}")
+
+    @staticmethod
+    def attachYears(dbConnection, start=None, end=None):
+        """
+        Adjunta los archivos de los años del rango (todos si no hay rango) y devuelve sus alias. Si con ellos
+        se pasaría de MAX_ARCHIVOS_ADJUNTOS, primero se separan los años adjuntos que este rango no usa.
+        """
+        adjuntas = Archivo.attachedYears(dbConnection)
+        dbPath = adjuntas["main"]
+        if not dbPath: return [] # BD en memoria
+        anios = archivedYears(dbPath) if start is None else range(int(start[:4]), int(end[:4]) + 1)
+        necesarios = [f"archivo{anio}" for anio in anios if f"archivo{anio}" in adjuntas or os.path.exists(archivePath(dbPath, anio))]
+        if len(necesarios) > MAX_ARCHIVOS_ADJUNTOS:
+            raise ValueError(f"El rango abarca {len(necesarios)} años archivados; el máximo por consulta es {MAX_ARCHIVOS_ADJUNTOS}.")
+        adjuntosAnios = [nombre for nombre in adjuntas if nombre.startswith("archivo") and nombre[7:].isdigit()]
+        nuevos = [nombre for nombre in necesarios if nombre not in adjuntas]
+        if len(adjuntosAnios) + len(nuevos) > MAX_ARCHIVOS_ADJUNTOS:
+            for nombre in adjuntosAnios:
+                if nombre not in necesarios:
+                    Archivo.detach(dbConnection, nombre)
+        for nombre in nuevos:
+            Archivo.attachYear(dbConnection, int(nombre[7:]))
+        return necesarios
+
+    @staticmethod
+    def sources(dbConnection, start=None, end=None, tablas=("ventas", "detallesVenta", "devoluciones")):
+        """Devuelve (ventas, detallesVenta, devoluciones) u otras 'tablas': nombres de tabla o subconsultas que incluyen los archivos."""
+        alias = Archivo.attachYears(dbConnection, start, end)
+        if not alias:
+            return tuple(tablas)
+        fuentes = []
+        for tabla in tablas:
+            columnas = [fila[1] for fila in dbConnection.execute(f"PRAGMA main.table_info({tabla})").fetchall()]
+            partes = [f"SELECT {', '.join(columnas)} FROM main.{tabla}"]
+            for nombre in alias:
+                existentes = {fila[1] for fila in dbConnection.execute(f"PRAGMA {nombre}.table_info({tabla})").fetchall()}
+                if not existentes: continue
+                partes.append("SELECT " + ", ".join(c if c in existentes else f"NULL AS {c}" for c in columnas) + f" FROM {nombre}.{tabla}")
+            fuentes.append("(" + " UNION ALL ".join(partes) + ")")
+        return tuple(fuentes)
+
+# ---------------------------------------------------------------------------
+
+class Devolucion:
+    """Clase para manejar la lógica de las devoluciones."""
+    @staticmethod
+    def create(dbConnection, idVentaOriginal, items, commit=True):
+        """
+        Registra una devolución, detallando los productos y el monto.
+        Actualiza (incrementa) el stock de los productos devueltos.
+        Con commit=False no confirma la transacción (la confirma el llamador).
+        Devuelve la lista de IDs de devolución creados (uno por producto).
+        """
+        cursor = dbConnection.cursor()
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        devolucionIds = []
+        for item in items:
+            cursor.execute("""
+                INSERT INTO devoluciones (idVentaOriginal, idProducto, cantidad, montoDevuelto, fecha)
+                VALUES (?, ?, ?, ?, ?)
+            """, (idVentaOriginal, item['idProducto'], item['cantidad'], item['montoDevuelto'], fecha))
+            devolucionIds.append(cursor.lastrowid)
+            # Las recargas no se devuelven al stock. El stock se ajusta dentro de la misma transacción.
+            if not item['nombreProducto'].startswith("Recarga Celular"):
+                MovimientoStock.record(cursor, item['idProducto'], item['cantidad'], "devolucion", devolucionIds[-1], fecha)
+        if commit: dbConnection.commit()
+        return devolucionIds
+
+# ---------------------------------------------------------------------------
+
+class Gasto:
+    """Clase para manejar la lógica de los gastos operativos."""
+    @staticmethod
+    def create(dbConnection, descripcion, monto, commit=True):
+        """
+        Registra un nuevo gasto en la base de datos y devuelve su ID.
+        Con commit=False no confirma la transacción (la confirma el llamador).
+        """
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor = dbConnection.cursor()
+        cursor.execute("INSERT INTO gastos (fecha, descripcion, monto) VALUES (?, ?, ?)", (fecha, descripcion, monto))
+        if commit: dbConnection.commit()
+        return cursor.lastrowid
+
+    @staticmethod
+    def getByDate(dbConnection, fecha):
+        """Obtiene todos los gastos registrados en una fecha específica."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT idGasto, fecha, descripcion, monto FROM gastos WHERE DATE(fecha) = ? ORDER BY fecha DESC", (fecha,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def delete(dbConnection, gastoId):
+        """Elimina un gasto por su ID."""
+        cursor = dbConnection.cursor()
+        cursor.execute("DELETE FROM gastos WHERE idGasto = ?", (gastoId,))
+        dbConnection.commit()
+
+# ---------------------------------------------------------------------------
+
+class TicketEnEspera:
+    """Clase para estacionar carritos (tickets en espera) y recuperarlos después."""
+    @staticmethod
+    def create(dbConnection, usuario, items, descuentoPorcentaje=0.0):
+        """
+        Guarda un carrito en espera. 'items' es una lista de diccionarios como la de Carrito.toList().
+        Devuelve el ID del ticket.
+        """
+        if not items:
+            raise ValueError("No se puede poner en espera un carrito vacío.")
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        subtotal = sum(item['subtotal'] for item in items)
+        total = subtotal - subtotal * (descuentoPorcentaje / 100)
+        cursor = dbConnection.cursor()
+        cursor.execute("INSERT INTO ticketsEnEspera (fecha, usuario, total, descuentoPorcentaje, contenido) VALUES (?, ?, ?, ?, ?)", (fecha, usuario, total, descuentoPorcentaje, json.dumps(items, ensure_ascii=False)))
+        dbConnection.commit()
+        return cursor.lastrowid
+
+    @staticmethod
+    def getAll(dbConnection):
+        """Lista los tickets en espera (sin su contenido), del más antiguo al más reciente."""
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT idTicket, fecha, usuario, total FROM ticketsEnEspera ORDER BY idTicket")
+        return cursor.fetchall()
+
+    @staticmethod
+    def take(dbConnection, ticketId):
+        """
+        Recupera un ticket en espera y lo elimina de la tabla en la misma transacción,
+        para que dos cajas no puedan recuperar el mismo ticket.
+        Devuelve un diccionario con 'items' y 'descuentoPorcentaje', o None si ya no existe.
+        """
+        cursor = dbConnection.cursor()
+        cursor.execute("SELECT contenido, descuentoPorcentaje FROM ticketsEnEspera WHERE idTicket = ?", (ticketId,))
+        fila = cursor.fetchone()
+        if not fila: return None
+        cursor.execute("DELETE FROM ticketsEnEspera WHERE idTicket = ?", (ticketId,))
+        # Si otra caja lo borró entre la lectura y el borrado, no se entrega dos veces
+        borrado = cursor.rowcount == 1
+        dbConnection.commit()
+        if not borrado: return None
+        return {'items': json.loads(fila[0]), 'descuentoPorcentaje': fila[1]}
+
+# ---------------------------------------------------------------------------
+
+class Corte:
+    """
+    Cortes de caja: cierre del día con los totales por método de pago y el efectivo esperado contra el contado.
+    Cada corte abarca desde el día siguiente al corte anterior hasta su día 'hasta' y abre con el efectivo
+    contado en el anterior. El estado financiero de un periodo suma los cortes ya hechos y solo calcula
+    desde las tablas de movimientos los días que aún no tienen corte.
+    """
+    @staticmethod
+    def summarize(dbConnection, desde, hasta):
+        """Totales de movimientos entre los días 'desde' y 'hasta' (AAAA-MM-DD, inclusive)."""
+        start, end = f"{desde} 00:00:00", f"{hasta} 23:59:59"
+        ventas, _, devoluciones = Archivo.sources(dbConnection, start, end)
+        cursor = dbConnection.cursor()
+        cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(descuento), 0) FROM {ventas} WHERE fecha BETWEEN ? AND ?", (start, end))
+        numTickets, descuentos = cursor.fetchone()
+        totales = {'numTickets': numTickets, 'ventasEfectivo': 0.0, 'ventasTarjeta': 0.0, 'descuentos': descuentos}
+        # Desglose por método; lo que no es efectivo (tarjeta, la parte con tarjeta de un pago mixto) no entra a la caja
+        for metodo, resumen in Venta.getResumenPagos(dbConnection, start, end).items():
+            totales['ventasEfectivo' if metodo == "Efectivo" else 'ventasTarjeta'] += resumen['monto']
+        cursor.execute(f"SELECT COALESCE(SUM(montoDevuelto), 0) FROM {devoluciones} WHERE fecha BETWEEN ? AND ?", (start, end))
+        totales['devoluciones'] = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(SUM(monto), 0) FROM gastos WHERE fecha BETWEEN ? AND ?", (start, end))
+        totales['gastos'] = cursor.fetchone()[0]
+        return totales
+
+    @staticmethod
+    def getLast(dbConnection, antesDe=None):
+        """Último corte (o el último cuyo día es anterior a 'antesDe'), como diccionario; None si no hay."""
+        cursor = dbConnection.cursor()
+        if antesDe:
+            cursor.execute("SELECT * FROM cortes WHERE hasta < ? ORDER BY hasta DESC LIMIT 1", (antesDe,))
+        else:
+            cursor.execute("SELECT * FROM cortes ORDER BY hasta DESC LIMIT 1")
+        fila = cursor.fetchone()
+        return dict(zip([d[0] for d in cursor.description], fila)) if fila else None
+
+    @staticmethod
+    def preview(dbConnection, hasta=None, saldoInicial=0.0):
+        """
+        Calcula (sin guardar) el corte que cierra el día 'hasta' (por defecto, hoy).
+        'saldoInicial' es la apertura del primer corte; los siguientes abren con lo contado en el anterior.
+        """
+        hasta = hasta or datetime.now().strftime("%Y-%m-%d")
+        anterior = Corte.getLast(dbConnection, hasta)
+        if anterior:
+            desde = (datetime.strptime(anterior['hasta'], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+            apertura = anterior['efectivoContado']
+        else:
+            desde, apertura = hasta, saldoInicial
+        corte = {'desde': desde, 'hasta': hasta, 'saldoApertura': apertura}
+        corte.update(Corte.summarize(dbConnection, desde, hasta))
+        # Las devoluciones se reembolsan y los gastos se pagan con el efectivo de la caja
+        corte['efectivoEsperado'] = apertura + corte['ventasEfectivo'] - corte['devoluciones'] - corte['gastos']
+        return corte
+
+    @staticmethod
+    def create(dbConnection, efectivoContado, usuario=None, hasta=None, saldoInicial=0.0):
+        """Cierra el día 'hasta' (por defecto, hoy) con el efectivo contado. Devuelve el corte guardado."""
+        hasta = hasta or datetime.now().strftime("%Y-%m-%d")
+        ultimo = Corte.getLast(dbConnection)
+        if ultimo and ultimo['hasta'] >= hasta:
+            raise ValueError(f"Ya existe un corte hasta el {ultimo['hasta']}. Solo se pueden cerrar días posteriores.")
+        corte = Corte.preview(dbConnection, hasta, saldoInicial)
+        corte.update({
+            'fechaCierre': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'usuario': usuario,
+            'efectivoContado': efectivoContado, 'diferencia': efectivoContado - corte['efectivoEsperado'],
+        })
+        columnas = ['desde', 'hasta', 'fechaCierre', 'usuario', 'saldoApertura', 'numTickets', 'ventasEfectivo', 'ventasTarjeta',
+                    'descuentos', 'devoluciones', 'gastos', 'efectivoEsperado', 'efectivoContado', 'diferencia']
+        cursor = dbConnection.cursor()
+        cursor.execute(f"INSERT INTO cortes ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})", [corte[c] for c in columnas])
+        dbConnection.commit()
+        corte['idCorte'] = cursor.lastrowid
+        return corte
+
+    @staticmethod
+    def getAll(dbConnection, limit=60):
+        """Últimos cortes, del más reciente al más antiguo."""
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT idCorte, desde, hasta, usuario, numTickets, ventasEfectivo, ventasTarjeta,
+                   efectivoEsperado, efectivoContado, diferencia
+            FROM cortes ORDER BY hasta DESC LIMIT ?
+        """, (limit,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def getBalance(dbConnection, periodo, saldoInicial=0.0):
+        """
+        Estado de caja de un período ('dia', 'semana', 'mes') a partir de los cortes.
+        Suma los cortes que cierran dentro del período y calcula en vivo solo los días posteriores al último
+        corte. El saldo de apertura es el del primer corte del período o, si no hay, lo contado en el último
+        corte anterior ('saldoInicial' si nunca se ha hecho un corte).
+        """
+        start, end = Venta.get_date_range(periodo)
+        inicio, fin = start[:10], end[:10]
+        cursor = dbConnection.cursor()
+        cursor.execute("""
+            SELECT COUNT(*), MIN(desde), MAX(hasta), COALESCE(SUM(numTickets), 0), COALESCE(SUM(ventasEfectivo), 0),
+                   COALESCE(SUM(ventasTarjeta), 0), COALESCE(SUM(descuentos), 0), COALESCE(SUM(devoluciones), 0),
+                   COALESCE(SUM(gastos), 0), COALESCE(SUM(diferencia), 0),
+                   (SELECT saldoApertura FROM cortes WHERE hasta BETWEEN ? AND ? ORDER BY hasta LIMIT 1)
+            FROM cortes WHERE hasta BETWEEN ? AND ?
+        """, (inicio, fin, inicio, fin))
+        numCortes, desde, ultimoDia, numTickets, efectivo, tarjeta, descuentos, devoluciones, gastos, diferencias, apertura = cursor.fetchone()
+        if numCortes:
+            pendienteDesde = (datetime.strptime(ultimoDia, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        else:
+            anterior = Corte.getLast(dbConnection, inicio)
+            if anterior:
+                # Los días entre el corte anterior y el inicio del período también mueven la caja
+                desde = pendienteDesde = (datetime.strptime(anterior['hasta'], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+                apertura = anterior['efectivoContado']
+            else:
+                desde = pendienteDesde = inicio
+                apertura = saldoInicial
+
+        balance = {
+            'desde': desde, 'hasta': fin, 'numCortes': numCortes, 'pendienteDesde': None, 'saldoApertura': apertura,
+            'numTickets': numTickets, 'ventasEfectivo': efectivo, 'ventasTarjeta': tarjeta, 'descuentos': descuentos,
+            'devoluciones': devoluciones, 'gastos': gastos, 'diferencias': diferencias,
+        }
+        if pendienteDesde <= fin:
+            balance['pendienteDesde'] = pendienteDesde
+            for clave, valor in Corte.summarize(dbConnection, pendienteDesde, fin).items():
+                balance[clave] += valor
+        # Saldo final: apertura + efectivo que entró - lo que salió + faltantes/sobrantes ya reconocidos en los cortes
+        balance['saldoFinal'] = apertura + balance['ventasEfectivo'] - balance['devoluciones'] - balance['gastos'] + diferencias
+        return balance
@@ -0,0 +1,222 @@
+"""
+Perfilador de consultas SQL y registro de consultas lentas.
+
+Cuando está activo (config.info: [Diagnostico] perfil_consultas = 1), las conexiones que crea
+Database.connect registran cada sentencia: cuántas veces se ejecutó, el tiempo total, máximo y un
+histograma de latencias. Las sentencias que superan el umbral se anotan en el registro de consultas
+lentas junto con su EXPLAIN QUERY PLAN, para ver de inmediato si recorren una tabla completa (SCAN).
+
+Las sentencias se agrupan por su texto normalizado (espacios colapsados y listas de parámetros
+'?, ?, ?' reducidas a '?...'), así que todas las ejecuciones de un mismo reporte caen en la misma fila.
+Con el perfilador apagado, Database.connect devuelve conexiones normales y no hay costo alguno.
+"""
+import bisect
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Límites superiores (ms) de las cubetas del histograma; la última cubeta es "más de 2500 ms"
+CUBETAS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+def normalizeSql(sql):
+    """Texto canónico de una sentencia para agrupar sus ejecuciones."""
+    sql = " ".join(sql.split())
+    return re.sub(r"\?(\s*,\s*\?)+", "?...", sql)
+
+class EstadisticaSentencia:
+    """Acumulados de una sentencia normalizada."""
+    __slots__ = ("sql", "llamadas", "totalMs", "maxMs", "fetchMs", "histograma", "plan")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.llamadas = 0
+        self.totalMs = 0.0
+        self.maxMs = 0.0
+        self.fetchMs = 0.0 # Tiempo leyendo filas (fetchall/fetchmany) después de ejecutar
+        self.histograma = [0] * (len(CUBETAS_MS) + 1)
+        self.plan = None # Líneas de EXPLAIN QUERY PLAN (solo si alguna vez superó el umbral)
+
+    def percentil(self, p):
+        """Percentil aproximado en ms (límite superior de la cubeta que lo contiene)."""
+        if not self.llamadas:
+            return 0.0
+        objetivo, acumulado = p / 100 * self.llamadas, 0
+        for i, cantidad in enumerate(self.histograma):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return CUBETAS_MS[i] if i < len(CUBETAS_MS) else self.maxMs
+        return self.maxMs
+
+    @property
+    def recorreTabla(self):
+        """Indica si el plan muestra un recorrido completo de tabla (SCAN sin índice)."""
+        return bool(self.plan) and any(linea.startswith("SCAN") and "USING" not in linea for linea in self.plan)
+
+    def toDict(self):
+        return {
+            "sql": self.sql, "llamadas": self.llamadas, "totalMs": round(self.totalMs, 3),
+            "promedioMs": round(self.totalMs / self.llamadas, 3) if self.llamadas else 0.0,
+            "p95Ms": self.percentil(95), "maxMs": round(self.maxMs, 3), "fetchMs": round(self.fetchMs, 3),
+            "histograma": dict(zip([f"<={c}" for c in CUBETAS_MS] + [f">{CUBETAS_MS[-1]}"], self.histograma)),
+            "plan": self.plan, "recorreTabla": self.recorreTabla,
+        }
+
+class PerfilConsultas:
+    """Registro compartido (y seguro entre hilos) de las estadísticas de todas las conexiones perfiladas."""
+    def __init__(self, umbralMs=50.0, archivoLentas=None, maxLentas=500):
+        self.umbralMs = umbralMs
+        self.archivoLentas = archivoLentas # Si se indica, cada consulta lenta se agrega también a este archivo
+        self.lock = threading.Lock()
+        self.sentencias = {}
+        self.implicitas = {} # Sentencias que SQLite ejecutó sin pasar por execute (BEGIN implícito, ROLLBACK...)
+        self.lentas = deque(maxlen=maxLentas)
+        self.inicio = datetime.now()
+
+    def connect(self, dbPath, **kwargs):
+        """Abre una conexión perfilada con los mismos argumentos que sqlite3.connect."""
+        conn = sqlite3.connect(dbPath, factory=ConexionPerfilada, **kwargs)
+        conn.perfil = self
+        conn.set_trace_callback(conn.traceStatement)
+        return conn
+
+    def statement(self, sql):
+        clave = normalizeSql(sql)
+        estadistica = self.sentencias.get(clave)
+        if estadistica is None:
+            estadistica = self.sentencias.setdefault(clave, EstadisticaSentencia(clave))
+        return estadistica
+
+    def record(self, conn, sql, parametros, ms):
+        """Registra una ejecución. Si supera el umbral, la anota como lenta y obtiene su plan (una vez)."""
+        with self.lock:
+            estadistica = self.statement(sql)
+            estadistica.llamadas += 1
+            estadistica.totalMs += ms
+            if ms > estadistica.maxMs:
+                estadistica.maxMs = ms
+            estadistica.histograma[bisect.bisect_left(CUBETAS_MS, ms)] += 1
+            esLenta = ms >= self.umbralMs
+            necesitaPlan = esLenta and estadistica.plan is None and parametros is not None
+        if not esLenta:
+            return
+        if necesitaPlan:
+            estadistica.plan = conn.explain(sql, parametros)
+        entrada = {"fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "ms": round(ms, 3), "sql": estadistica.sql}
+        self.lentas.append(entrada)
+        if self.archivoLentas:
+            with self.lock, open(self.archivoLentas, "a", encoding="utf-8") as f:
+                f.write(f"{entrada['fecha']}\t{entrada['ms']:.1f} ms\t{entrada['sql']}\n")
+
+    def recordFetch(self, sql, ms):
+        with self.lock:
+            estadistica = self.statement(sql)
+            estadistica.totalMs += ms
+            estadistica.fetchMs += ms
+
+    def recordImplicit(self, sql):
+        with self.lock:
+            clave = normalizeSql(sql)
+            self.implicitas[clave] = self.implicitas.get(clave, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.sentencias.clear()
+            self.implicitas.clear()
+            self.lentas.clear()
+            self.inicio = datetime.now()
+
+    def snapshot(self):
+        """Lista de estadísticas ordenada por tiempo total (las sentencias más costosas primero)."""
+        with self.lock:
+            return sorted((e.toDict() for e in self.sentencias.values()), key=lambda e: e["totalMs"], reverse=True)
+
+    def export(self, ruta):
+        """Guarda las estadísticas, las sentencias implícitas y el registro de consultas lentas en JSON."""
+        with self.lock:
+            implicitas, lentas = dict(self.implicitas), list(self.lentas)
+        datos = {
+            "desde": self.inicio.strftime("%Y-%m-%d %H:%M:%S"), "hasta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "umbralMs": self.umbralMs, "sentencias": self.snapshot(), "implicitas": implicitas, "lentas": lentas,
+        }
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+
+class ConexionPerfilada(sqlite3.Connection):
+    """Conexión cuyos cursores miden cada sentencia. Se crea con PerfilConsultas.connect."""
+    perfil = None
+    sqlActual = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or CursorPerfilado)
+
+    # Connection.execute y executemany usan un cursor interno que no pasa por cursor(): se redirigen aquí
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia):
+        return self.cursor().executemany(sql, secuencia)
+
+    def commit(self):
+        self.sqlActual = "COMMIT"
+        inicio = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.sqlActual = None
+        self.perfil.record(self, "COMMIT", (), (time.perf_counter() - inicio) * 1000)
+
+    def traceStatement(self, sql):
+        """set_trace_callback: cuenta las sentencias que SQLite ejecuta por su cuenta (BEGIN implícito, etc.)."""
+        if self.sqlActual is None or not sql.lstrip().startswith(self.sqlActual[:20]):
+            self.perfil.recordImplicit(sql)
+
+    def explain(self, sql, parametros):
+        """EXPLAIN QUERY PLAN de una sentencia, con un cursor normal para no perfilar la consulta del plan."""
+        if sql.lstrip()[:6].upper() in ("COMMIT", "BEGIN ", "PRAGMA"):
+            return []
+        try:
+            return [fila[-1] for fila in sqlite3.Cursor(self).execute("EXPLAIN QUERY PLAN " + sql, parametros)]
+        except sqlite3.Error as e:
+            return [f"(sin plan: {e})"]
+
+class CursorPerfilado(sqlite3.Cursor):
+    def execute(self, sql, parametros=()):
+        conn = self.connection
+        conn.sqlActual = sql.lstrip()
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            conn.sqlActual = None
+            conn.perfil.record(conn, sql, parametros, (time.perf_counter() - inicio) * 1000)
+            self.sqlPerfil = sql
+
+    def executemany(self, sql, secuencia):
+        conn = self.connection
+        conn.sqlActual = sql.lstrip()
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, secuencia)
+        finally:
+            conn.sqlActual = None
+            conn.perfil.record(conn, sql, None, (time.perf_counter() - inicio) * 1000)
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        sql = getattr(self, "sqlPerfil", None)
+        if sql:
+            self.connection.perfil.recordFetch(sql, (time.perf_counter() - inicio) * 1000)
+        return filas
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(size) if size is not None else super().fetchmany()
+        sql = getattr(self, "sqlPerfil", None)
+        if sql:
+            self.connection.perfil.recordFetch(sql, (time.perf_counter() - inicio) * 1000)
+        return filas
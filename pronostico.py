@@ -0,0 +1,117 @@
+"""
+Pronóstico de demanda y puntos de reorden.
+
+Para cada producto se calcula, sobre las ventas de los últimos DIAS_HISTORIAL días, cuántas unidades vende
+por día (velocidad) y cuánto varía esa venta de un día a otro. Con eso:
+
+    puntoReorden = velocidad * TIEMPO_ENTREGA + Z_SERVICIO * desviacion * raiz(TIEMPO_ENTREGA)
+
+es decir, lo que se espera vender mientras llega el pedido más un stock de seguridad. El punto de reorden se
+copia a productos.umbralStock de los productos sin mínimo propio (minStock), y un producto está bajo de stock
+cuando su stock es menor o igual a ese umbral, en lugar de un límite fijo de 5 unidades.
+
+El cálculo es un lote vectorizado (NumPy) sobre todo el catálogo y se guarda en la tabla 'pronosticos'.
+refreshForecasts se puede llamar seguido: la primera vez de cada día recalcula todo (la ventana avanza
+un día) y después solo recalcula los productos que se vendieron desde la última actualización.
+"""
+import numpy as np
+from datetime import datetime, timedelta
+
+from database import UMBRAL_STOCK_DEFECTO, retryOnBusy
+from models import Archivo
+
+DIAS_HISTORIAL = 56 # Ventana de ventas que se considera (8 semanas completas)
+TIEMPO_ENTREGA = 7 # Días que tarda en llegar un pedido al proveedor
+Z_SERVICIO = 1.65 # Stock de seguridad para no quedarse sin producto ~95 % de los ciclos
+MAX_INCREMENTAL = 900 # Con más productos vendidos desde la última actualización, conviene recalcular todo
+
+def readCounter(cursor, nombre):
+    fila = cursor.execute("SELECT valor FROM contadores WHERE nombre = ?", (nombre,)).fetchone()
+    return fila[0] if fila else None
+
+def dailyUnits(dbConnection, desde, hasta, productos=None):
+    """
+    Unidades vendidas por producto y día entre 'desde' y 'hasta' (AAAA-MM-DD), sin recargas.
+    Devuelve tres columnas: idProducto, índice del día (0 = 'desde') y unidades.
+    """
+    start, end = f"{desde} 00:00:00", f"{hasta} 23:59:59"
+    ventas, detallesVenta, _ = Archivo.sources(dbConnection, start, end)
+    filtro, params = "", [start, end]
+    if productos is not None:
+        filtro = f"AND dv.idProducto IN ({','.join('?' * len(productos))})"
+        params += list(productos)
+    cursor = dbConnection.cursor()
+    cursor.execute(f"""
+        SELECT dv.idProducto, substr(v.fecha, 1, 10), SUM(dv.cantidad)
+        FROM {ventas} v JOIN {detallesVenta} dv ON dv.idVenta = v.idVenta
+        WHERE v.fecha BETWEEN ? AND ? AND COALESCE(dv.esRecarga, 0) = 0 {filtro}
+        GROUP BY dv.idProducto, substr(v.fecha, 1, 10)
+    """, params)
+    filas = cursor.fetchall()
+    if not filas:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    ids, dias, unidades = zip(*filas)
+    indiceDia = (np.array(dias, dtype="datetime64[D]") - np.datetime64(desde, "D")).astype(np.int64)
+    return np.array(ids, dtype=np.int64), indiceDia, np.array(unidades, dtype=np.float64)
+
+def computeForecasts(ids, indiceDia, unidades, numDias=DIAS_HISTORIAL, tiempoEntrega=TIEMPO_ENTREGA, z=Z_SERVICIO):
+    """
+    Velocidad, desviación diaria y punto de reorden de cada producto a partir de sus ventas por día.
+    Los días sin venta cuentan como cero. Devuelve (idsProducto, velocidad, desviacion, puntoReorden).
+    """
+    productos, indice = np.unique(ids, return_inverse=True)
+    suma = np.bincount(indice, weights=unidades, minlength=len(productos))
+    sumaCuadrados = np.bincount(indice, weights=unidades ** 2, minlength=len(productos))
+    velocidad = suma / numDias
+    desviacion = np.sqrt(np.maximum(sumaCuadrados / numDias - velocidad ** 2, 0.0))
+    puntoReorden = velocidad * tiempoEntrega + z * desviacion * np.sqrt(tiempoEntrega)
+    return productos, velocidad, desviacion, puntoReorden
+
+def applyThresholds(cursor, productos=None):
+    """
+    Copia el punto de reorden a productos.umbralStock de los productos sin minStock (o solo de 'productos').
+    Los que no tienen pronóstico vuelven al umbral por defecto. Solo se escriben las filas que cambian.
+    """
+    filtro, params = "", [UMBRAL_STOCK_DEFECTO, UMBRAL_STOCK_DEFECTO]
+    if productos is not None:
+        filtro = f"AND idProducto IN ({','.join('?' * len(productos))})"
+        params += list(productos)
+    umbral = "COALESCE((SELECT f.puntoReorden FROM pronosticos f WHERE f.idProducto = productos.idProducto), ?)"
+    cursor.execute(f"UPDATE productos SET umbralStock = {umbral} WHERE minStock IS NULL AND umbralStock != {umbral} {filtro}", params)
+
+def refreshForecasts(dbConnection, completo=False, numDias=DIAS_HISTORIAL, tiempoEntrega=TIEMPO_ENTREGA, z=Z_SERVICIO):
+    """
+    Actualiza la tabla 'pronosticos' y el umbral de stock de los productos. Recalcula todo el catálogo si se pide, si cambió el día o si hubo
+    muchas ventas nuevas; si no, solo los productos vendidos desde la última actualización.
+    Devuelve el número de productos recalculados (0 si no había nada nuevo).
+    """
+    ahora = datetime.now()
+    hoy = int(ahora.strftime("%Y%m%d"))
+    hasta = ahora.strftime("%Y-%m-%d")
+    desde = (ahora - timedelta(days=numDias - 1)).strftime("%Y-%m-%d")
+    cursor = dbConnection.cursor()
+    ultimaVenta = cursor.execute("SELECT COALESCE(MAX(idVenta), 0) FROM ventas").fetchone()[0]
+    marca, diaCalculo = readCounter(cursor, "pronosticoUltimaVenta"), readCounter(cursor, "pronosticoDia")
+
+    productos = None
+    if not completo and diaCalculo == hoy and marca is not None:
+        if marca >= ultimaVenta:
+            return 0
+        productos = [fila[0] for fila in cursor.execute("SELECT DISTINCT idProducto FROM detallesVenta WHERE idVenta > ? AND esRecarga = 0", (marca,))]
+        if len(productos) > MAX_INCREMENTAL:
+            productos = None
+
+    ids, velocidad, desviacion, puntoReorden = computeForecasts(*dailyUnits(dbConnection, desde, hasta, productos), numDias, tiempoEntrega, z)
+    actualizado = ahora.strftime("%Y-%m-%d %H:%M:%S")
+    filas = list(zip(ids.tolist(), velocidad.tolist(), desviacion.tolist(), puntoReorden.tolist(), [actualizado] * len(ids)))
+    def guardar():
+        if productos is None:
+            cursor.execute("DELETE FROM pronosticos")
+        else:
+            cursor.executemany("DELETE FROM pronosticos WHERE idProducto = ?", [(i,) for i in productos])
+        cursor.executemany("INSERT INTO pronosticos (idProducto, velocidad, desviacion, puntoReorden, actualizado) VALUES (?, ?, ?, ?, ?)", filas)
+        applyThresholds(cursor, productos)
+        cursor.executemany("INSERT OR REPLACE INTO contadores (nombre, valor) VALUES (?, ?)", (("pronosticoUltimaVenta", ultimaVenta), ("pronosticoDia", hoy)))
+        dbConnection.commit()
+    retryOnBusy(dbConnection, guardar)
+    return len(ids) if productos is None else len(productos)
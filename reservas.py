@@ -0,0 +1,69 @@
+from metricas import metricas
+
+class LibroStock:
+    """
+    Copia en memoria del stock de los productos, descontando lo que ya está apartado en los carritos abiertos.
+
+    Permite validar el stock en cada escaneo con una búsqueda en un diccionario, sin consultar la base
+    de datos. La copia se actualiza de forma incremental: SQLite indica con 'PRAGMA data_version' si otra
+    conexión (otra caja, el inventario, una devolución) confirmó cambios, y en ese caso solo se releen los
+    productos cuya 'versionStock' es mayor que la última vista.
+
+    La validación definitiva ocurre en Venta.create, que descuenta el stock de forma condicional dentro de
+    la transacción de la venta; este libro solo evita consultas y avisa al cajero lo antes posible.
+    """
+    def __init__(self, db_instance):
+        self.conn = db_instance.connect() # Conexión propia, de larga vida, para detectar cambios de otras conexiones
+        self.stock = {} # idProducto -> stock confirmado en la BD
+        self.carritos = [] # Carritos abiertos cuyas cantidades se consideran apartadas
+        self.version = -1 # Mayor 'versionStock' leída
+        self.dataVersion = None
+        self.refresh()
+
+    def registerCarrito(self, carrito):
+        """Considera las cantidades de este carrito como apartadas."""
+        self.carritos.append(carrito)
+
+    def unregisterCarrito(self, carrito):
+        if carrito in self.carritos:
+            self.carritos.remove(carrito)
+
+    def refresh(self):
+        """Relee de la BD solo los productos cuyo stock cambió desde la última actualización."""
+        dataVersion = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if dataVersion == self.dataVersion:
+            return # Nadie más ha escrito en la BD
+        self.dataVersion = dataVersion
+        cursor = self.conn.execute("SELECT idProducto, stock, versionStock FROM productos WHERE versionStock > ?", (self.version,))
+        for idProducto, stock, version in cursor:
+            self.stock[idProducto] = stock
+            if version > self.version:
+                self.version = version
+
+    def apartado(self, idProducto):
+        """Unidades del producto que ya están en los carritos abiertos."""
+        return sum(carrito.cantidadDe(idProducto) for carrito in self.carritos)
+
+    def disponible(self, idProducto):
+        """Stock disponible para agregar a un carrito: stock confirmado menos lo apartado."""
+        stock = self.stock.get(idProducto)
+        if stock is not None:
+            metricas.libroAciertos.inc()
+        else:
+            metricas.libroFallos.inc()
+            # Producto creado después de la última actualización: se lee una sola vez
+            fila = self.conn.execute("SELECT stock FROM productos WHERE idProducto = ?", (idProducto,)).fetchone()
+            stock = self.stock[idProducto] = fila[0] if fila else 0
+        return stock - self.apartado(idProducto)
+
+    def commitSale(self, items):
+        """
+        Aplica a la copia en memoria el descuento de una venta ya confirmada en la BD,
+        para que quede consistente sin esperar a la siguiente actualización.
+        """
+        for item in items:
+            if item['id'] in self.stock and not item['nombre'].startswith("Recarga Celular"):
+                self.stock[item['id']] -= item['cantidad']
+
+    def close(self):
+        self.conn.close()
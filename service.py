@@ -0,0 +1,170 @@
+"""
+Capa de servicio sin interfaz gráfica.
+
+Expone la lógica de negocio de models.py (productos, ventas, devoluciones, gastos y reportes) para que
+pueda usarse sin Tkinter: desde la API HTTP local (api.py), un lector de códigos, un kiosco o una prueba.
+
+- Las lecturas se ejecutan en un grupo de hilos; cada hilo tiene su propia conexión de solo lectura.
+- Todas las escrituras pasan por la cola de escritura (colaescritura.py): un único hilo escritor que agrupa
+  las escrituras que llegan con pocos milisegundos de diferencia y las confirma juntas (group commit), de
+  modo que varias cajas comparten un solo fsync en lugar de pagar uno cada una.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from colaescritura import ColaEscritura
+from conteo import ConteoInventario
+from models import Producto, Venta, Devolucion, Gasto, AjusteInventario, Recepcion
+
+class PosService:
+    """Fachada sin interfaz gráfica sobre los modelos, segura para usar desde varios hilos."""
+    def __init__(self, db_instance, lectores=4, ventanaMs=3):
+        self.db = db_instance
+        self.local = threading.local()
+        self.lectores = ThreadPoolExecutor(max_workers=lectores, thread_name_prefix="Lector")
+        self.escritor = ColaEscritura(db_instance, ventanaMs=ventanaMs)
+        self.escritor.start()
+        self.conteo = ConteoInventario() # Conteo físico en curso; lo alimentan todos los lectores conectados
+
+    def close(self):
+        self.escritor.stop()
+        self.escritor.join()
+        self.lectores.shutdown()
+
+    # --- Infraestructura ---
+
+    def readerConnection(self):
+        """Conexión del hilo lector actual (se crea la primera vez que el hilo la necesita)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.db.connect()
+        return conn
+
+    def read(self, funcion, *args):
+        """Ejecuta funcion(conexion, *args) en el grupo de lectores. Devuelve un Future."""
+        return self.lectores.submit(lambda: funcion(self.readerConnection(), *args))
+
+    # --- Lecturas ---
+
+    def getProducto(self, codigoBarras):
+        return self.read(Producto.getByBarcode, codigoBarras)
+
+    def searchProductos(self, termino):
+        return self.read(Producto.searchByName, termino)
+
+    def getVenta(self, ventaId):
+        return self.read(Venta.getById, ventaId)
+
+    def getReporte(self, tipo, periodo):
+        """Reportes disponibles: 'ventas', 'ganancias' y 'libro-diario'."""
+        reportes = {'ventas': Venta.getReporteVentas, 'ganancias': Venta.getReporteGanancias, 'libro-diario': Venta.getLibroDiario}
+        if tipo not in reportes:
+            raise ValueError(f"Reporte desconocido: '{tipo}'.")
+        if Venta.get_date_range(periodo) == (None, None):
+            raise ValueError("El período debe ser 'dia', 'semana' o 'mes'.")
+        return self.read(reportes[tipo], periodo)
+
+    # --- Escrituras ---
+
+    def checkout(self, items, metodoPago, descuento=0.0, caja=None, pagos=None):
+        """
+        Registra una venta a partir de [{'id': idProducto, 'cantidad': n}, ...].
+        Los precios se toman del catálogo; solo las recargas indican su 'precio' (monto + comisión).
+        'pagos' divide el cobro entre varios métodos (ver Venta.create).
+        Devuelve un Future con el ID de la venta.
+        """
+        return self.escritor.submit(self.writeSale, items, metodoPago, descuento, caja or self.db.caja, pagos)
+
+    def writeSale(self, conn, items, metodoPago, descuento, caja, pagos=None, commit=False):
+        if not items:
+            raise ValueError("El carrito está vacío.")
+        carrito = []
+        for item in items:
+            cantidad = int(item['cantidad'])
+            if cantidad <= 0:
+                raise ValueError("Las cantidades deben ser mayores a cero.")
+            producto = Producto.getById(conn, item['id'])
+            if not producto:
+                raise ValueError(f"No existe el producto con ID {item['id']}.")
+            if producto['nombre'] == "Recarga Celular":
+                precio = float(item['precio'])
+                nombre = f"Recarga Celular ${precio - 1.00:.2f}"
+            else:
+                precio, nombre = producto['precioVenta'], producto['nombre']
+            carrito.append({"id": producto['idProducto'], "nombre": nombre, "precio": precio, "cantidad": cantidad, "subtotal": precio * cantidad})
+        return Venta.create(conn, carrito, metodoPago, float(descuento), caja=caja, commit=commit, pagos=pagos)
+
+    def registerReturn(self, ventaId, items):
+        """
+        Registra una devolución a partir de [{'idProducto': id, 'cantidad': n}, ...].
+        Los montos se calculan con el precio unitario de la venta original. Devuelve un Future.
+        """
+        return self.escritor.submit(self.writeReturn, ventaId, items)
+
+    def writeReturn(self, conn, ventaId, items, commit=False):
+        venta = Venta.getById(conn, ventaId)
+        if not venta:
+            raise ValueError(f"No se encontró la venta con ID: {ventaId}")
+        detalles = {d['idProducto']: d for d in venta['detalles']}
+        itemsFinales = []
+        for item in items:
+            detalle = detalles.get(item['idProducto'])
+            cantidad = int(item['cantidad'])
+            if not detalle or not 0 < cantidad <= detalle['cantidad']:
+                raise ValueError(f"Cantidad inválida para el producto {item['idProducto']}.")
+            itemsFinales.append({"idProducto": detalle['idProducto'], "nombreProducto": detalle['nombre'], "cantidad": cantidad, "montoDevuelto": detalle['precioUnitario'] * cantidad})
+        return Devolucion.create(conn, ventaId, itemsFinales, commit=commit)
+
+    def registerGasto(self, descripcion, monto):
+        """Registra un gasto. Devuelve un Future con su ID."""
+        if not descripcion or float(monto) <= 0:
+            raise ValueError("Ingrese una descripción y un monto mayor a cero.")
+        return self.escritor.submit(Gasto.create, descripcion, float(monto))
+
+    def receiveDelivery(self, lineas, proveedor=None, folio=None, gastos=0.0, usuario=None):
+        """
+        Registra una recepción de mercancía a partir de [{'codigo': '750...', 'cantidad': 12, 'costo': 8.5}, ...]
+        (costo opcional). Devuelve un Future con el resumen (ver Recepcion.apply).
+        """
+        if not lineas:
+            raise ValueError("La recepción no tiene renglones.")
+        renglones = [(linea.get('codigo'), linea.get('cantidad', 1), linea.get('costo')) for linea in lineas]
+        return self.escritor.submit(Recepcion.apply, renglones, proveedor, folio, gastos, usuario)
+
+    # --- Conteo físico de inventario ---
+
+    def addCounts(self, lecturas):
+        """
+        Suma lecturas al conteo en curso: [{'codigo': '750...', 'cantidad': 1}, ...] (cantidad opcional).
+        Se acumulan en memoria, todo el lote o nada: si una lectura no es válida no se suma ninguna (así un
+        lector puede reintentar el lote completo). Devuelve el avance del conteo.
+        """
+        renglones = []
+        for numero, lectura in enumerate(lecturas, 1):
+            if not isinstance(lectura, dict) or lectura.get('codigo') in (None, ""):
+                raise ValueError(f"La lectura {numero} no tiene 'codigo'.")
+            renglones.append((lectura['codigo'], lectura.get('cantidad', 1)))
+        self.conteo.addBatch(renglones)
+        return {"productos": len(self.conteo), "lecturas": self.conteo.lecturas}
+
+    def getCountVariances(self, completo=False):
+        """Diferencias del conteo en curso contra el stock. Devuelve un Future con (diferencias, noEncontrados)."""
+        return self.read(AjusteInventario.getVariances, self.conteo.snapshot(), completo)
+
+    def applyCount(self, completo=False, usuario=None):
+        """
+        Aplica el conteo en curso en una sola transacción y empieza uno nuevo. Si la escritura falla, las
+        lecturas vuelven al conteo. Devuelve un Future con el resumen del ajuste.
+        """
+        cantidades = self.conteo.take()
+        if not cantidades:
+            raise ValueError("El conteo está vacío.")
+        future = self.escritor.submit(AjusteInventario.apply, cantidades, completo, usuario)
+        def restaurar(f):
+            if f.exception() is not None:
+                self.conteo.merge(cantidades)
+        future.add_done_callback(restaurar)
+        return future
+
+    def discardCount(self):
+        self.conteo.take()
@@ -0,0 +1,143 @@
+"""
+Teclas rápidas del punto de venta: botones con los productos que más se venden en el día de la semana y la
+hora actuales, para venderlos con un clic.
+
+El cálculo recorre las ventas de las últimas SEMANAS_HISTORIAL semanas y guarda en la tabla 'teclasRapidas'
+los TECLAS_POR_HORARIO productos que aparecen en más tickets de cada horario (día de la semana y hora),
+además de los de todo el día, que completan las horas con pocas ventas. Se repite una vez al día, en un hilo
+de fondo al abrir el punto de venta (CalculoTeclasRapidas) o desde una tarea programada:
+
+    python teclasrapidas.py --db pos.db
+
+El punto de venta lee la tabla al abrir (TeclasRapidas.load) y al cambiar la hora solo cambia de lista en
+memoria, sin consultar la BD. Los datos de los productos vienen del catálogo en memoria (catalogo.py).
+"""
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import Database, retryOnBusy
+from metricas import metricas
+from models import Archivo
+
+SEMANAS_HISTORIAL = 8 # Ventas que se consideran (semanas completas, para que cada día de la semana pese igual)
+TECLAS_POR_HORARIO = 24 # Productos que se guardan por horario (el punto de venta muestra los primeros)
+TODO_EL_DIA = -1 # Hora de la lista de todo el día
+
+def dayOfWeek(fecha):
+    """Día de la semana como en strftime('%w') de SQLite: 0 = domingo."""
+    return (fecha.weekday() + 1) % 7
+
+def computeQuickKeys(dbConnection, semanas=SEMANAS_HISTORIAL, teclas=TECLAS_POR_HORARIO):
+    """
+    Recalcula la tabla 'teclasRapidas' (sin confirmar) con las ventas de las últimas 'semanas' semanas.
+    Devuelve el número de filas guardadas.
+    """
+    hoy = datetime.now()
+    start = (hoy - timedelta(weeks=semanas)).strftime("%Y-%m-%d 00:00:00")
+    end = hoy.strftime("%Y-%m-%d 23:59:59")
+    ventas, detallesVenta = Archivo.sources(dbConnection, start, end, ("ventas", "detallesVenta"))
+    cursor = dbConnection.cursor()
+    cursor.execute("DELETE FROM teclasRapidas")
+    # Tickets por producto y horario; la lista de todo el día se suma de la misma tabla intermedia
+    cursor.execute(f"""
+        WITH porHora AS MATERIALIZED (
+            SELECT CAST(strftime('%w', v.fecha) AS INTEGER) AS diaSemana, CAST(substr(v.fecha, 12, 2) AS INTEGER) AS hora,
+                   dv.idProducto, COUNT(*) AS veces
+            FROM {ventas} v JOIN {detallesVenta} dv ON dv.idVenta = v.idVenta
+            WHERE v.fecha BETWEEN ? AND ?
+            GROUP BY diaSemana, hora, dv.idProducto
+        ), horarios AS (
+            SELECT diaSemana, hora, idProducto, veces FROM porHora
+            UNION ALL
+            SELECT diaSemana, ?, idProducto, SUM(veces) FROM porHora GROUP BY diaSemana, idProducto
+        )
+        INSERT INTO teclasRapidas (diaSemana, hora, posicion, idProducto, veces)
+        SELECT diaSemana, hora, posicion, idProducto, veces FROM (
+            SELECT diaSemana, hora, idProducto, veces,
+                   ROW_NUMBER() OVER (PARTITION BY diaSemana, hora ORDER BY veces DESC, idProducto) AS posicion
+            FROM horarios
+        ) WHERE posicion <= ?
+    """, (start, end, TODO_EL_DIA, teclas))
+    return cursor.rowcount
+
+def refreshQuickKeys(dbConnection, completo=False):
+    """
+    Recalcula las teclas rápidas si no se han calculado hoy (o si se pide 'completo') y confirma.
+    Devuelve True si se recalcularon.
+    """
+    hoy = int(datetime.now().strftime("%Y%m%d"))
+    fila = dbConnection.execute("SELECT valor FROM contadores WHERE nombre = 'teclasRapidasDia'").fetchone()
+    if not completo and fila and fila[0] == hoy:
+        return False
+    def calcular():
+        computeQuickKeys(dbConnection)
+        dbConnection.execute("INSERT OR REPLACE INTO contadores (nombre, valor) VALUES ('teclasRapidasDia', ?)", (hoy,))
+        dbConnection.commit()
+    retryOnBusy(dbConnection, calcular)
+    return True
+
+class CalculoTeclasRapidas(threading.Thread):
+    """Hilo que recalcula las teclas rápidas con su propia conexión, sin bloquear la interfaz."""
+    def __init__(self, db_instance, teclas=None):
+        super().__init__(name="CalculoTeclasRapidas", daemon=True)
+        self.db, self.teclas = db_instance, teclas
+
+    def run(self):
+        conn = self.db.connect()
+        try:
+            recalculadas = refreshQuickKeys(conn)
+            if self.teclas is not None:
+                self.teclas.error = None
+                if recalculadas: self.teclas.pendiente = True # La interfaz vuelve a leer la tabla en su siguiente revisión
+        except Exception as e:
+            metricas.tareasFallidas.inc()
+            if self.teclas is not None:
+                self.teclas.error = e # Este hilo no toca la interfaz: el punto de venta muestra el aviso en su siguiente revisión
+        finally:
+            conn.close()
+
+class TeclasRapidas:
+    """
+    Teclas rápidas cargadas en memoria, para usarse desde el hilo de la interfaz: por cada horario, los IDs
+    de sus productos en orden; los diccionarios de los productos los da el catálogo.
+    """
+    def __init__(self, catalogo, numero=12):
+        self.catalogo, self.numero = catalogo, numero
+        self.horarios = {} # (diaSemana, hora) -> [idProducto, ...]
+        self.pendiente = False # El hilo de cálculo terminó y hay que volver a leer la tabla
+        self.error = None # Excepción del último cálculo de fondo, si falló
+
+    def load(self, dbConnection):
+        """Lee la tabla completa y los productos de todos los horarios (dos consultas)."""
+        self.pendiente = False
+        self.horarios = {}
+        for diaSemana, hora, idProducto in dbConnection.execute("SELECT diaSemana, hora, idProducto FROM teclasRapidas ORDER BY diaSemana, hora, posicion"):
+            self.horarios.setdefault((diaSemana, hora), []).append(idProducto)
+        self.catalogo.get(list({idProducto for ids in self.horarios.values() for idProducto in ids}))
+
+    def horario(self, ahora=None):
+        ahora = ahora or datetime.now()
+        return dayOfWeek(ahora), ahora.hour
+
+    def productos(self, ahora=None):
+        """Los 'numero' productos de la hora actual, completados con los de todo el día."""
+        diaSemana, hora = self.horario(ahora)
+        ids = list(dict.fromkeys(self.horarios.get((diaSemana, hora), []) + self.horarios.get((diaSemana, TODO_EL_DIA), [])))
+        return self.catalogo.get(ids)[:self.numero]
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula las teclas rápidas del punto de venta con el historial de ventas")
+    parser.add_argument("--db", default="pos.db", help="Archivo de la base de datos")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    inicio = time.perf_counter()
+    with db.connect() as conn:
+        refreshQuickKeys(conn, completo=True)
+        horarios = conn.execute("SELECT COUNT(DISTINCT diaSemana * 100 + hora) FROM teclasRapidas WHERE hora != ?", (TODO_EL_DIA,)).fetchone()[0]
+    print(f"Teclas rápidas calculadas en {time.perf_counter() - inicio:.2f} s para {horarios} horario(s).")
+
+if __name__ == "__main__":
+    main()
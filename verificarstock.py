@@ -0,0 +1,39 @@
+"""
+Verificación del stock contra el libro de movimientos.
+
+Recalcula el stock de cada producto como la suma de sus movimientos (movimientosStock) y lo compara con
+productos.stock. Una diferencia indica que el stock se modificó sin pasar por el libro (por ejemplo, con
+SQL directo), así que vale la pena investigarla antes de registrarla. Pensado para ejecutarse al cierre
+del día o desde una tarea programada: termina con código 1 si encuentra diferencias.
+
+Uso:
+    python verificarstock.py --db pos.db
+    python verificarstock.py --db pos.db --registrar
+"""
+import argparse
+import sys
+import time
+
+from database import Database
+from models import MovimientoStock
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara productos.stock con la suma del libro de movimientos")
+    parser.add_argument("--db", default="pos.db", help="Archivo de la base de datos")
+    parser.add_argument("--registrar", action="store_true", help="Registra cada diferencia como movimiento 'correccion' (el stock no cambia)")
+    parser.add_argument("--max", type=int, default=50, help="Diferencias a mostrar")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    inicio = time.perf_counter()
+    with db.connect() as conn:
+        diferencias = MovimientoStock.verify(conn, registrar=args.registrar)
+    print(f"Verificación completada en {time.perf_counter() - inicio:.2f} s: {len(diferencias)} producto(s) con diferencia.")
+    for idProducto, codigo, nombre, stock, libro, diferencia in diferencias[:args.max]:
+        print(f"  {idProducto:>8} {codigo:<15} {nombre[:40]:<40} stock {stock:>8} libro {libro:>8} ({diferencia:+d})")
+    if diferencias and args.registrar:
+        print("Las diferencias quedaron registradas como movimientos de corrección.")
+    sys.exit(1 if diferencias and not args.registrar else 0)
+
+if __name__ == "__main__":
+    main()